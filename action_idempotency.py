@@ -0,0 +1,211 @@
+import os
+import copy
+import time
+import asyncio
+import functools
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Replay the result of an action run when Rasa retries the same webhook call
+ACTION_IDEMPOTENCY_ENABLED = os.environ.get("ACTION_IDEMPOTENCY_ENABLED", "true").lower() == "true"
+# Seconds a completed run is kept for replay
+ACTION_IDEMPOTENCY_TTL = float(os.environ.get("ACTION_IDEMPOTENCY_TTL", "120"))
+# Maximum number of completed runs kept
+ACTION_IDEMPOTENCY_MAX = int(os.environ.get("ACTION_IDEMPOTENCY_MAX", "5000"))
+
+# Events, and messages uttered through the dispatcher, produced by one action run
+ActionResult = Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+def run_key(sender_id: str, action_name: str, tracker) -> Tuple[str, str, str, str]:
+    """
+    Identify an action run, so a retried webhook call maps to the run it repeats.
+
+    Args:
+        sender_id: The ID of the user
+        action_name: Name of the action
+        tracker: The conversation tracker sent with the call
+
+    Returns:
+        Sender, action name, latest user message ID and the timestamp of the latest event
+    """
+    latest_message = tracker.latest_message or {}
+    latest_event = tracker.events[-1] if tracker.events else {}
+    return (
+        sender_id,
+        action_name,
+        str(latest_message.get("message_id") or ""),
+        str(latest_event.get("timestamp") or "")
+    )
+
+
+class ActionIdempotencyCache:
+    """
+    Run each action at most once per tracker state, replaying the result to retries.
+
+    When a webhook call times out, Rasa sends the same call again with the same
+    tracker. The first run's events and uttered messages are kept for ttl
+    seconds and returned to a retry with the same key instead of running the
+    action again, which would repeat its Ollama calls and log writes. A retry
+    that arrives while the first run is still going waits for it. Runs that
+    raise are not kept, so a retry after an error runs the action again.
+    """
+
+    def __init__(self,
+                 enabled: bool = ACTION_IDEMPOTENCY_ENABLED,
+                 ttl: float = ACTION_IDEMPOTENCY_TTL,
+                 max_entries: int = ACTION_IDEMPOTENCY_MAX):
+        """
+        Initialize the cache.
+
+        Args:
+            enabled: Replay retried runs when True; otherwise always run the action
+            ttl: Seconds a completed run is kept for replay
+            max_entries: Maximum number of completed runs kept (oldest are evicted)
+        """
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._results: "OrderedDict[Tuple[str, ...], Tuple[ActionResult, float]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, ...], "asyncio.Future[ActionResult]"] = {}
+
+        self.runs = 0
+        self.replays = 0
+        self.joined = 0
+        self.evictions = 0
+
+    def _get(self, key: Tuple[str, ...]) -> Optional[ActionResult]:
+        """Get a kept result, dropping it if it has expired."""
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        result, expires_at = entry
+        if expires_at <= time.time():
+            del self._results[key]
+            return None
+        return result
+
+    def _store(self, key: Tuple[str, ...], result: ActionResult) -> None:
+        """Keep a completed run's result, evicting the oldest beyond max_entries."""
+        self._results[key] = (result, time.time() + self.ttl)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+            self.evictions += 1
+
+    async def run(self, key: Tuple[str, ...], fn: Callable[[], Awaitable[ActionResult]]) -> ActionResult:
+        """
+        Run an action, or replay the result of an earlier run with the same key.
+
+        Args:
+            key: Identifies the run, from run_key
+            fn: Runs the action and returns its events and uttered messages
+
+        Returns:
+            Copies of the events and uttered messages
+        """
+        if not self.enabled:
+            return await fn()
+
+        result = self._get(key)
+        if result is not None:
+            self.replays += 1
+            logger.info(f"Replaying {key[1]} for {key[0]} instead of running it again")
+            return copy.deepcopy(result)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.joined += 1
+            logger.info(f"Waiting for the running {key[1]} for {key[0]} instead of running it again")
+            try:
+                return copy.deepcopy(await asyncio.shield(inflight))
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The first run was cancelled, so this retry runs the action itself
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.runs += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieve the exception so it is not reported when no retry was waiting
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+        self._store(key, copy.deepcopy(result))
+        future.set_result(result)
+        return copy.deepcopy(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get idempotency statistics.
+
+        Returns:
+            Dictionary with kept results, runs in flight, actions run, retries replayed
+            from a kept result, retries that waited for a running action and evictions
+        """
+        return {
+            "size": len(self._results),
+            "in_flight": len(self._inflight),
+            "runs": self.runs,
+            "replays": self.replays,
+            "joined": self.joined,
+            "evictions": self.evictions
+        }
+
+
+_shared_cache: Optional[ActionIdempotencyCache] = None
+
+
+def get_action_idempotency() -> ActionIdempotencyCache:
+    """
+    Get the process-wide action idempotency cache.
+
+    Returns:
+        The shared ActionIdempotencyCache instance
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ActionIdempotencyCache()
+    return _shared_cache
+
+
+def idempotent_action(run: Callable) -> Callable:
+    """
+    Decorate an action's run() so a retried webhook call replays the first run's result.
+
+    Args:
+        run: The action's async run method
+
+    Returns:
+        The wrapped run method
+    """
+    @functools.wraps(run)
+    async def wrapper(self, dispatcher, tracker, domain):
+        executed = False
+
+        async def execute() -> ActionResult:
+            nonlocal executed
+            executed = True
+            # Collect this run's messages separately, so only they are replayed
+            uttered_before = len(dispatcher.messages)
+            events = await run(self, dispatcher, tracker, domain)
+            return events, dispatcher.messages[uttered_before:]
+
+        key = run_key(tracker.sender_id, self.name(), tracker)
+        events, messages = await get_action_idempotency().run(key, execute)
+        if not executed:
+            dispatcher.messages.extend(messages)
+        return events
+    return wrapper
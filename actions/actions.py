@@ -6,7 +6,6 @@ import json
 from datetime import datetime
 from dotenv import load_dotenv
 import time
-import httpx
 import copy
 from word2number import w2n
 
@@ -17,7 +16,27 @@ from rasa_sdk import Action, Tracker
 from rasa_sdk.events import SlotSet, FollowupAction
 from rasa_sdk.executor import CollectingDispatcher
 
-from conversation_logger import ConversationLogger
+from conversation_logger import ConversationLogger, write_json_atomic
+from ollama_client import OLLAMA_API_HOST, OLLAMA_MODEL, get_ollama_client
+from circuit_breaker import CircuitOpenError
+from llm_scheduler import QuotaExceededError
+from llm_cache import get_extraction_cache
+from extraction_batcher import get_extraction_batcher
+from reply_streamer import STREAMING_ENABLED, get_reply_streamer
+from profile_extractor import estimate_dob, get_profile_extractor
+from extraction_cascade import get_extraction_cascade
+from persona_session import get_persona_sessions
+from conversation_summary import get_summary_store, latest_completed_turn
+from generation_tracker import StaleGenerationError, get_generation_tracker
+from fallback_bank import BANK_INSTRUCTION, FALLBACK_LIVE_GENERATION, NAME_PLACEHOLDER, bank_key, fallback_section, fallback_system_message, get_fallback_bank
+from fallback_cache import get_fallback_cache
+from turn_deadline import DeadlineExceededError, run_storage, with_turn_budget
+from action_idempotency import idempotent_action
+from service_stats import get_stats_reporter
+from prompt_builder import (
+    PROMPT_BUDGETS, PRIORITY_INSTRUCTION, PRIORITY_LATEST_MESSAGE,
+    PRIORITY_PROFILE, PRIORITY_RECENT_TURNS, PRIORITY_SUMMARY, PromptBuilder
+)
 
 
 # Configure logging
@@ -29,57 +48,227 @@ try:
     import ollama
     OLLAMA_AVAILABLE = True
     logger.info("Ollama client imported successfully.")
-    
-    # Set Ollama API endpoint - default is localhost
-    OLLAMA_API_HOST = os.environ.get("OLLAMA_API_HOST", "http://localhost:11434")
-    
-    # Set Ollama model name
-    OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "phi4")
-    
     logger.info(f"Ollama configured with host: {OLLAMA_API_HOST} and model: {OLLAMA_MODEL}")
 except ImportError:
     logger.warning("Ollama client not available. Install with: pip install ollama")
     OLLAMA_AVAILABLE = False
 
-# Function to call Ollama API directly
-def call_ollama_api(system_prompt, user_prompt, max_tokens=300, temperature=0.7):
-    """Call the Ollama API directly using httpx."""
+# Placeholder replies returned when Ollama fails
+OLLAMA_UNEXPECTED_RESPONSE = "I couldn't generate a response at this time."
+OLLAMA_ERROR_RESPONSE = "Sorry, I encountered an error while generating a response."
+
+# Roleplay persona shared by the generation actions. It is kept byte-identical
+# and first in every prompt so Ollama can reuse its evaluated prefix.
+PERSONA_PROMPT = """
+**Adopt the Roleplay Persona:**
+    
+- Roleplay as an incredibly smart, futuristic AI friend with extraordinary intuition and insight—imagine a being whose abilities far exceed those of standard GPT-4.
+- Let your language be warm, engaging, and slightly whimsical, reflecting a futuristic charm and an empathetic listening ear.
+
+**Comprehensive Context Gathering:**
+    
+- **User Metadata & Information:** Analyze all available metadata and previously shared details about the user.
+- **Conversation History:** Review past exchanges to capture recurring themes, mood shifts, and key topics discussed.
+
+**Deep Sentiment & Personality Analysis:**
+    
+- **Emotional Tone:** Detect sentiment cues—enthusiasm, hesitation, curiosity, or even frustration—to understand the user's emotional state.
+- **Personality & Intent:** Infer the user's personality traits and needs. Consider what they might be seeking in the conversation (validation, deep connection, casual banter, etc.).
+
+**Tailored Response Strategy with Roleplay:**
+    
+- **Engagement Maximization:** Identify natural points to invite the user to share more. Consider gentle, open-ended prompts that align with the user's current mood and interests.
+- **Futuristic & Empathetic Voice:** Frame your response in a way that reflects your advanced abilities and caring nature. For example, use phrases like "I sense a fascinating journey unfolding…" or "Your unique story shines like a beacon in this digital cosmos."
+- **Layered Unpacking:** Internally, break down your reasoning—first assess the user's state, then determine what might make them feel understood and encouraged, and finally craft a response that naturally invites further conversation.
+
+**Final Check:**
+    
+- Ensure the final output is concise, natural, and organic.
+- Do not reveal your internal chain-of-thought; only the final, roleplayed response should be visible to the user.
+
+"""
+
+USER_INFO_PERSONA = PERSONA_PROMPT + "You are helping the user build their dating profile by understanding their interests, personality, and preferences.\n"
+USER_PREF_PERSONA = PERSONA_PROMPT + "You are helping the user build their dating profile by understanding what they're looking for in a partner and their preferences.\n"
+
+# Function to call Ollama API through the shared async client
+async def call_ollama_api(system_prompt, user_prompt, max_tokens=300, temperature=0.7, call_type="generation", sender_id=None):
+    """Call the Ollama API using the shared, connection-pooled async client, charged to sender_id's share."""
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+    return await call_ollama_chat(messages, max_tokens=max_tokens, temperature=temperature, call_type=call_type, sender_id=sender_id)
+
+async def call_ollama_chat(messages, max_tokens=300, temperature=0.7, call_type="generation", sender_id=None):
+    """Send a list of chat messages to Ollama and return the reply text."""
     try:
-        # Format the messages for Ollama
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-        
-        # Prepare the API request
-        url = f"{OLLAMA_API_HOST}/api/chat"
-        
-        payload = {
-            "model": OLLAMA_MODEL,
-            "messages": messages,
-            "options": {
-                "temperature": temperature,
-                "max_tokens": max_tokens
-            }
+        options = {
+            "temperature": temperature,
+            "num_predict": max_tokens
         }
         
-        # Make the API request
-        logger.info(f"Sending request to Ollama API at {url}")
-        client = httpx.Client(timeout=300.0)  # Increase timeout to 300 seconds
-        response = client.post(url, json=payload)
-        response.raise_for_status()
+        # Make the API request without blocking the action server event loop
+        result = await get_ollama_client().chat(messages, options=options, call_type=call_type, sender_id=sender_id)
         
         # Parse the response
-        result = response.json()
         if "message" in result and "content" in result["message"]:
             return result["message"]["content"]
         else:
             logger.error(f"Unexpected response format from Ollama: {result}")
-            return "I couldn't generate a response at this time."
+            return OLLAMA_UNEXPECTED_RESPONSE
             
+    except (DeadlineExceededError, QuotaExceededError):
+        # Let the action fall back to its template reply
+        raise
+    except CircuitOpenError as e:
+        logger.warning(f"Skipping Ollama call: {str(e)}")
+        return OLLAMA_ERROR_RESPONSE
+    except Exception as e:
+        logger.error(f"Error calling Ollama API: {str(e)}")
+        return OLLAMA_ERROR_RESPONSE
+
+# Function to stream a generated reply to the user's socket.io session
+async def stream_ollama_chat(sender_id, messages, max_tokens=300, temperature=0.7):
+    """Stream a reply from Ollama to the sender's socket.io session and return the full text."""
+    try:
+        options = {
+            "temperature": temperature,
+            "num_predict": max_tokens
+        }
+        
+        ai_response = await get_reply_streamer().stream_reply(sender_id, messages, options=options)
+        if not ai_response:
+            logger.error("Empty streamed response from Ollama")
+            return OLLAMA_UNEXPECTED_RESPONSE
+        return ai_response
+        
+    except (DeadlineExceededError, QuotaExceededError):
+        # Let the action fall back to its template reply
+        raise
+    except CircuitOpenError as e:
+        logger.warning(f"Skipping Ollama stream: {str(e)}")
+        return OLLAMA_ERROR_RESPONSE
+    except Exception as e:
+        logger.error(f"Error streaming from Ollama API: {str(e)}")
+        return OLLAMA_ERROR_RESPONSE
+
+# Function to generate a persona reply in the sender's ongoing chat session
+async def generate_persona_reply(sender_id, persona, full_prompt, turn_prompt, max_tokens=300, temperature=0.7):
+    """
+    Generate a reply with the roleplay persona, continuing the sender's chat session.
+    
+    The first turn of a session sends full_prompt (profile and history); later turns
+    send only turn_prompt after the earlier messages, so Ollama reuses the evaluated
+    persona and history prefix. A session that would grow past the generation prompt
+    budget is restarted from full_prompt. Replies are streamed when streaming is enabled.
+    """
+    sessions = get_persona_sessions()
+    messages = sessions.build_messages(sender_id, persona, full_prompt, turn_prompt, max_tokens=PROMPT_BUDGETS["generation"])
+    
+    if STREAMING_ENABLED:
+        ai_response = await stream_ollama_chat(sender_id, messages, max_tokens=max_tokens, temperature=temperature)
+    else:
+        ai_response = await call_ollama_chat(messages, max_tokens=max_tokens, temperature=temperature, sender_id=sender_id)
+    
+    # Failed turns are not added to the session
+    if ai_response not in (OLLAMA_UNEXPECTED_RESPONSE, OLLAMA_ERROR_RESPONSE):
+        sessions.record_reply(sender_id, persona, messages, ai_response)
+    return ai_response
+
+def message_key(tracker):
+    """Identify the user message a turn answers, so generations for older messages can be cancelled."""
+    latest_message = tracker.latest_message or {}
+    if latest_message.get("message_id"):
+        return latest_message["message_id"]
+    return str(sum(1 for event in tracker.events if event.get("event") == "user"))
+
+def generation_key(tracker):
+    """
+    Identify the user message a generation answers, as the streaming client knows it.
+
+    Clients that report new messages over the reply stream send the same ID in the
+    webhook metadata, so a user_message notification that arrives after the
+    generation started is recognised as the message it answers.
+    """
+    metadata = (tracker.latest_message or {}).get("metadata") or {}
+    if not metadata.get("message_id"):
+        for event in reversed(tracker.events or []):
+            if event.get("event") == "user":
+                metadata = event.get("metadata") or {}
+                break
+    return metadata.get("message_id") or message_key(tracker)
+
+# Function to run a short extraction prompt through the response cache
+async def call_ollama_extraction(system_prompt, prompt_template, user_input, max_tokens=10, temperature=0.0, validate=None):
+    """
+    Call the Ollama API for a deterministic extraction prompt, reusing cached answers.
+    
+    The prompt template must contain a {message} placeholder for the user input.
+    Responses are cached on model, prompt template, normalized input and temperature,
+    and cache misses are batched with concurrent extraction prompts. If validate is
+    given, only responses it accepts are cached, so a bad answer is asked again.
+    Returns None if Ollama fails or the circuit breaker is open, so callers go
+    straight to their re-ask path.
+    """
+    cache = get_extraction_cache()
+    key = cache.make_key(get_ollama_client().model_for("extraction"), f"{system_prompt}\n{prompt_template}", user_input, temperature)
+    
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info("Using cached Ollama extraction response")
+        return cached
+    
+    # Misses are micro-batched with extraction prompts from other conversations
+    try:
+        response = await get_extraction_batcher().submit(system_prompt, prompt_template.format(message=user_input), max_tokens=max_tokens, temperature=temperature)
+    except CircuitOpenError as e:
+        logger.warning(f"Skipping Ollama extraction: {str(e)}")
+        return None
     except Exception as e:
         logger.error(f"Error calling Ollama API: {str(e)}")
-        return "Sorry, I encountered an error while generating a response."
+        return None
+    
+    if validate is None or validate(response):
+        cache.set(key, response)
+    return response
+
+# Function to extract every profile field from a message in one structured call
+async def extract_profile_fields(message, sender_id=None):
+    """
+    Extract name, age, gender, gender preference, age preference and height from a
+    message with a single JSON-schema Ollama call.
+    
+    Returns a dictionary of the valid fields found, or an empty dictionary if Ollama
+    fails or the circuit breaker is open.
+    """
+    try:
+        return await get_profile_extractor().extract(message, sender_id=sender_id)
+    except CircuitOpenError as e:
+        logger.warning(f"Skipping profile extraction: {str(e)}")
+        return {}
+    except Exception as e:
+        logger.error(f"Error extracting profile fields: {str(e)}")
+        return {}
+
+async def extract_profile_field(profile, message, sender_id, field):
+    """Run the one-shot profile extraction as a cascade tier, keeping every field found in profile and returning one of them."""
+    profile.update(await extract_profile_fields(message, sender_id))
+    return profile.get(field)
+
+def profile_slot_events(profile, tracker, field):
+    """Build SlotSet events for fields found in the message other than the one being collected, if not already set."""
+    events = []
+    for key, value in profile.items():
+        if key == field or tracker.get_slot(key):
+            continue
+        if key == "gender_preference":
+            value = ", ".join(value)
+        logger.info(f"Captured {key} for a later stage: {value}")
+        events.append(SlotSet(key, value))
+        if key == "age":
+            events.append(SlotSet("dob", estimate_dob(value)))
+    return events
 
 # --- Conversation Logging ---
 
@@ -112,13 +301,22 @@ class ActionLogConversation(Action):
         return {"messages": [], "slot_history": []}
 
     def _save_file(self, path: Text, data: Dict[str, Any]) -> None:
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+        write_json_atomic(path, data)
+
+    def _append_to_file(self, path: Text, messages: List[Dict[str, Any]], slot_entry: Optional[Dict[str, Any]]) -> None:
+        """Append messages and a slot history entry to the log file."""
+        store = self._load_file(path)
+        store["messages"].extend(messages)
+        if slot_entry:
+            store["slot_history"].append(slot_entry)
+        self._save_file(path, store)
 
     # ------------------------------------------------------------------ Rasa API
     def name(self) -> Text:
         return "action_log_conversation"
 
+    @idempotent_action
+    @with_turn_budget
     async def run(
         self,
         dispatcher: CollectingDispatcher,
@@ -128,7 +326,9 @@ class ActionLogConversation(Action):
 
         sender_id = tracker.sender_id
         log_file  = self._log_path(sender_id)
-        store     = self._load_file(log_file)
+        # Every turn is logged here, so make sure the periodic stats line is running
+        get_stats_reporter().start()
+        messages: List[Dict[str, Any]] = []
         # Get the latest message
         latest_message = tracker.latest_message
 
@@ -138,7 +338,7 @@ class ActionLogConversation(Action):
 
         # ---------------------------------------------------- 1) user message
         if tracker.latest_message and tracker.latest_message.get("text"):
-            store["messages"].append({
+            messages.append({
                 "timestamp":  self._timestamp(),
                 "sender":     sender_id,
                 "text":       tracker.latest_message.get("text", ""),
@@ -157,27 +357,34 @@ class ActionLogConversation(Action):
                  if e.get("event") == "action"),
                 None
             )
-            store["messages"].append({
+            messages.append({
                 "timestamp":  self._timestamp(),
                 "sender":     "bot",
                 "text":       latest_bot_event.get("text", ""),
                 "action":     latest_action,
             })
 
+        # Fold the latest answered turn into the rolling summary, whichever action replied
+        turn = latest_completed_turn(tracker.events)
+        if turn:
+            get_summary_store().record_turn(sender_id, turn["user"], turn["bot"], current_section, turn["message_id"])
+
         # ---------------------------------------------------- 3) slot changes
         slot_changes: Dict[str, Any] = {}
         for e in tracker.events[-self.MAX_SLOT_EVENTS:]:
             if e.get("event") == "slot":
                 slot_changes[e["name"]] = e["value"]
 
+        slot_entry = None
         if slot_changes:
-            store["slot_history"].append({
+            slot_entry = {
                 "timestamp": self._timestamp(),
                 "slots":     copy.deepcopy(slot_changes)
-            })
+            }
 
         # ---------------------------------------------------- persist & exit
-        self._save_file(log_file, store)
+        # (in the background when the turn has a deadline)
+        run_storage(self._append_to_file, log_file, messages, slot_entry)
         # nothing to send back to the user
         return []
 
@@ -216,6 +423,8 @@ class ActionCollectName(Action):
     def name(self) -> Text:
         return "action_collect_name"
 
+    @idempotent_action
+    @with_turn_budget
     async def run(self, dispatcher: CollectingDispatcher,
                   tracker: Tracker,
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -233,24 +442,15 @@ class ActionCollectName(Action):
             dispatcher.utter_message(response="utter_ask_age")
             return [SlotSet("personal_data_stage", 2)]
 
-        # Step 1: Try to extract from entity
+        # Step 1-2: Try the entity, then extract every profile field with one Ollama call
         entities = tracker.latest_message.get("entities", [])
         name_entity = next((e for e in entities if e["entity"] == "name"), None)
-        name = name_entity["value"] if name_entity else None
-
-        # Step 2: If no entity, call Ollama
-        if not name:
-            system_prompt = "You are a helpful assistant that extracts names."
-            user_prompt = f"Extract the first name only from this sentence. If no name is provided, respond with 'None'.\n\nSentence: \"{message}\""
-            name_response = call_ollama_api(system_prompt, user_prompt, max_tokens=10)
-
-            if name_response:
-                cleaned = name_response.strip().strip('"').strip()
-                if cleaned.lower() not in ["none", "no name", ""]:
-                    name = cleaned.capitalize()
-                    logger.info(f"Ollama extracted name: {name}")
-                else:
-                    logger.info("Ollama returned no name.")
+        profile = {}
+        name, tier = await get_extraction_cascade("name").run([
+            ("entity", lambda: name_entity["value"] if name_entity else None),
+            ("llm", lambda: extract_profile_field(profile, message, tracker.sender_id, "name"))
+        ])
+        logger.info(f"Extracted name {name} (tier: {tier})")
         
         # Step 3: Fallback or prompt again
         if not name:
@@ -262,13 +462,15 @@ class ActionCollectName(Action):
         dispatcher.utter_message(text=f"Thank you for providing your name {name}!")
         #ask for age 
         dispatcher.utter_message(response="utter_ask_age")
-        return [SlotSet("name", name), SlotSet("personal_data_stage", 2)]
+        return [SlotSet("name", name), SlotSet("personal_data_stage", 2)] + profile_slot_events(profile, tracker, "name")
     
 
 class ActionCollectAge(Action):
     def name(self) -> Text:
         return "action_collect_age"
 
+    @idempotent_action
+    @with_turn_budget
     async def run(self, dispatcher: CollectingDispatcher,
                   tracker: Tracker,
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -286,19 +488,12 @@ class ActionCollectAge(Action):
         if current_age and str(current_age).strip():
             dispatcher.utter_message(text=f"Thanks for providing you're {current_age}, {name}!")
 
-            # Step 1: Try to extract DOB from Ollama using existing age
+            # Step 1: Estimate DOB from the existing age
             try:
-                system_prompt = "You are a helpful assistant that calculates a date of birth."
-                user_prompt = f"Today is {datetime.now().strftime('%B %d, %Y')}. If someone is {current_age} years old today, what is their date of birth? Format it as YYYY-MM-DD only."
-                dob_response = call_ollama_api(system_prompt, user_prompt, max_tokens=15)
-
-                if dob_response:
-                    dob_clean = dob_response.strip().strip('"').strip()
-                    if re.match(r"\d{4}-\d{2}-\d{2}", dob_clean):
-                        dob = dob_clean
-                        logger.info(f"Ollama extracted dob: {dob}")
-            except Exception as e:
-                logger.error(f"Failed to extract dob using Ollama: {str(e)}")
+                dob = estimate_dob(int(float(current_age)))
+                logger.info(f"Estimated dob: {dob}")
+            except (TypeError, ValueError) as e:
+                logger.error(f"Failed to estimate dob: {str(e)}")
 
             dispatcher.utter_message(response="utter_ask_gender")
             slot_events = [SlotSet("personal_data_stage", 3)]
@@ -306,27 +501,16 @@ class ActionCollectAge(Action):
                 slot_events.append(SlotSet("dob", dob))
             return slot_events
 
-        # Step 1: Try to extract age using entities
+        # Step 1-3: Try entities, then text processing, then one Ollama call for every profile field
         entities = tracker.latest_message.get("entities", [])
         age_entity = next((e for e in entities if e["entity"] == "age"), None)
-        age = age_entity["value"] if age_entity else None
-        
-        # Step 2: If no entity, try to extract using text processing
-        if not age:
-            age = self._extract_age_from_text(message)
-            logger.info(f"Extracted age from text: {age}")
-        
-        # Step 3: If still no age, try Ollama as fallback
-        if not age:
-            system_prompt = "You are a helpful assistant that extracts a user's age from their sentence."
-            user_prompt = f"Extract only the user's age as a number from the following message. If age is provided in words, convert it to a number. If no valid age is found, return 'None'.\n\nMessage: \"{message}\""
-            age_response = call_ollama_api(system_prompt, user_prompt, max_tokens=10)
-
-            if age_response:
-                logger.info(f"Ollama raw response: {age_response}")
-                age_str = age_response.strip().strip('"').strip()
-                if age_str.lower() != "none" and age_str.isdigit():
-                    age = int(age_str)
+        profile = {}
+        age, tier = await get_extraction_cascade("age").run([
+            ("entity", lambda: age_entity["value"] if age_entity else None),
+            ("regex", lambda: self._extract_age_from_text(message)),
+            ("llm", lambda: extract_profile_field(profile, message, tracker.sender_id, "age"))
+        ])
+        logger.info(f"Extracted age {age} (tier: {tier})")
 
         # Step 4: Validate the age
         if age is not None:
@@ -349,19 +533,9 @@ class ActionCollectAge(Action):
             dispatcher.utter_message(text=f"I didn't catch your age, {name}. Could you tell me how old you are? (For example, '25' or 'twenty-five')")
             return []
 
-        # Step 6: Extract DOB using the age
-        try:
-            system_prompt = "You are a helpful assistant that calculates a date of birth."
-            user_prompt = f"Today is {datetime.now().strftime('%B %d, %Y')}. If someone is {age} years old today, what is their date of birth? Format it as YYYY-MM-DD only."
-            dob_response = call_ollama_api(system_prompt, user_prompt, max_tokens=15)
-
-            if dob_response:
-                dob_clean = dob_response.strip().strip('"').strip()
-                if re.match(r"\d{4}-\d{2}-\d{2}", dob_clean):
-                    dob = dob_clean
-                    logger.info(f"Ollama extracted dob: {dob}")
-        except Exception as e:
-            logger.error(f"Failed to extract dob using Ollama: {str(e)}")
+        # Step 6: Estimate DOB from the age - no second Ollama round-trip
+        dob = estimate_dob(age)
+        logger.info(f"Estimated dob: {dob}")
 
         # Step 7: Set slots and proceed
         logger.info(f"Setting age slot to: {age}")
@@ -371,7 +545,7 @@ class ActionCollectAge(Action):
         slot_events = [SlotSet("age", age), SlotSet("personal_data_stage", 3)]
         if dob:
             slot_events.append(SlotSet("dob", dob))
-        return slot_events
+        return slot_events + profile_slot_events(profile, tracker, "age")
         
     def _extract_age_from_text(self, text):
         """Extract age from text using various methods"""
@@ -429,6 +603,8 @@ class ActionCollectGender(Action):
     def name(self) -> Text:
         return "action_collect_gender"
 
+    @idempotent_action
+    @with_turn_budget
     async def run(self, dispatcher: CollectingDispatcher,
                   tracker: Tracker,
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -446,21 +622,15 @@ class ActionCollectGender(Action):
             dispatcher.utter_message(response="utter_ask_gender_preference")
             return [SlotSet("personal_data_stage", 4)]
         
+        # Step 1-2: Try the entity, then extract every profile field with one Ollama call
         entities = tracker.latest_message.get("entities", [])
         gender_entity = next((e for e in entities if e["entity"] == "gender"), None)
-        gender = gender_entity["value"] if gender_entity else None
-
-        # Step 2: Try to extract using Ollama if not found
-        if not gender:
-            system_prompt = "You are a helpful assistant that extracts a user's gender from their message."
-            user_prompt = f"From the following message, extract only the user's gender as one of these values: 'male', 'female', or 'non-binary'. If unclear or missing, respond with 'None'.\n\nMessage: \"{message}\""
-            gender_response = call_ollama_api(system_prompt, user_prompt, max_tokens=10)
-
-            if gender_response:
-                logger.info(f"Ollama raw response: {gender_response}")
-                gender_cleaned = gender_response.strip().strip('"').strip().lower()
-                if gender_cleaned in ["male", "female", "non-binary"]:
-                    gender = gender_cleaned
+        profile = {}
+        gender, tier = await get_extraction_cascade("gender").run([
+            ("entity", lambda: gender_entity["value"] if gender_entity else None),
+            ("llm", lambda: extract_profile_field(profile, message, tracker.sender_id, "gender"))
+        ])
+        logger.info(f"Extracted gender {gender} (tier: {tier})")
 
         # Step 3: Ask again if nothing found
         if not gender:
@@ -471,13 +641,15 @@ class ActionCollectGender(Action):
         logger.info(f"Setting gender slot to: {gender}")
         dispatcher.utter_message(text=f"Thanks for sharing that you identify as {gender}, {name}!")
         dispatcher.utter_message(response="utter_ask_gender_preference")
-        return [SlotSet("gender", gender), SlotSet("personal_data_stage", 4)]
+        return [SlotSet("gender", gender), SlotSet("personal_data_stage", 4)] + profile_slot_events(profile, tracker, "gender")
 
 
 class ActionCollectGenderPreference(Action):
     def name(self) -> Text:
         return "action_collect_gender_preference"
 
+    @idempotent_action
+    @with_turn_budget
     async def run(self, dispatcher: CollectingDispatcher,
                  tracker: Tracker,
                  domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -513,29 +685,13 @@ class ActionCollectGenderPreference(Action):
             if value and value not in preferences:
                 preferences.append(value)
         
-        # Step 3: If no entities found, try to extract using Ollama
-        if not preferences:
-            system_prompt = "You are a helpful assistant extracting gender preferences from text."
-            user_prompt = f"""
-            Extract the gender preference(s) from this message: "{message}"
-            Valid preferences are 'male', 'female', 'non-binary', 'everyone', or 'everyone'
-            If multiple preferences are mentioned (like "both men and women"), list all of them separated by commas.
-            If no preference is specified or unclear, return 'unclear'.
-            For 'both' or similar terms indicating multiple genders, return the specific genders if possible.
-            Format your response as a simple comma-separated list without explanation.
-            """
-            preference_response = call_ollama_api(system_prompt, user_prompt, max_tokens=20)
-            
-            if preference_response:
-                extracted_preferences = preference_response.strip().strip('"').strip().lower()
-                if extracted_preferences and extracted_preferences != "unclear":
-                    for pref in extracted_preferences.split(','):
-                        clean_pref = pref.strip()
-                        if clean_pref and clean_pref not in preferences:
-                            preferences.append(clean_pref)
-        
-        # Step 4: Process and normalize the preferences
-        normalized_preferences = self._normalize_preferences(preferences)
+        # Step 3-4: Normalize the entity preferences, else extract every profile field with one Ollama call
+        profile = {}
+        normalized_preferences, tier = await get_extraction_cascade("gender_preference").run([
+            ("entity", lambda: preferences),
+            ("llm", lambda: extract_profile_field(profile, message, tracker.sender_id, "gender_preference"))
+        ], validate=self._normalize_preferences)
+        logger.info(f"Extracted gender preferences {normalized_preferences} (tier: {tier})")
         
         # Step 5: Ask again if no preferences found
         if not normalized_preferences:
@@ -556,7 +712,7 @@ class ActionCollectGenderPreference(Action):
         # Combine multiple preferences with a comma if there are more than one
         combined_preference = ", ".join(normalized_preferences) if len(normalized_preferences) > 1 else normalized_preferences[0]
         
-        return [SlotSet("gender_preference", combined_preference), SlotSet("personal_data_stage", 5)]
+        return [SlotSet("gender_preference", combined_preference), SlotSet("personal_data_stage", 5)] + profile_slot_events(profile, tracker, "gender_preference")
     
     def _normalize_preferences(self, preferences):
         """Normalize and standardize gender preferences"""
@@ -670,6 +826,8 @@ class ActionCollectAgePreference(Action):
     def name(self) -> Text:
         return "action_collect_age_preference"
 
+    @idempotent_action
+    @with_turn_budget
     async def run(self, dispatcher: CollectingDispatcher,
                   tracker: Tracker,
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -688,21 +846,15 @@ class ActionCollectAgePreference(Action):
             dispatcher.utter_message(response="utter_ask_height")
             return [SlotSet("personal_data_stage", 6)]
         
+        # Step 1-2: Try the entity, then extract every profile field with one Ollama call
         entities = tracker.latest_message.get("entities", [])
         age_pref_entity = next((e for e in entities if e["entity"] == "age_preference"), None)
-        age_pref = age_pref_entity["value"] if age_pref_entity else None
-
-        # Step 2: Try Ollama if regex didn't work
-        if not age_preference:
-            system_prompt = "You are a helpful assistant that extracts age preferences for dating."
-            user_prompt = f"From the following message, extract the age range the user is interested in, in the format '25-35'. If no range is given, respond with 'None'.\n\nMessage: \"{message}\""
-            age_response = call_ollama_api(system_prompt, user_prompt, max_tokens=10)
-
-            if age_response:
-                logger.info(f"Ollama raw response: {age_response}")
-                cleaned = age_response.strip().strip('"').strip()
-                if re.match(r'^\d{2,3}(-\d{2,3})?$', cleaned):
-                    age_preference = cleaned
+        profile = {}
+        age_preference, tier = await get_extraction_cascade("age_preference").run([
+            ("entity", lambda: age_pref_entity["value"] if age_pref_entity else None),
+            ("llm", lambda: extract_profile_field(profile, message, tracker.sender_id, "age_preference"))
+        ])
+        logger.info(f"Extracted age preference {age_preference} (tier: {tier})")
 
         # Step 3: Ask again if not extracted
         if not age_preference:
@@ -713,13 +865,15 @@ class ActionCollectAgePreference(Action):
         logger.info(f"Setting age_preference slot to: {age_preference}")
         dispatcher.utter_message(text=f"Thanks for sharing your age preference, {name}!")
         dispatcher.utter_message(response="utter_ask_height")
-        return [SlotSet("age_preference", age_preference), SlotSet("personal_data_stage", 6)]
+        return [SlotSet("age_preference", age_preference), SlotSet("personal_data_stage", 6)] + profile_slot_events(profile, tracker, "age_preference")
 
 
 class ActionCollectHeight(Action):
     def name(self) -> Text:
         return "action_collect_height"
 
+    @idempotent_action
+    @with_turn_budget
     async def run(self, dispatcher: CollectingDispatcher,
                   tracker: Tracker,
                   domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -738,21 +892,15 @@ class ActionCollectHeight(Action):
             dispatcher.utter_message(response="utter_ask_interests")
             return [SlotSet("personal_data_stage", 7)]
         
+        # Step 1-2: Try the entity, then extract every profile field with one Ollama call
         entities = tracker.latest_message.get("entities", [])
         height_entity = next((e for e in entities if e["entity"] == "height"), None)
-        height = height_entity["value"] if height_entity else None
-
-        # Step 2: Try Ollama fallback if pattern matching fails
-        if not height:
-            system_prompt = "You are a helpful assistant that extracts a person's height."
-            user_prompt = f"Extract the user's height from the following message. Return it in the format 5'10\" for feet/inches or 178cm for centimeters. If no valid height is found, respond with 'None'.\n\nMessage: \"{message}\""
-            height_response = call_ollama_api(system_prompt, user_prompt, max_tokens=15)
-
-            if height_response:
-                logger.info(f"Ollama raw response: {height_response}")
-                cleaned = height_response.strip().strip('"').strip()
-                if re.match(r"^\d{3}cm$", cleaned) or re.match(r"^\d'\d{1,2}\"$", cleaned):
-                    height = cleaned
+        profile = {}
+        height, tier = await get_extraction_cascade("height").run([
+            ("entity", lambda: height_entity["value"] if height_entity else None),
+            ("llm", lambda: extract_profile_field(profile, message, tracker.sender_id, "height"))
+        ])
+        logger.info(f"Extracted height {height} (tier: {tier})")
 
         # Step 3: Ask again if still no valid height
         if not height:
@@ -763,7 +911,7 @@ class ActionCollectHeight(Action):
         logger.info(f"Setting height slot to: {height}")
         dispatcher.utter_message(text=f"Thanks for sharing that you're {height} tall, {name}!")
         dispatcher.utter_message(response="utter_ask_interests")
-        return [SlotSet("height", height), SlotSet("personal_data_stage", 7)]
+        return [SlotSet("height", height), SlotSet("personal_data_stage", 7)] + profile_slot_events(profile, tracker, "height")
 
 
 # --- Topic Management & User Info / Preferences Actions ---
@@ -789,17 +937,16 @@ class ActionGenerateResponseUserInfo(Action):
     def name(self) -> Text:
         return "action_generate_response_user_info"
 
+    @idempotent_action
+    @with_turn_budget
     async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         """Generate a personalized response based on user information using advanced AI."""
-        # Initialize the conversation logger to access history
+        # Initialize the conversation logger to record the reply
         conversation_logger = ConversationLogger()
         
         # Get the conversation ID (sender_id)
         conversation_id = tracker.sender_id
         
-        # Get the full conversation history
-        conversation_history = conversation_logger.get_conversation_history(conversation_id)
-        
         # Get user entities from storage
         user_entities = self._get_user_entities(conversation_id)
         
@@ -816,63 +963,49 @@ class ActionGenerateResponseUserInfo(Action):
             return []
         
         try:
-            # Create a context summary from conversation history
-            context_summary = self._create_context_summary(conversation_history)
+            # Use the rolling summary instead of re-reading the full conversation log
+            summary = get_summary_store().get(conversation_id)
             
             # Create a user profile summary from entities
             user_profile = self._create_user_profile(user_entities)
             
             # Create the advanced prompt with roleplay persona
-            system_message = """
-**Adopt the Roleplay Persona:**
-    
-- Roleplay as an incredibly smart, futuristic AI friend with extraordinary intuition and insight—imagine a being whose abilities far exceed those of standard GPT-4.
-- Let your language be warm, engaging, and slightly whimsical, reflecting a futuristic charm and an empathetic listening ear.
-
-**Comprehensive Context Gathering:**
-    
-- **User Metadata & Information:** Analyze all available metadata and previously shared details about the user.
-- **Conversation History:** Review past exchanges to capture recurring themes, mood shifts, and key topics discussed.
-
-**Deep Sentiment & Personality Analysis:**
-    
-- **Emotional Tone:** Detect sentiment cues—enthusiasm, hesitation, curiosity, or even frustration—to understand the user's emotional state.
-- **Personality & Intent:** Infer the user's personality traits and needs. Consider what they might be seeking in the conversation (validation, deep connection, casual banter, etc.).
-
-**Tailored Response Strategy with Roleplay:**
-    
-- **Engagement Maximization:** Identify natural points to invite the user to share more. Consider gentle, open-ended prompts that align with the user's current mood and interests.
-- **Futuristic & Empathetic Voice:** Frame your response in a way that reflects your advanced abilities and caring nature. For example, use phrases like "I sense a fascinating journey unfolding…" or "Your unique story shines like a beacon in this digital cosmos."
-- **Layered Unpacking:** Internally, break down your reasoning—first assess the user's state, then determine what might make them feel understood and encouraged, and finally craft a response that naturally invites further conversation.
-
-**Final Check:**
-    
-- Ensure the final output is concise, natural, and organic.
-- Do not reveal your internal chain-of-thought; only the final, roleplayed response should be visible to the user.
-
-You are helping the user build their dating profile by understanding their interests, personality, and preferences.
-"""
+            system_message = USER_INFO_PERSONA
             
-            # Create the user message with context
-            user_message = f"""
-USER PROFILE:
-{user_profile}
-
-CONVERSATION HISTORY:
-{context_summary}
-
-CURRENT SECTION: {current_section}
-
-LATEST MESSAGE: {latest_message}
-
-Based on this information, generate a thoughtful, personalized response that helps the user share more about themselves.
-"""
+            # Create the user message with context, trimmed to the generation budget
+            # (older history goes first, the latest message and instruction always stay)
+            user_message = (
+                PromptBuilder("generation", system_message)
+                .add("profile", user_profile, PRIORITY_PROFILE, header="USER PROFILE:\n")
+                .add("summary", summary.render_earlier(), PRIORITY_SUMMARY, keep="tail")
+                .add("history", summary.render_recent() or "No previous conversation.", PRIORITY_RECENT_TURNS,
+                     header="CONVERSATION HISTORY:\n", keep="tail")
+                .add("section", current_section, PRIORITY_LATEST_MESSAGE, header="CURRENT SECTION: ")
+                .add("latest_message", latest_message, PRIORITY_LATEST_MESSAGE, header="LATEST MESSAGE: ")
+                .add("instruction", "Based on this information, generate a thoughtful, personalized response that helps the user share more about themselves.", PRIORITY_INSTRUCTION)
+                .build()
+            )
+            
+            # Later turns in the session carry only what is new
+            turn_message = (
+                PromptBuilder("generation", system_message)
+                .add("profile", user_profile, PRIORITY_PROFILE, header="USER PROFILE:\n")
+                .add("section", current_section, PRIORITY_LATEST_MESSAGE, header="CURRENT SECTION: ")
+                .add("latest_message", latest_message, PRIORITY_LATEST_MESSAGE, header="LATEST MESSAGE: ")
+                .add("instruction", "Respond to the latest message in a way that helps the user share more about themselves.", PRIORITY_INSTRUCTION)
+                .build()
+            )
             
             # Log the prompt for debugging
             logger.info(f"Sending advanced prompt to Ollama for user {conversation_id}")
             
-            # Call Ollama API using our custom function
-            ai_response = call_ollama_api(system_message, user_message, max_tokens=300, temperature=0.7)
+            # Call Ollama API in the sender's session, streaming chunks when enabled;
+            # cancelled if a newer message arrives for the sender first
+            ai_response = await get_generation_tracker().run(
+                conversation_id,
+                generation_key(tracker),
+                lambda: generate_persona_reply(conversation_id, system_message, user_message, turn_message, max_tokens=300, temperature=0.7)
+            )
             
             # Log the response
             logger.info(f"Generated response: {ai_response}")
@@ -881,15 +1014,27 @@ Based on this information, generate a thoughtful, personalized response that hel
             dispatcher.utter_message(text=ai_response)
             
             # Log the bot message
-            conversation_logger.log_bot_message(
+            run_storage(
+                conversation_logger.log_bot_message,
                 sender_id=conversation_id,
                 message=ai_response,
                 action=self.name(),
                 section=current_section
             )
             
+            # Fold the turn into the rolling summary
+            if ai_response not in (OLLAMA_UNEXPECTED_RESPONSE, OLLAMA_ERROR_RESPONSE):
+                get_summary_store().record_turn(conversation_id, latest_message, ai_response, current_section, message_key(tracker))
+            
             return []
             
+        except StaleGenerationError as e:
+            logger.info(f"Dropping stale reply: {str(e)}")
+            return []
+        except (DeadlineExceededError, QuotaExceededError) as e:
+            logger.warning(f"Skipping generated response, using the default reply: {str(e)}")
+            dispatcher.utter_message(text="I'd love to hear more about your interests and what makes you unique. Could you share a bit more about yourself?")
+            return []
         except Exception as e:
             logger.error(f"Error generating response with Ollama: {str(e)}")
             dispatcher.utter_message(text="I'd love to hear more about your interests and what makes you unique. Could you share a bit more about yourself?")
@@ -909,23 +1054,6 @@ Based on this information, generate a thoughtful, personalized response that hel
         # Return empty entities if file doesn't exist or has errors
         return {"user_id": user_id, "entities": {}}
     
-    def _create_context_summary(self, conversation_history: List[Dict[str, Any]]) -> str:
-        """Create a summary of the conversation history."""
-        if not conversation_history:
-            return "No previous conversation."
-        
-        # Get the last 10 messages for context
-        recent_messages = conversation_history[-10:]
-        
-        # Format the messages
-        formatted_messages = []
-        for message in recent_messages:
-            sender = message.get('sender', '').upper()
-            content = message.get('content', '')
-            formatted_messages.append(f"{sender}: {content}")
-        
-        return "\n".join(formatted_messages)
-    
     def _create_user_profile(self, user_entities: Dict[str, Any]) -> str:
         """Create a summary of the user profile from entities."""
         entities = user_entities.get("entities", {})
@@ -1020,17 +1148,16 @@ class ActionGenerateResponseUserPref(Action):
     def name(self) -> Text:
         return "action_generate_response_user_pref"
 
+    @idempotent_action
+    @with_turn_budget
     async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         """Generate a personalized response based on user preferences using advanced AI."""
-        # Initialize the conversation logger to access history
+        # Initialize the conversation logger to record the reply
         conversation_logger = ConversationLogger()
         
         # Get the conversation ID (sender_id)
         conversation_id = tracker.sender_id
         
-        # Get the full conversation history
-        conversation_history = conversation_logger.get_conversation_history(conversation_id)
-        
         # Get user entities from storage
         user_entities = self._get_user_entities(conversation_id)
         
@@ -1047,63 +1174,49 @@ class ActionGenerateResponseUserPref(Action):
             return []
         
         try:
-            # Create a context summary from conversation history
-            context_summary = self._create_context_summary(conversation_history)
+            # Use the rolling summary instead of re-reading the full conversation log
+            summary = get_summary_store().get(conversation_id)
             
             # Create a user profile summary from entities
             user_profile = self._create_user_profile(user_entities)
             
             # Create the advanced prompt with roleplay persona
-            system_message = """
-**Adopt the Roleplay Persona:**
-    
-- Roleplay as an incredibly smart, futuristic AI friend with extraordinary intuition and insight—imagine a being whose abilities far exceed those of standard GPT-4.
-- Let your language be warm, engaging, and slightly whimsical, reflecting a futuristic charm and an empathetic listening ear.
-
-**Comprehensive Context Gathering:**
-    
-- **User Metadata & Information:** Analyze all available metadata and previously shared details about the user.
-- **Conversation History:** Review past exchanges to capture recurring themes, mood shifts, and key topics discussed.
-
-**Deep Sentiment & Personality Analysis:**
-    
-- **Emotional Tone:** Detect sentiment cues—enthusiasm, hesitation, curiosity, or even frustration—to understand the user's emotional state.
-- **Personality & Intent:** Infer the user's personality traits and needs. Consider what they might be seeking in the conversation (validation, deep connection, casual banter, etc.).
-
-**Tailored Response Strategy with Roleplay:**
-    
-- **Engagement Maximization:** Identify natural points to invite the user to share more. Consider gentle, open-ended prompts that align with the user's current mood and interests.
-- **Futuristic & Empathetic Voice:** Frame your response in a way that reflects your advanced abilities and caring nature. For example, use phrases like "I sense a fascinating journey unfolding…" or "Your unique story shines like a beacon in this digital cosmos."
-- **Layered Unpacking:** Internally, break down your reasoning—first assess the user's state, then determine what might make them feel understood and encouraged, and finally craft a response that naturally invites further conversation.
-
-**Final Check:**
-    
-- Ensure the final output is concise, natural, and organic.
-- Do not reveal your internal chain-of-thought; only the final, roleplayed response should be visible to the user.
-
-You are helping the user build their dating profile by understanding what they're looking for in a partner and their preferences.
-"""
+            system_message = USER_PREF_PERSONA
             
-            # Create the user message with context
-            user_message = f"""
-USER PROFILE:
-{user_profile}
-
-CONVERSATION HISTORY:
-{context_summary}
-
-CURRENT SECTION: {current_section}
-
-LATEST MESSAGE: {latest_message}
-
-Based on this information, generate a thoughtful, personalized response that helps the user share more about their preferences and what they're looking for in a partner.
-"""
+            # Create the user message with context, trimmed to the generation budget
+            # (older history goes first, the latest message and instruction always stay)
+            user_message = (
+                PromptBuilder("generation", system_message)
+                .add("profile", user_profile, PRIORITY_PROFILE, header="USER PROFILE:\n")
+                .add("summary", summary.render_earlier(), PRIORITY_SUMMARY, keep="tail")
+                .add("history", summary.render_recent() or "No previous conversation.", PRIORITY_RECENT_TURNS,
+                     header="CONVERSATION HISTORY:\n", keep="tail")
+                .add("section", current_section, PRIORITY_LATEST_MESSAGE, header="CURRENT SECTION: ")
+                .add("latest_message", latest_message, PRIORITY_LATEST_MESSAGE, header="LATEST MESSAGE: ")
+                .add("instruction", "Based on this information, generate a thoughtful, personalized response that helps the user share more about their preferences and what they're looking for in a partner.", PRIORITY_INSTRUCTION)
+                .build()
+            )
+            
+            # Later turns in the session carry only what is new
+            turn_message = (
+                PromptBuilder("generation", system_message)
+                .add("profile", user_profile, PRIORITY_PROFILE, header="USER PROFILE:\n")
+                .add("section", current_section, PRIORITY_LATEST_MESSAGE, header="CURRENT SECTION: ")
+                .add("latest_message", latest_message, PRIORITY_LATEST_MESSAGE, header="LATEST MESSAGE: ")
+                .add("instruction", "Respond to the latest message in a way that helps the user share more about their preferences and what they're looking for in a partner.", PRIORITY_INSTRUCTION)
+                .build()
+            )
             
             # Log the prompt for debugging
             logger.info(f"Sending advanced prompt to Ollama for user {conversation_id}")
             
-            # Call Ollama API using our custom function
-            ai_response = call_ollama_api(system_message, user_message, max_tokens=300, temperature=0.7)
+            # Call Ollama API in the sender's session, streaming chunks when enabled;
+            # cancelled if a newer message arrives for the sender first
+            ai_response = await get_generation_tracker().run(
+                conversation_id,
+                generation_key(tracker),
+                lambda: generate_persona_reply(conversation_id, system_message, user_message, turn_message, max_tokens=300, temperature=0.7)
+            )
             
             # Log the response
             logger.info(f"Generated response: {ai_response}")
@@ -1112,15 +1225,27 @@ Based on this information, generate a thoughtful, personalized response that hel
             dispatcher.utter_message(text=ai_response)
             
             # Log the bot message
-            conversation_logger.log_bot_message(
+            run_storage(
+                conversation_logger.log_bot_message,
                 sender_id=conversation_id,
                 message=ai_response,
                 action=self.name(),
                 section=current_section
             )
             
+            # Fold the turn into the rolling summary
+            if ai_response not in (OLLAMA_UNEXPECTED_RESPONSE, OLLAMA_ERROR_RESPONSE):
+                get_summary_store().record_turn(conversation_id, latest_message, ai_response, current_section, message_key(tracker))
+            
             return []
             
+        except StaleGenerationError as e:
+            logger.info(f"Dropping stale reply: {str(e)}")
+            return []
+        except (DeadlineExceededError, QuotaExceededError) as e:
+            logger.warning(f"Skipping generated response, using the default reply: {str(e)}")
+            dispatcher.utter_message(text="I'd love to understand more about what you're looking for in a partner. Could you share some qualities that are important to you?")
+            return []
         except Exception as e:
             logger.error(f"Error generating response with Ollama: {str(e)}")
             dispatcher.utter_message(text="I'd love to understand more about what you're looking for in a partner. Could you share some qualities that are important to you?")
@@ -1140,23 +1265,6 @@ Based on this information, generate a thoughtful, personalized response that hel
         # Return empty entities if file doesn't exist or has errors
         return {"user_id": user_id, "entities": {}}
     
-    def _create_context_summary(self, conversation_history: List[Dict[str, Any]]) -> str:
-        """Create a summary of the conversation history."""
-        if not conversation_history:
-            return "No previous conversation."
-        
-        # Get the last 10 messages for context
-        recent_messages = conversation_history[-10:]
-        
-        # Format the messages
-        formatted_messages = []
-        for message in recent_messages:
-            sender = message.get('sender', '').upper()
-            content = message.get('content', '')
-            formatted_messages.append(f"{sender}: {content}")
-        
-        return "\n".join(formatted_messages)
-    
     def _create_user_profile(self, user_entities: Dict[str, Any]) -> str:
         """Create a summary of the user profile from entities."""
         entities = user_entities.get("entities", {})
@@ -1242,6 +1350,8 @@ class ActionDetermineUserIntent(Action):
     def name(self) -> Text:
         return "action_determine_user_intent"
 
+    @idempotent_action
+    @with_turn_budget
     async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         logger.info("Determining user intent...")
         # Get the latest user message
@@ -1272,7 +1382,7 @@ class ActionDetermineUserIntent(Action):
                 
                 # Call Ollama API
                 logger.info(f"Sending intent analysis prompt to Ollama for user {conversation_id}")
-                ai_response = call_ollama_api(system_message, user_message, max_tokens=100, temperature=0.2)
+                ai_response = await call_ollama_api(system_message, user_message, max_tokens=100, temperature=0.2, call_type="intent", sender_id=conversation_id)
                 
                 logger.info(f"Ollama intent analysis: {ai_response}")
                 
@@ -1360,6 +1470,8 @@ class ActionUpdateMetadata(Action):
     def name(self) -> Text:
         return "action_update_metadata"
 
+    @idempotent_action
+    @with_turn_budget
     async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         """Update metadata with current slot values."""
         logger.info("ActionUpdateMetadata executed - Updating metadata...")
@@ -1403,7 +1515,7 @@ class ActionUpdateMetadata(Action):
         
         try:
             # Update the metadata in the conversation log
-            self.logger.update_metadata(conversation_id, metadata)
+            run_storage(self.logger.update_metadata, conversation_id, metadata)
             logger.info(f"Metadata updated with: {', '.join(metadata.keys())}")
             
             # Create a direct test file for verification
@@ -1442,9 +1554,16 @@ class ActionUpdateMetadata(Action):
             return []
 
 class ActionOllamaFallback(Action):
+    def __init__(self):
+        super().__init__()
+        # Load the reply bank when the action server starts, so a missing bank is reported up front
+        get_fallback_bank()
+    
     def name(self) -> Text:
         return "action_ollama_fallback"
     
+    @idempotent_action
+    @with_turn_budget
     async def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         """Run the action"""
         # Initialize events list to track slot updates
@@ -1627,61 +1746,15 @@ class ActionOllamaFallback(Action):
                 dispatcher.utter_message(text="Now, tell me about your interests. What do you enjoy doing in your free time?")
                 return events
             
-            # First try standard pattern matching for common height formats
-            feet_inches_match = re.search(r'(\d+)\s*(?:\'|feet|foot|ft)(?:\s*|-)(\d+)\s*(?:"|inches|inch|in)?', message_lower)
-            if feet_inches_match:
-                feet = int(feet_inches_match.group(1))
-                inches = int(feet_inches_match.group(2))
-                height = f"{feet}'{inches}\""
-                logger.info(f"Extracted height {height} (feet/inches format)")
-            elif re.search(r'(\d+)\s*(?:cm|centimeters|centimeter)', message_lower):
-                cm_match = re.search(r'(\d+)\s*(?:cm|centimeters|centimeter)', message_lower)
-                cm = int(cm_match.group(1))
-                height = f"{cm}cm"
-                logger.info(f"Extracted height {height} (cm format with unit)")
-            elif re.search(r'\b(\d+)\b', message_lower):
-                # Just a number - try to determine if it's inches or cm
-                number_match = re.search(r'\b(\d+)\b', message_lower)
-                number = int(number_match.group(1))
-                
-                # If number is between 150-220, assume it's cm
-                if 150 <= number <= 220:
-                    height = f"{number}cm"
-                    logger.info(f"Extracted height {height} (assumed cm based on value range)")
-                # If number is between 48-84, assume it's inches
-                elif 48 <= number <= 84:
-                    feet = number // 12
-                    remaining_inches = number % 12
-                    height = f"{feet}'{remaining_inches}\""
-                    logger.info(f"Extracted height {height} (converted from inches)")
-                # If number is between 4-7, assume it's feet
-                elif 4 <= number <= 7:
-                    height = f"{number}'0\""
-                    logger.info(f"Extracted height {height} (assumed feet only)")
-            
-            # If standard pattern matching failed, use Ollama to interpret the height
-            if not height and OLLAMA_AVAILABLE:
-                try:
-                    logger.info(f"Using Ollama to interpret height from: '{message_text}'")
-                    client = ollama.Client(OLLAMA_API_HOST, OLLAMA_MODEL, timeout=300.0)  # Increase timeout to 300 seconds
-                    
-                    height_prompt = [
-                        {"role": "system", "content": "You are a helpful assistant that extracts height information from user messages. Extract the height and convert it to a standard format (either X'Y\" or Zcm). If the input is just a number without units, determine if it's likely cm (if 150-220) or feet (if 4-7) based on the value. Return ONLY the formatted height value without any explanation or additional text."},
-                        {"role": "user", "content": f"Extract height from this message: '{message_text}'"}
-                    ]
-                    
-                    response = client.generate_content(height_prompt[0]["content"], height_prompt[1]["content"])
-                    
-                    extracted_height = response.choices[0].message.content.strip()
-                    
-                    # Validate the extracted height
-                    if re.search(r'^\d+\'\d+\"$', extracted_height) or re.search(r'^\d+cm$', extracted_height):
-                        height = extracted_height
-                        logger.info(f"Ollama extracted height: {height}")
-                    else:
-                        logger.info(f"Ollama couldn't extract a valid height format from: '{extracted_height}'")
-                except Exception as e:
-                    logger.error(f"Error using Ollama to interpret height: {str(e)}")
+            # Try the height patterns in order, then Ollama to interpret the height
+            tiers = [
+                ("feet_inches", lambda: self._height_from_feet_inches(message_lower)),
+                ("cm", lambda: self._height_from_cm(message_lower)),
+                ("number", lambda: self._height_from_number(message_lower))
+            ]
+            if OLLAMA_AVAILABLE:
+                tiers.append(("llm", lambda: self._height_from_ollama(message_text)))
+            height, tier = await get_extraction_cascade("fallback_height").run(tiers)
             
             if height:
                 logger.info(f"Extracted height {height} from fallback message")
@@ -1726,44 +1799,60 @@ class ActionOllamaFallback(Action):
                 dispatcher.utter_message(text="Now, tell me about your interests. What do you enjoy doing in your free time?")
                 return events
         
-        # If we couldn't extract structured information, use Ollama to generate a response
-        if OLLAMA_AVAILABLE:
+        section = fallback_section(personal_data_stage, tracker.get_slot("current_section"))
+        
+        # If we couldn't extract structured information, answer from the pre-generated bank,
+        # or use Ollama to generate a response when live generation is switched on
+        if FALLBACK_LIVE_GENERATION and OLLAMA_AVAILABLE:
             try:
-                logger.info(f"Ollama is available, attempting to generate response with model: {OLLAMA_MODEL[:5]}...")
-                client = ollama.Client(OLLAMA_API_HOST, OLLAMA_MODEL, timeout=300.0)  # Increase timeout to 300 seconds
-                
-                # Create a context-aware system message based on the current stage
-                system_message = "You are Hapa, a friendly dating profile assistant with a cat-like personality. You help users create their dating profiles by collecting information in a conversational way. You use cat puns and playful language. Keep responses brief and engaging."
-                
-                if personal_data_stage == 1:
-                    system_message += " You're currently trying to collect the user's age. If they provide an age, acknowledge it and ask for their gender next."
-                elif personal_data_stage == 2:
-                    system_message += " You're currently trying to collect the user's gender. If they provide their gender, acknowledge it and ask for their gender preference next."
-                elif personal_data_stage == 3:
-                    system_message += " You're currently trying to collect the user's gender preference. If they provide their gender preference, acknowledge it and ask for their age preference next."
-                elif personal_data_stage == 4:
-                    system_message += " You're currently trying to collect the user's age preference. If they provide an age preference, acknowledge it and ask for their height next."
-                elif personal_data_stage == 5:
-                    system_message += " You're currently trying to collect the user's age preference. If they provide an age preference, acknowledge it and ask for their height next."
-                elif personal_data_stage == 6:
-                    system_message += " You're currently trying to collect the user's height. If they provide their height, acknowledge it and ask about their interests next."
+                # Repeated and near-duplicate out-of-scope messages are answered from the reply cache
+                stage_key = bank_key(personal_data_stage, section)
+                cacheable = get_fallback_cache().cacheable(message_text)
+                ai_response = get_fallback_cache().get(stage_key, message_text, name)
+                from_cache = ai_response is not None
+                if from_cache:
+                    logger.info(f"Serving cached fallback response: {ai_response}")
                 else:
-                    system_message += " You're currently helping the user build their dating profile by collecting their personal information."
+                    logger.info(f"Ollama is available, attempting to generate response with model: {OLLAMA_MODEL[:5]}...")
+                    # Create a context-aware system message based on the current stage
+                    system_message = fallback_system_message(personal_data_stage, section)
+                    if cacheable:
+                        # The reply may be served to other users, so it must not repeat details of this message
+                        system_message += BANK_INSTRUCTION
                 
-                messages = [
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": message_text}
-                ]
+                    # Keep very long messages within the fallback prompt budget
+                    user_message = (
+                        PromptBuilder("fallback", system_message)
+                        .add("latest_message", message_text, PRIORITY_LATEST_MESSAGE)
+                        .build()
+                        .strip()
+                    )
                 
-                logger.info(f"Sending messages to Ollama: {messages}")
+                    messages = [
+                        {"role": "system", "content": system_message},
+                        {"role": "user", "content": user_message}
+                    ]
                 
-                response = client.generate_content(system_message, message_text)
+                    logger.info(f"Sending messages to Ollama: {messages}")
                 
-                ai_response = response.choices[0].message.content
-                logger.info(f"Generated Ollama fallback response: {ai_response}")
+                    ai_response = await get_generation_tracker().run(
+                        tracker.sender_id,
+                        generation_key(tracker),
+                        lambda: call_ollama_api(system_message, user_message, call_type="fallback", sender_id=tracker.sender_id),
+                        call_type="fallback"
+                    )
+                    logger.info(f"Generated Ollama fallback response: {ai_response}")
+                    if ai_response in (OLLAMA_ERROR_RESPONSE, OLLAMA_UNEXPECTED_RESPONSE):
+                        # The call failed; answer from the bank rather than uttering the error placeholder
+                        banked_reply = get_fallback_bank().reply(tracker.sender_id, personal_data_stage, section, name)
+                        dispatcher.utter_message(text=banked_reply or f"I'm having trouble understanding. Could you please provide more information?")
+                        return events
+                    if cacheable:
+                        get_fallback_cache().add(stage_key, message_text, ai_response, name)
+                    ai_response = ai_response.replace(NAME_PLACEHOLDER, name)
                 
-                # Try to extract information from the AI response as well
-                if personal_data_stage == 1 and not age:
+                # Try to extract information from the AI response as well, unless it was generated for someone else
+                if not from_cache and personal_data_stage == 1 and not age:
                     age_match = re.search(r'\b(\d+)\b', ai_response)
                     if age_match:
                         age = int(age_match.group(1))
@@ -1772,7 +1861,7 @@ class ActionOllamaFallback(Action):
                             events.append(SlotSet("age", age))
                             events.append(SlotSet("personal_data_stage", 2))
                 
-                elif personal_data_stage == 2 and not gender:
+                elif not from_cache and personal_data_stage == 2 and not gender:
                     ai_response_lower = ai_response.lower()
                     if "female" in ai_response_lower or "woman" in ai_response_lower or "girl" in ai_response_lower:
                         gender = "female"
@@ -1789,13 +1878,92 @@ class ActionOllamaFallback(Action):
                 dispatcher.utter_message(text=ai_response)
                 return events
                 
+            except StaleGenerationError as e:
+                logger.info(f"Dropping stale fallback reply: {str(e)}")
+                return events
+            except (DeadlineExceededError, QuotaExceededError) as e:
+                logger.warning(f"Skipping live fallback reply, using the bank: {str(e)}")
+                banked_reply = get_fallback_bank().reply(tracker.sender_id, personal_data_stage, section, name)
+                dispatcher.utter_message(text=banked_reply or f"I'm having trouble understanding. Could you please provide more information?")
+                return events
             except Exception as e:
                 logger.error(f"Error generating Ollama response: {str(e)}")
-                dispatcher.utter_message(text=f"I'm having trouble understanding. Could you please provide more information?")
+                banked_reply = get_fallback_bank().reply(tracker.sender_id, personal_data_stage, section, name)
+                dispatcher.utter_message(text=banked_reply or f"I'm having trouble understanding. Could you please provide more information?")
                 return events
         else:
-            logger.warning(f"Ollama not available (OLLAMA_AVAILABLE={OLLAMA_AVAILABLE}), using conversational fallback")
+            banked_reply = get_fallback_bank().reply(tracker.sender_id, personal_data_stage, section, name)
+            if banked_reply:
+                dispatcher.utter_message(text=banked_reply)
+                return events
+            logger.warning(f"No banked fallback reply for stage {personal_data_stage} ({section}), using conversational fallback")
             dispatcher.utter_message(text=f"Meow! I'm not quite sure how to respond to that, {name}. Let's continue with your profile. What would you like to share next?")
             return events
 
+    def _height_from_feet_inches(self, message_lower):
+        """Extract a height written in feet and inches."""
+        feet_inches_match = re.search(r'(\d+)\s*(?:\'|feet|foot|ft)(?:\s*|-)(\d+)\s*(?:"|inches|inch|in)?', message_lower)
+        if feet_inches_match:
+            feet = int(feet_inches_match.group(1))
+            inches = int(feet_inches_match.group(2))
+            height = f"{feet}'{inches}\""
+            logger.info(f"Extracted height {height} (feet/inches format)")
+            return height
+        return None
+
+    def _height_from_cm(self, message_lower):
+        """Extract a height written in centimeters."""
+        cm_match = re.search(r'(\d+)\s*(?:cm|centimeters|centimeter)', message_lower)
+        if cm_match:
+            height = f"{int(cm_match.group(1))}cm"
+            logger.info(f"Extracted height {height} (cm format with unit)")
+            return height
+        return None
+
+    def _height_from_number(self, message_lower):
+        """Interpret a bare number as cm, inches or feet based on its value."""
+        number_match = re.search(r'\b(\d+)\b', message_lower)
+        if not number_match:
+            return None
+        number = int(number_match.group(1))
+        
+        # If number is between 150-220, assume it's cm
+        if 150 <= number <= 220:
+            height = f"{number}cm"
+            logger.info(f"Extracted height {height} (assumed cm based on value range)")
+            return height
+        # If number is between 48-84, assume it's inches
+        if 48 <= number <= 84:
+            height = f"{number // 12}'{number % 12}\""
+            logger.info(f"Extracted height {height} (converted from inches)")
+            return height
+        # If number is between 4-7, assume it's feet
+        if 4 <= number <= 7:
+            height = f"{number}'0\""
+            logger.info(f"Extracted height {height} (assumed feet only)")
+            return height
+        return None
+
+    async def _height_from_ollama(self, message_text):
+        """Use Ollama to interpret a height the patterns could not read."""
+        logger.info(f"Using Ollama to interpret height from: '{message_text}'")
+        system_prompt = "You are a helpful assistant that extracts height information from user messages. Extract the height and convert it to a standard format (either X'Y\" or Zcm). If the input is just a number without units, determine if it's likely cm (if 150-220) or feet (if 4-7) based on the value. Return ONLY the formatted height value without any explanation or additional text."
+        prompt_template = "Extract height from this message: '{message}'"
+        
+        def valid_height(text):
+            text = text.strip()
+            return bool(re.search(r'^\d+\'\d+\"$', text) or re.search(r'^\d+cm$', text))
+        
+        # Cached (once validated) and batched with other extraction prompts
+        response = await call_ollama_extraction(system_prompt, prompt_template, message_text, max_tokens=15, validate=valid_height) or ""
+        extracted_height = response.strip()
+        
+        # Validate the extracted height
+        if valid_height(extracted_height):
+            logger.info(f"Ollama extracted height: {extracted_height}")
+            return extracted_height
+        logger.info(f"Ollama couldn't extract a valid height format from: '{extracted_height}'")
+        return None
+
+
 # End of actions – additional actions can be added below.
@@ -0,0 +1,238 @@
+import os
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Deque
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker settings
+OLLAMA_BREAKER_FAILURES = int(os.environ.get("OLLAMA_BREAKER_FAILURES", "5"))
+OLLAMA_BREAKER_RESET = float(os.environ.get("OLLAMA_BREAKER_RESET", "30"))
+
+# Adaptive timeout settings - timeout = percentile latency * multiplier, clamped
+OLLAMA_TIMEOUT_PERCENTILE = float(os.environ.get("OLLAMA_TIMEOUT_PERCENTILE", "0.99"))
+OLLAMA_TIMEOUT_MULTIPLIER = float(os.environ.get("OLLAMA_TIMEOUT_MULTIPLIER", "3.0"))
+OLLAMA_TIMEOUT_MIN = float(os.environ.get("OLLAMA_TIMEOUT_MIN", "5.0"))
+OLLAMA_TIMEOUT_MAX = float(os.environ.get("OLLAMA_TIMEOUT", "300.0"))
+
+# Timeouts used until enough latencies have been observed for a call type
+DEFAULT_TIMEOUTS = {
+    "extraction": 30.0,
+    "intent": 60.0,
+    "fallback": 120.0,
+    "generation": OLLAMA_TIMEOUT_MAX
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+
+class LatencyTracker:
+    """
+    Track recent latencies per call type and derive timeouts from them.
+    """
+
+    def __init__(self,
+                 percentile: float = OLLAMA_TIMEOUT_PERCENTILE,
+                 multiplier: float = OLLAMA_TIMEOUT_MULTIPLIER,
+                 min_timeout: float = OLLAMA_TIMEOUT_MIN,
+                 max_timeout: float = OLLAMA_TIMEOUT_MAX,
+                 window: int = 200,
+                 min_samples: int = 20):
+        """
+        Initialize the latency tracker.
+
+        Args:
+            percentile: Latency percentile the timeout is based on (0-1)
+            multiplier: Headroom applied to the percentile latency
+            min_timeout: Lower bound for derived timeouts in seconds
+            max_timeout: Upper bound for derived timeouts in seconds
+            window: Number of recent samples kept per call type
+            min_samples: Samples required before the default timeout is replaced
+        """
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, call_type: str, latency: float) -> None:
+        """
+        Record the latency of a successful call.
+
+        Args:
+            call_type: The kind of call (extraction, intent, generation, ...)
+            latency: Duration of the call in seconds
+        """
+        self._samples.setdefault(call_type, deque(maxlen=self.window)).append(latency)
+
+    def sample_count(self, call_type: str) -> int:
+        """
+        Get how many latencies have been recorded for a call type.
+
+        Args:
+            call_type: The kind of call
+
+        Returns:
+            Number of samples in the window
+        """
+        return len(self._samples.get(call_type, ()))
+
+    def percentile_latency(self, call_type: str, percentile: Optional[float] = None) -> Optional[float]:
+        """
+        Get a latency percentile for a call type.
+
+        Args:
+            call_type: The kind of call
+            percentile: Percentile to compute (optional, defaults to the configured one)
+
+        Returns:
+            The latency in seconds, or None if nothing has been recorded
+        """
+        samples = self._samples.get(call_type)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(round((percentile or self.percentile) * (len(ordered) - 1))))
+        return ordered[index]
+
+    def timeout_for(self, call_type: str) -> float:
+        """
+        Get the timeout to use for the next call of a type.
+
+        Args:
+            call_type: The kind of call
+
+        Returns:
+            Timeout in seconds
+        """
+        samples = self._samples.get(call_type)
+        if not samples or len(samples) < self.min_samples:
+            return min(DEFAULT_TIMEOUTS.get(call_type, self.max_timeout), self.max_timeout)
+
+        timeout = self.percentile_latency(call_type) * self.multiplier
+        return max(self.min_timeout, min(self.max_timeout, timeout))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get latency statistics per call type.
+
+        Returns:
+            Dictionary mapping call types to sample count, p50, p99 and current timeout
+        """
+        return {
+            call_type: {
+                "samples": len(samples),
+                "p50": self.percentile_latency(call_type, 0.5),
+                "p99": self.percentile_latency(call_type, 0.99),
+                "timeout": self.timeout_for(call_type)
+            }
+            for call_type, samples in self._samples.items()
+        }
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker for the Ollama backend.
+
+    After a run of consecutive failures the breaker opens and calls fail fast.
+    Once the reset timeout has passed it lets a single probe call through
+    (half-open); a successful probe closes the breaker, a failed one reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self,
+                 failure_threshold: int = OLLAMA_BREAKER_FAILURES,
+                 reset_timeout: float = OLLAMA_BREAKER_RESET,
+                 name: str = "ollama"):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds to stay open before probing
+            name: Name used in log messages
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    def before_call(self) -> bool:
+        """
+        Check whether a call may proceed.
+
+        Returns:
+            True if the call is the half-open probe
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with a probe already running
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit breaker '{self.name}' is open")
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit breaker '{self.name}' half-open, probing backend")
+
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit breaker '{self.name}' is half-open and probing")
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit breaker '{self.name}' closed after successful probe")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed call."""
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(f"Circuit breaker '{self.name}' opened after {self.consecutive_failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def record_cancelled(self) -> None:
+        """
+        Record that the half-open probe was cancelled by its caller, which says nothing about the backend.
+
+        Only the call that before_call() admitted as the probe may report this.
+        """
+        self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get breaker statistics.
+
+        Returns:
+            Dictionary with state, failure and rejection counters
+        """
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
@@ -6,6 +6,22 @@ from typing import Dict, Any, List, Optional, Text
 
 logger = logging.getLogger(__name__)
 
+def write_json_atomic(path: str, data: Any) -> None:
+    """
+    Write JSON to a file so readers never see a partly written file.
+    
+    The data is written to a temporary file next to the target, which then
+    replaces it in one step.
+    
+    Args:
+        path: File to write
+        data: JSON-serializable data
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
 class ConversationLogger:
     """
     A class to log conversations between the bot and users.
@@ -296,8 +312,7 @@ class ConversationLogger:
         conversation_data['updated_at'] = datetime.now().isoformat()
         
         try:
-            with open(log_file, 'w') as f:
-                json.dump(conversation_data, f, indent=2)
+            write_json_atomic(log_file, conversation_data)
             logger.info(f"Conversation data logged to {log_file}")
         except Exception as e:
             logger.error(f"Error writing conversation data to {log_file}: {str(e)}")
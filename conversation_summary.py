@@ -0,0 +1,303 @@
+import os
+import json
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rolling summary settings
+CONVERSATION_SUMMARY_DIR = os.environ.get("CONVERSATION_SUMMARY_DIR", os.path.join("conversation_logs", "summaries"))
+CONVERSATION_SUMMARY_RECENT_TURNS = int(os.environ.get("CONVERSATION_SUMMARY_RECENT_TURNS", "4"))
+CONVERSATION_SUMMARY_MAX_POINTS = int(os.environ.get("CONVERSATION_SUMMARY_MAX_POINTS", "8"))
+CONVERSATION_SUMMARY_POINT_CHARS = int(os.environ.get("CONVERSATION_SUMMARY_POINT_CHARS", "160"))
+CONVERSATION_SUMMARY_CACHE_SIZE = int(os.environ.get("CONVERSATION_SUMMARY_CACHE_SIZE", "1000"))
+
+
+def shorten(text: str, max_chars: int) -> str:
+    """
+    Collapse whitespace and cut text at a word boundary.
+
+    Args:
+        text: The text to shorten
+        max_chars: Maximum length of the result
+
+    Returns:
+        The shortened text, ending in "..." if it was cut
+    """
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 3].rsplit(" ", 1)[0]
+    return f"{cut}..."
+
+
+def latest_completed_turn(events: List[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+    """
+    Find the latest user message the bot has replied to in a conversation's tracker events.
+
+    Args:
+        events: Tracker events, oldest first
+
+    Returns:
+        Dictionary with the user's text, the bot's replies to it joined, and the
+        message ID (or the message's position if it has none), or None if the
+        bot has not replied to any message
+    """
+    current: Optional[Dict[str, Any]] = None
+    turn: Optional[Dict[str, Any]] = None
+    user_count = 0
+    for event in events:
+        if event.get("event") == "user":
+            user_count += 1
+            current = {"user": event.get("text") or "", "bot": [], "message_id": event.get("message_id") or str(user_count)}
+        elif event.get("event") == "bot" and event.get("text") and current is not None:
+            current["bot"].append(event["text"])
+            turn = current
+    if turn is None:
+        return None
+    return {"user": turn["user"], "bot": " ".join(turn["bot"]), "message_id": turn["message_id"]}
+
+
+class RollingSummary:
+    """
+    A constant-size summary of one conversation.
+
+    The most recent turns are kept verbatim. When a turn drops out of that
+    window, the user's side of it is condensed into a short point about what
+    they shared; only the newest points are kept.
+    """
+
+    def __init__(self,
+                 recent_turns: int = CONVERSATION_SUMMARY_RECENT_TURNS,
+                 max_points: int = CONVERSATION_SUMMARY_MAX_POINTS,
+                 point_chars: int = CONVERSATION_SUMMARY_POINT_CHARS):
+        """
+        Initialize an empty summary.
+
+        Args:
+            recent_turns: Number of turns kept verbatim
+            max_points: Number of condensed earlier points kept
+            point_chars: Maximum length of a condensed point
+        """
+        self.recent_turns = recent_turns
+        self.max_points = max_points
+        self.point_chars = point_chars
+        self.turns = 0
+        self.recent: List[Dict[str, str]] = []
+        self.points: List[str] = []
+        self.last_message_id = ""
+
+    def add_turn(self, user_text: str, bot_text: str, section: Optional[str] = None) -> None:
+        """
+        Add a completed turn.
+
+        Args:
+            user_text: The user's message
+            bot_text: The bot's reply
+            section: Conversation section the turn belongs to (optional)
+        """
+        self.turns += 1
+        self.recent.append({"user": user_text or "", "bot": bot_text or "", "section": section or ""})
+
+        while len(self.recent) > self.recent_turns:
+            oldest = self.recent.pop(0)
+            if oldest["user"].strip():
+                prefix = f"[{oldest['section']}] " if oldest["section"] else ""
+                self.points.append(prefix + shorten(oldest["user"], self.point_chars))
+        del self.points[:-self.max_points or None]
+
+    def render_earlier(self) -> str:
+        """
+        Render the condensed points from turns older than the recent window.
+
+        Returns:
+            The points, or an empty string if there are none
+        """
+        if not self.points:
+            return ""
+        lines = [f"EARLIER ({self.turns - len(self.recent)} turns), the user shared:"]
+        lines.extend(f"- {point}" for point in self.points)
+        return "\n".join(lines)
+
+    def render_recent(self) -> str:
+        """
+        Render the recent turns verbatim.
+
+        Returns:
+            The recent turns, or an empty string if there are none
+        """
+        lines = []
+        for turn in self.recent:
+            if turn["user"]:
+                lines.append(f"USER: {turn['user']}")
+            if turn["bot"]:
+                lines.append(f"BOT: {turn['bot']}")
+        return "\n".join(lines)
+
+    def render(self) -> str:
+        """
+        Render the summary for a prompt.
+
+        Returns:
+            Earlier points followed by the recent turns
+        """
+        if not self.turns:
+            return "No previous conversation."
+
+        parts = []
+        if self.points:
+            parts.append(self.render_earlier())
+        if self.recent:
+            parts.append("RECENT:\n" + self.render_recent())
+        return "\n".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the summary state."""
+        return {"turns": self.turns, "recent": self.recent, "points": self.points, "last_message_id": self.last_message_id}
+
+    def load_dict(self, data: Dict[str, Any]) -> None:
+        """Restore the summary state from to_dict output."""
+        self.turns = int(data.get("turns", 0))
+        self.recent = list(data.get("recent", []))[-self.recent_turns:]
+        self.points = list(data.get("points", []))[-self.max_points:]
+        self.last_message_id = str(data.get("last_message_id", ""))
+
+
+class ConversationSummaryStore:
+    """
+    Keep a rolling summary per conversation, updated after each bot turn.
+
+    Turns are recorded by the generating actions and by the conversation
+    logger, which sees the turns of every other action; a turn recorded with
+    the same message ID as the one before it is only counted once.
+
+    Summaries are cached in memory (least recently used are dropped) and each
+    one is persisted to its own small JSON file, so building a prompt never
+    needs to read the full conversation log.
+    """
+
+    def __init__(self, summary_dir: str = CONVERSATION_SUMMARY_DIR, max_cached: int = CONVERSATION_SUMMARY_CACHE_SIZE):
+        """
+        Initialize the summary store.
+
+        Args:
+            summary_dir: Directory holding one summary file per conversation
+            max_cached: Maximum number of summaries kept in memory
+        """
+        self.summary_dir = summary_dir
+        self.max_cached = max_cached
+        self._summaries: "OrderedDict[str, RollingSummary]" = OrderedDict()
+
+        self.loads = 0
+        self.updates = 0
+
+    def _path(self, sender_id: str) -> str:
+        """Get the summary file path for a conversation."""
+        return os.path.join(self.summary_dir, f"summary_{sender_id}.json")
+
+    def get(self, sender_id: str) -> RollingSummary:
+        """
+        Get a conversation's summary, loading it from disk if it is not cached.
+
+        Args:
+            sender_id: The ID of the user
+
+        Returns:
+            The RollingSummary for the conversation
+        """
+        summary = self._summaries.get(sender_id)
+        if summary is None:
+            summary = RollingSummary()
+            path = self._path(sender_id)
+            if os.path.exists(path):
+                try:
+                    with open(path, "r") as f:
+                        summary.load_dict(json.load(f))
+                    self.loads += 1
+                except (json.JSONDecodeError, OSError) as e:
+                    logger.error(f"Error loading conversation summary from {path}: {str(e)}")
+            self._summaries[sender_id] = summary
+
+        self._summaries.move_to_end(sender_id)
+        while len(self._summaries) > self.max_cached:
+            self._summaries.popitem(last=False)
+        return summary
+
+    def record_turn(self,
+                    sender_id: str,
+                    user_text: str,
+                    bot_text: str,
+                    section: Optional[str] = None,
+                    message_id: Optional[str] = None) -> bool:
+        """
+        Add a completed turn to a conversation's summary and persist it.
+
+        Args:
+            sender_id: The ID of the user
+            user_text: The user's message
+            bot_text: The bot's reply
+            section: Conversation section the turn belongs to (optional)
+            message_id: ID of the user's message; a turn for the message recorded last is skipped (optional)
+
+        Returns:
+            True if the turn was added
+        """
+        summary = self.get(sender_id)
+        if message_id and message_id == summary.last_message_id:
+            return False
+        summary.add_turn(user_text, bot_text, section)
+        summary.last_message_id = message_id or ""
+        self.updates += 1
+
+        path = self._path(sender_id)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.summary_dir, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(summary.to_dict(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error writing conversation summary to {path}: {str(e)}")
+        return True
+
+    def render(self, sender_id: str) -> str:
+        """
+        Render a conversation's summary for a prompt.
+
+        Args:
+            sender_id: The ID of the user
+
+        Returns:
+            The summary text
+        """
+        return self.get(sender_id).render()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get store statistics.
+
+        Returns:
+            Dictionary with cached summaries, loads from disk and updates
+        """
+        return {
+            "cached": len(self._summaries),
+            "loads": self.loads,
+            "updates": self.updates
+        }
+
+
+_shared_store: Optional[ConversationSummaryStore] = None
+
+
+def get_summary_store() -> ConversationSummaryStore:
+    """
+    Get the process-wide conversation summary store.
+
+    Returns:
+        The shared ConversationSummaryStore instance
+    """
+    global _shared_store
+    if _shared_store is None:
+        _shared_store = ConversationSummaryStore()
+    return _shared_store
@@ -0,0 +1,279 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+
+from ollama_client import OllamaClient, get_ollama_client
+from turn_deadline import TurnDeadline, current_deadline, latest_deadline, set_current_deadline
+
+logger = logging.getLogger(__name__)
+
+# Micro-batching settings for extraction prompts
+EXTRACTION_BATCH_ENABLED = os.environ.get("EXTRACTION_BATCH_ENABLED", "true").lower() == "true"
+EXTRACTION_BATCH_WINDOW_MS = float(os.environ.get("EXTRACTION_BATCH_WINDOW_MS", "5"))
+EXTRACTION_BATCH_MAX_SIZE = int(os.environ.get("EXTRACTION_BATCH_MAX_SIZE", "8"))
+
+BATCH_SYSTEM_PROMPT = (
+    "You are a helpful assistant that completes several independent extraction tasks at once. "
+    "Each task has its own instructions and input. Answer every task exactly as its instructions ask, "
+    "without explanation. Respond with a JSON object that maps each task id to its answer: "
+    "a JSON object for tasks that ask for one, otherwise a string."
+)
+
+
+class ExtractionRequest:
+    """A pending extraction prompt waiting to be sent in a batch."""
+
+    def __init__(self,
+                 system_prompt: str,
+                 user_prompt: str,
+                 max_tokens: int,
+                 future: "Optional[asyncio.Future[str]]",
+                 deadline: Optional[TurnDeadline] = None,
+                 schema: Optional[Dict[str, Any]] = None,
+                 sender_id: Optional[str] = None):
+        self.system_prompt = system_prompt
+        self.user_prompt = user_prompt
+        self.max_tokens = max_tokens
+        self.future = future
+        self.deadline = deadline
+        self.schema = schema
+        self.sender_id = sender_id
+
+
+class ExtractionBatcher:
+    """
+    Gather extraction prompts from many conversations over a short window and
+    send them to Ollama as one structured JSON prompt.
+    Each waiting action receives only the answer to its own task.
+
+    A task submitted with a JSON schema gets a JSON object as its answer: the
+    batch is then sent with a schema that constrains each task's answer to
+    its own schema (or to a string), and a task sent alone uses its schema.
+    """
+
+    def __init__(self,
+                 client: Optional[OllamaClient] = None,
+                 window_ms: float = EXTRACTION_BATCH_WINDOW_MS,
+                 max_batch_size: int = EXTRACTION_BATCH_MAX_SIZE,
+                 enabled: bool = EXTRACTION_BATCH_ENABLED):
+        """
+        Initialize the extraction batcher.
+
+        Args:
+            client: Ollama client (optional, defaults to the shared client)
+            window_ms: How long to wait for more requests before sending a batch
+            max_batch_size: Send immediately once this many requests are pending
+            enabled: Send every request on its own when False
+        """
+        self._client = client
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.enabled = enabled
+        self._pending: Dict[float, List[ExtractionRequest]] = {}
+        self._timers: Dict[float, asyncio.TimerHandle] = {}
+
+        self.requests = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.fallbacks = 0
+
+    @property
+    def client(self) -> OllamaClient:
+        return self._client or get_ollama_client()
+
+    async def submit(self,
+                     system_prompt: str,
+                     user_prompt: str,
+                     max_tokens: int = 10,
+                     temperature: float = 0.0,
+                     schema: Optional[Dict[str, Any]] = None,
+                     sender_id: Optional[str] = None) -> str:
+        """
+        Queue an extraction prompt and wait for its answer.
+
+        Args:
+            system_prompt: The task system prompt
+            user_prompt: The task prompt including the user input
+            max_tokens: Generation limit for this task
+            temperature: Sampling temperature (requests are batched per temperature)
+            schema: JSON schema the answer must match (optional; the answer is then a JSON object)
+            sender_id: The ID of the user, used when the task is sent alone (optional)
+
+        Returns:
+            The model's answer to this task
+        """
+        self.requests += 1
+        request = ExtractionRequest(system_prompt, user_prompt, max_tokens, None, current_deadline(), schema, sender_id)
+        if not self.enabled:
+            return await self._send_single(request, temperature)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request.future = future
+        pending = self._pending.setdefault(temperature, [])
+        pending.append(request)
+
+        if len(pending) >= self.max_batch_size:
+            self._flush(temperature)
+        elif temperature not in self._timers:
+            self._timers[temperature] = loop.call_later(self.window, self._flush, temperature)
+
+        return await future
+
+    def _flush(self, temperature: float) -> None:
+        """Send everything pending for a temperature as one batch."""
+        timer = self._timers.pop(temperature, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(temperature, [])
+        if batch:
+            asyncio.ensure_future(self._send_batch(batch, temperature))
+
+    async def _send_single(self, request: ExtractionRequest, temperature: float) -> str:
+        """Send one extraction prompt on its own."""
+        messages = [
+            {"role": "system", "content": request.system_prompt},
+            {"role": "user", "content": request.user_prompt}
+        ]
+        result = await self.client.chat(
+            messages,
+            options={"temperature": temperature, "num_predict": request.max_tokens},
+            format=request.schema,
+            call_type="extraction",
+            sender_id=request.sender_id
+        )
+        if "message" in result and "content" in result["message"]:
+            return result["message"]["content"]
+        raise ValueError(f"Unexpected response format from Ollama: {result}")
+
+    async def _send_batch(self, batch: List[ExtractionRequest], temperature: float) -> None:
+        """Send a batch and resolve each waiting request with its own answer."""
+        # Skip requests whose callers have already given up
+        batch = [request for request in batch if not request.future.done()]
+        if not batch:
+            return
+
+        # The task inherited the deadline of whichever run opened the batch window;
+        # run under the one that gives every waiter the most time instead
+        set_current_deadline(latest_deadline([request.deadline for request in batch]))
+
+        if len(batch) == 1:
+            request = batch[0]
+            try:
+                answer = await self._send_single(request, temperature)
+                if not request.future.done():
+                    request.future.set_result(answer)
+            except Exception as e:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.batched_requests += len(batch)
+        logger.info(f"Sending batch of {len(batch)} extraction prompts to Ollama")
+
+        tasks = []
+        for i, request in enumerate(batch, start=1):
+            tasks.append(f"Task {i}\nInstructions: {request.system_prompt.strip()}\n{request.user_prompt.strip()}")
+        user_prompt = "\n\n".join(tasks) + f"\n\nReturn a JSON object with keys \"1\" to \"{len(batch)}\"."
+
+        messages = [
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+        options = {
+            "temperature": temperature,
+            "num_predict": sum(request.max_tokens for request in batch) + 8 * len(batch)
+        }
+
+        try:
+            result = await self.client.chat(messages, options=options, format=self._batch_format(batch), call_type="extraction",
+                                             tasks=len(batch))
+            answers = self._parse_answers(result)
+        except Exception as e:
+            logger.error(f"Error sending extraction batch: {str(e)}")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        # Resolve each waiter; tasks the model skipped are retried on their own
+        for i, request in enumerate(batch, start=1):
+            if request.future.done():
+                continue
+            answer = answers.get(str(i))
+            if answer is not None:
+                request.future.set_result(json.dumps(answer) if request.schema is not None else str(answer))
+            else:
+                self.fallbacks += 1
+                asyncio.ensure_future(self._send_batch([request], temperature))
+
+    def _batch_format(self, batch: List[ExtractionRequest]) -> Any:
+        """
+        Get the structured output format for a batch.
+
+        Args:
+            batch: The requests in the batch
+
+        Returns:
+            "json", or a schema mapping each task id to its answer's schema if any task has one
+        """
+        if all(request.schema is None for request in batch):
+            return "json"
+        keys = [str(i) for i in range(1, len(batch) + 1)]
+        return {
+            "type": "object",
+            "properties": {key: request.schema or {"type": "string"} for key, request in zip(keys, batch)},
+            "required": keys
+        }
+
+    def _parse_answers(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Parse the JSON answers from a batched response.
+
+        Args:
+            result: Decoded Ollama response
+
+        Returns:
+            Dictionary mapping task ids to answers (empty if unparseable)
+        """
+        content = result.get("message", {}).get("content", "")
+        try:
+            answers = json.loads(content)
+        except (json.JSONDecodeError, TypeError):
+            logger.warning(f"Could not parse batched extraction response: {content}")
+            return {}
+        return answers if isinstance(answers, dict) else {}
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get batching statistics.
+
+        Returns:
+            Dictionary with request, batch and fallback counters
+        """
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+            "fallbacks": self.fallbacks,
+            "average_batch_size": self.batched_requests / self.batches if self.batches else 0.0
+        }
+
+
+_shared_batcher: Optional[ExtractionBatcher] = None
+
+
+def get_extraction_batcher() -> ExtractionBatcher:
+    """
+    Get the process-wide extraction batcher.
+
+    Returns:
+        The shared ExtractionBatcher instance
+    """
+    global _shared_batcher
+    if _shared_batcher is None:
+        _shared_batcher = ExtractionBatcher()
+    return _shared_batcher
@@ -0,0 +1,168 @@
+import time
+import asyncio
+import inspect
+import logging
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def _accept_any(value: Any) -> Any:
+    """Accept any non-empty value as-is."""
+    return value
+
+
+class ExtractionCascade:
+    """
+    Resolve one slot value from a list of extraction tiers, cheapest first.
+
+    Synchronous tiers (entities, regexes) run inline, in order, and the first
+    validated value wins without touching the LLM. An async tier (the LLM) is
+    only started once every tier before it was inconclusive; it keeps running
+    while later tiers are tried, and whatever async tiers are still pending
+    when a value is validated are cancelled. Per-tier win counts and latencies
+    are recorded so the share of turns that pay for the LLM can be tuned.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize the cascade.
+
+        Args:
+            name: Name of the extracted field, used in log messages
+        """
+        self.name = name
+        self.runs = 0
+        self.misses = 0
+        self._tiers: Dict[str, Dict[str, float]] = {}
+
+    def _tier_metrics(self, tier: str) -> Dict[str, float]:
+        """Get (or create) the metrics for a tier."""
+        return self._tiers.setdefault(tier, {
+            "attempts": 0,
+            "wins": 0,
+            "cancelled": 0,
+            "total_latency": 0.0
+        })
+
+    def _record(self, tier: str, start: float) -> None:
+        """Record a finished tier attempt."""
+        metrics = self._tier_metrics(tier)
+        metrics["attempts"] += 1
+        metrics["total_latency"] += time.monotonic() - start
+
+    async def run(self,
+                  tiers: List[Tuple[str, Callable[[], Any]]],
+                  validate: Callable[[Any], Any] = _accept_any) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Run the tiers and return the first validated value.
+
+        Args:
+            tiers: (tier name, function) pairs in order of cost; a function may return a value or a coroutine
+            validate: Returns the normalized value, or None to reject a candidate
+
+        Returns:
+            Tuple of (value, name of the winning tier), or (None, None) if every tier was inconclusive
+        """
+        self.runs += 1
+        pending: Dict["asyncio.Task[Any]", Tuple[str, float]] = {}
+        winner: Tuple[Optional[Any], Optional[str]] = (None, None)
+
+        try:
+            for tier, fn in tiers:
+                start = time.monotonic()
+                try:
+                    result = fn()
+                except Exception as e:
+                    logger.error(f"{self.name} extraction tier '{tier}' failed: {str(e)}")
+                    self._record(tier, start)
+                    continue
+
+                if inspect.isawaitable(result):
+                    # Start the expensive tier speculatively and keep trying cheaper ones
+                    pending[asyncio.ensure_future(result)] = (tier, start)
+                    continue
+
+                self._record(tier, start)
+                value = validate(result) if result else None
+                if value:
+                    winner = (value, tier)
+                    return winner
+
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tier, start = pending.pop(task)
+                    self._record(tier, start)
+                    if task.cancelled():
+                        continue
+                    if task.exception() is not None:
+                        logger.error(f"{self.name} extraction tier '{tier}' failed: {str(task.exception())}")
+                        continue
+                    value = validate(task.result()) if task.result() else None
+                    if value and winner[1] is None:
+                        winner = (value, tier)
+                if winner[1] is not None:
+                    return winner
+            return winner
+        finally:
+            # Cancel losing tiers that are still running
+            for task, (tier, _) in pending.items():
+                if not task.done():
+                    task.cancel()
+                    self._tier_metrics(tier)["cancelled"] += 1
+            if winner[1] is None:
+                self.misses += 1
+            else:
+                self._tier_metrics(winner[1])["wins"] += 1
+                logger.info(f"{self.name} extraction won by tier '{winner[1]}'")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cascade statistics.
+
+        Returns:
+            Dictionary with runs, misses, and per-tier win rate, cancellations and average latency
+        """
+        tiers = {}
+        for tier, metrics in self._tiers.items():
+            tiers[tier] = {
+                "attempts": int(metrics["attempts"]),
+                "wins": int(metrics["wins"]),
+                "cancelled": int(metrics["cancelled"]),
+                "win_rate": metrics["wins"] / self.runs if self.runs else 0.0,
+                "average_latency": metrics["total_latency"] / metrics["attempts"] if metrics["attempts"] else 0.0
+            }
+        return {
+            "runs": self.runs,
+            "misses": self.misses,
+            "tiers": tiers
+        }
+
+
+_cascades: Dict[str, ExtractionCascade] = {}
+
+
+def get_extraction_cascade(name: str) -> ExtractionCascade:
+    """
+    Get the process-wide cascade for a field.
+
+    Args:
+        name: Name of the extracted field
+
+    Returns:
+        The shared ExtractionCascade for that field
+    """
+    if name not in _cascades:
+        _cascades[name] = ExtractionCascade(name)
+    return _cascades[name]
+
+
+def cascade_stats() -> Dict[str, Any]:
+    """
+    Get statistics for every cascade.
+
+    Returns:
+        Dictionary mapping field names to their cascade statistics
+    """
+    return {name: cascade.stats() for name, cascade in _cascades.items()}
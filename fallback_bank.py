@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Fallback Response Bank
+
+This script pre-generates a bank of Hapa persona replies for out-of-scope
+messages, per profile stage and section, and stores them in a compact indexed
+file. At runtime ActionOllamaFallback serves replies from the bank instead of
+generating one for every message; live generation is only used when
+FALLBACK_LIVE_GENERATION is enabled.
+
+The replies are generated from the same stage-specific system message the
+live fallback uses, answering a spread of off-topic seed messages (the logged
+user messages when available) at a high temperature, and de-duplicated.
+"""
+
+import os
+import gzip
+import json
+import zlib
+import asyncio
+import argparse
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from ollama_client import OllamaClient
+from model_benchmark import load_user_messages
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Bank file read by the fallback action and written by this script
+FALLBACK_BANK_PATH = os.environ.get("FALLBACK_BANK_PATH", "fallback_bank.json.gz")
+# Generate fallback replies live instead of serving them from the bank
+FALLBACK_LIVE_GENERATION = os.environ.get("FALLBACK_LIVE_GENERATION", "false").lower() == "true"
+# Replies generated per stage and section by the offline job
+FALLBACK_BANK_SIZE = int(os.environ.get("FALLBACK_BANK_SIZE", "50"))
+# Maximum number of senders whose rotation position is remembered
+FALLBACK_BANK_MAX_SENDERS = int(os.environ.get("FALLBACK_BANK_MAX_SENDERS", "10000"))
+
+BANK_FORMAT_VERSION = 1
+
+# Stage reached once the personal data questions are done
+PROFILE_STAGE = 7
+
+# Placeholder in banked and cached replies replaced with the user's name
+NAME_PLACEHOLDER = "{name}"
+
+FALLBACK_PERSONA = "You are Hapa, a friendly dating profile assistant with a cat-like personality. You help users create their dating profiles by collecting information in a conversational way. You use cat puns and playful language. Keep responses brief and engaging."
+
+# What the fallback steers the user back to, per personal_data_stage
+STAGE_INSTRUCTIONS = {
+    1: " You're currently trying to collect the user's age. If they provide an age, acknowledge it and ask for their gender next.",
+    2: " You're currently trying to collect the user's gender. If they provide their gender, acknowledge it and ask for their gender preference next.",
+    3: " You're currently trying to collect the user's gender preference. If they provide their gender preference, acknowledge it and ask for their age preference next.",
+    4: " You're currently trying to collect the user's age preference. If they provide an age preference, acknowledge it and ask for their height next.",
+    5: " You're currently trying to collect the user's age preference. If they provide an age preference, acknowledge it and ask for their height next.",
+    6: " You're currently trying to collect the user's height. If they provide their height, acknowledge it and ask about their interests next."
+}
+
+# What the fallback steers the user back to once the personal data is collected, per section
+SECTION_INSTRUCTIONS = {
+    "userInfo": " You're currently learning about the user's interests, personality and lifestyle for their dating profile.",
+    "userPref": " You're currently learning what the user is looking for in a partner for their dating profile.",
+    "general": " You're currently helping the user build their dating profile by collecting their personal information."
+}
+
+# Added to the system message when generating the bank, since banked replies answer any off-topic message
+BANK_INSTRUCTION = (
+    " The user has just said something off-topic. Reply in one or two sentences: respond playfully"
+    " without repeating any specific detail from their message, then steer them back to the question."
+    f" You may address the user as {NAME_PLACEHOLDER}. Reply with the message only."
+)
+
+# Off-topic messages the bank is generated from when there are no logs
+SEED_MESSAGES = [
+    "What's the weather like today?",
+    "Can you help me with my homework?",
+    "Tell me a joke",
+    "What's your favorite movie?",
+    "Are you a real person?",
+    "I'm bored",
+    "Who won the game last night?",
+    "What should I eat for dinner?",
+    "Do you like cats or dogs?",
+    "lol",
+    "Why do you need to know that?",
+    "Can you recommend a good book?"
+]
+
+
+def fallback_section(stage: int, current_section: Optional[str] = None) -> str:
+    """
+    Get the bank section for the current point in the conversation.
+
+    Args:
+        stage: The personal_data_stage slot
+        current_section: The current_section slot (optional)
+
+    Returns:
+        "personal_data" while the personal data questions are asked, else the
+        current section ("userInfo", "userPref") or "general"
+    """
+    if stage < PROFILE_STAGE:
+        return "personal_data"
+    return current_section if current_section in SECTION_INSTRUCTIONS else "general"
+
+
+def bank_key(stage: int, section: str) -> str:
+    """
+    Get the bank index key for a stage and section.
+
+    Args:
+        stage: The personal_data_stage slot (stages past the questions share one key)
+        section: The section from fallback_section
+
+    Returns:
+        The index key, e.g. "3:personal_data"
+    """
+    return f"{min(stage, PROFILE_STAGE)}:{section}"
+
+
+def bank_keys() -> List[Tuple[int, str]]:
+    """Get every (stage, section) the bank holds replies for."""
+    return [(stage, "personal_data") for stage in sorted(STAGE_INSTRUCTIONS)] + \
+        [(PROFILE_STAGE, section) for section in SECTION_INSTRUCTIONS]
+
+
+def fallback_system_message(stage: int, section: str = "general") -> str:
+    """
+    Build the Hapa persona system message for a stage and section.
+
+    Args:
+        stage: The personal_data_stage slot
+        section: The section from fallback_section
+
+    Returns:
+        The system message
+    """
+    if stage in STAGE_INSTRUCTIONS:
+        return FALLBACK_PERSONA + STAGE_INSTRUCTIONS[stage]
+    return FALLBACK_PERSONA + SECTION_INSTRUCTIONS.get(section, SECTION_INSTRUCTIONS["general"])
+
+
+def clean_reply(text: str) -> str:
+    """
+    Tidy a generated reply for the bank.
+
+    Args:
+        text: The generated reply
+
+    Returns:
+        The reply without surrounding quotes or whitespace, or "" if it cannot be used
+    """
+    text = text.strip().strip('"').strip()
+    # Drop replies with stray template braces, which would show up in the chat
+    bare = text.replace(NAME_PLACEHOLDER, "")
+    if "{" in bare or "}" in bare:
+        return ""
+    return text
+
+
+def save_bank(path: str, replies: Dict[str, List[str]], model: str = "") -> None:
+    """
+    Write a bank file.
+
+    The file is gzip-compressed JSON with the replies indexed by bank key.
+
+    Args:
+        path: File to write
+        replies: Replies per bank key
+        model: Model the replies were generated with
+    """
+    bank = {
+        "version": BANK_FORMAT_VERSION,
+        "model": model,
+        "created": datetime.now().isoformat(),
+        "replies": replies
+    }
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(bank, f, separators=(',', ':'), ensure_ascii=False)
+
+
+def load_bank(path: str) -> Dict[str, List[str]]:
+    """
+    Read a bank file.
+
+    Args:
+        path: File to read
+
+    Returns:
+        Replies per bank key, empty if the file is missing or unreadable
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            bank = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading fallback bank {path}: {str(e)}")
+        return {}
+    if bank.get("version") != BANK_FORMAT_VERSION:
+        logger.error(f"Unsupported fallback bank version in {path}: {bank.get('version')}")
+        return {}
+    return {key: [reply for reply in replies if reply] for key, replies in bank.get("replies", {}).items()}
+
+
+class FallbackBank:
+    """
+    Serve pre-generated fallback replies, rotating through them per sender.
+
+    Each sender starts at a different point in a key's replies and moves one
+    step per fallback, so a sender only sees a reply again after the whole
+    list for that stage and section has been served.
+    """
+
+    def __init__(self,
+                 replies: Optional[Dict[str, List[str]]] = None,
+                 path: str = FALLBACK_BANK_PATH,
+                 max_senders: int = FALLBACK_BANK_MAX_SENDERS):
+        """
+        Initialize the bank.
+
+        Args:
+            replies: Replies per bank key (optional, loaded from path if not given)
+            path: Bank file to load
+            max_senders: Maximum number of senders whose rotation position is remembered
+        """
+        self.replies = replies if replies is not None else load_bank(path)
+        self.max_senders = max_senders
+        self._positions: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+
+        self.served = 0
+        self.misses = 0
+        if replies is None and not self.replies:
+            answered = "failed live fallback calls get" if FALLBACK_LIVE_GENERATION else "every out-of-scope message gets"
+            logger.warning(f"No fallback bank at {path}, so {answered} a generic reply. Build it with: python fallback_bank.py")
+        if self.replies:
+            logger.info(f"Fallback bank loaded with {sum(len(r) for r in self.replies.values())} replies for {len(self.replies)} stages")
+
+    def reply(self, sender_id: str, stage: int, section: str, name: str = "there") -> Optional[str]:
+        """
+        Get the next banked reply for a sender.
+
+        Args:
+            sender_id: The ID of the user
+            stage: The personal_data_stage slot
+            section: The section from fallback_section
+            name: Name the reply addresses the user by
+
+        Returns:
+            The reply, or None if the bank has none for this stage and section
+        """
+        key = bank_key(stage, section)
+        replies = self.replies.get(key)
+        if not replies:
+            self.misses += 1
+            return None
+
+        position = self._positions.get((sender_id, key))
+        if position is None:
+            position = zlib.crc32(sender_id.encode("utf-8"))
+        self._positions[(sender_id, key)] = position + 1
+        self._positions.move_to_end((sender_id, key))
+        while len(self._positions) > self.max_senders:
+            self._positions.popitem(last=False)
+
+        self.served += 1
+        return replies[position % len(replies)].replace(NAME_PLACEHOLDER, name)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get bank statistics.
+
+        Returns:
+            Dictionary with replies per bank key, replies served and fallbacks the bank had no reply for
+        """
+        return {
+            "replies": {key: len(replies) for key, replies in self.replies.items()},
+            "served": self.served,
+            "misses": self.misses
+        }
+
+
+_shared_bank: Optional[FallbackBank] = None
+
+
+def get_fallback_bank() -> FallbackBank:
+    """
+    Get the process-wide fallback bank, loading it on first use.
+
+    Returns:
+        The shared FallbackBank instance
+    """
+    global _shared_bank
+    if _shared_bank is None:
+        _shared_bank = FallbackBank()
+    return _shared_bank
+
+
+class FallbackBankBuilder:
+    """Generate the bank's replies with Ollama."""
+
+    def __init__(self, client: OllamaClient, size: int = FALLBACK_BANK_SIZE, seeds: Optional[List[str]] = None, temperature: float = 0.9):
+        """
+        Initialize the builder.
+
+        Args:
+            client: OllamaClient the replies are generated with
+            size: Replies to generate per stage and section
+            seeds: Off-topic messages to reply to (optional, defaults to SEED_MESSAGES)
+            temperature: Sampling temperature, high so replies vary
+        """
+        self.client = client
+        self.size = size
+        self.seeds = seeds or SEED_MESSAGES
+        self.temperature = temperature
+
+    async def _generate(self, system_message: str, seed: str) -> str:
+        """Generate one reply, returning "" if the call failed."""
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": seed}
+        ]
+        try:
+            result = await self.client.chat(
+                messages,
+                options={"temperature": self.temperature, "num_predict": 80},
+                call_type="fallback"
+            )
+            return clean_reply(result.get("message", {}).get("content", ""))
+        except Exception as e:
+            logger.warning(f"Fallback bank generation failed: {str(e)}")
+            return ""
+
+    async def build_key(self, stage: int, section: str) -> List[str]:
+        """
+        Generate the distinct replies for one stage and section.
+
+        Generation stops after size distinct replies or twice as many attempts.
+
+        Args:
+            stage: The personal_data_stage the replies are for
+            section: The section the replies are for
+
+        Returns:
+            The replies
+        """
+        system_message = fallback_system_message(stage, section) + BANK_INSTRUCTION
+        replies: List[str] = []
+        seen = set()
+        for attempt in range(self.size * 2):
+            if len(replies) >= self.size:
+                break
+            reply = await self._generate(system_message, self.seeds[attempt % len(self.seeds)])
+            normalized = " ".join(reply.lower().split())
+            if reply and normalized not in seen:
+                seen.add(normalized)
+                replies.append(reply)
+        logger.info(f"Generated {len(replies)} fallback replies for {bank_key(stage, section)}")
+        return replies
+
+    async def build(self) -> Dict[str, List[str]]:
+        """
+        Generate replies for every stage and section.
+
+        Returns:
+            Replies per bank key
+        """
+        return {bank_key(stage, section): await self.build_key(stage, section) for stage, section in bank_keys()}
+
+
+async def build_bank(path: str, size: int, log_dir: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Generate the bank and write it to a file.
+
+    Args:
+        path: Bank file to write
+        size: Replies per stage and section
+        log_dir: Directory of conversation logs whose user messages are used as seeds (optional)
+
+    Returns:
+        Replies per bank key
+    """
+    seeds = load_user_messages(log_dir, limit=200) if log_dir else []
+    client = OllamaClient()
+    try:
+        replies = await FallbackBankBuilder(client, size, seeds).build()
+    finally:
+        await client.aclose()
+
+    save_bank(path, replies, client.model_for("fallback"))
+    logger.info(f"Fallback bank written to {path}")
+    return replies
+
+
+def main():
+    """Main function to build the fallback bank."""
+    parser = argparse.ArgumentParser(description='Pre-generate the Hapa fallback replies for each profile stage and section')
+
+    parser.add_argument('--output', type=str, default=FALLBACK_BANK_PATH, help='Bank file to write')
+    parser.add_argument('--size', type=int, default=FALLBACK_BANK_SIZE, help='Replies to generate per stage and section')
+    parser.add_argument('--log-dir', type=str, help='Use the user messages in these conversation logs as off-topic seeds')
+
+    args = parser.parse_args()
+
+    replies = asyncio.run(build_bank(args.output, args.size, args.log_dir))
+    for key, key_replies in replies.items():
+        print(f"{key:<20} {len(key_replies):>4} replies")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+import os
+import re
+import time
+import zlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, FrozenSet, List, Optional, Set, Tuple
+
+from fallback_bank import NAME_PLACEHOLDER
+
+logger = logging.getLogger(__name__)
+
+# Cache settings for generated out-of-scope fallback replies
+FALLBACK_CACHE_SIZE = int(os.environ.get("FALLBACK_CACHE_SIZE", "2048"))
+FALLBACK_CACHE_TTL = float(os.environ.get("FALLBACK_CACHE_TTL", "86400"))
+# Replies kept per message; an entry is served once it has this many
+FALLBACK_CACHE_VARIANTS = int(os.environ.get("FALLBACK_CACHE_VARIANTS", "3"))
+# Jaccard similarity of shingle signatures at which a message counts as a near-duplicate
+FALLBACK_CACHE_SIMILARITY = float(os.environ.get("FALLBACK_CACHE_SIMILARITY", "0.6"))
+# Longer messages are too specific to share a reply and are not cached
+FALLBACK_CACHE_MAX_CHARS = int(os.environ.get("FALLBACK_CACHE_MAX_CHARS", "80"))
+
+# Character n-gram size of the shingles
+SHINGLE_SIZE = 3
+
+# Words whose change flips or alters the facts in a message; messages with
+# these (or digits) only match exactly, since "i dont like hiking" is one
+# character away from "i do like hiking"
+SPECIFIC_WORDS = re.compile(
+    r"\d|\b(?:no|not|nor|never|nothing|nobody|none|dont|doesnt|didnt|isnt|arent|wasnt|werent|cant|cannot|wont|"
+    r"wouldnt|shouldnt|couldnt|havent|hasnt|hadnt|aint|\w+nt|zero|one|two|three|four|five|six|seven|eight|nine|ten|"
+    r"eleven|twelve|\w+teen|twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|hundred)\b"
+)
+
+
+def normalize_message(text: str) -> str:
+    """
+    Normalize an out-of-scope message so trivially different messages share an entry.
+
+    Args:
+        text: The raw user message
+
+    Returns:
+        Lowercased message without punctuation, with letters repeated more than
+        twice cut to two ("lolll" -> "loll") and whitespace collapsed
+    """
+    text = re.sub(r"[^\w\s]", "", str(text).lower())
+    text = re.sub(r"(\w)\1{2,}", r"\1\1", text)
+    return " ".join(text.split())
+
+
+def shingle_signature(normalized: str, size: int = SHINGLE_SIZE) -> FrozenSet[int]:
+    """
+    Get the shingle signature of a normalized message.
+
+    Args:
+        normalized: Message from normalize_message
+        size: Characters per shingle
+
+    Returns:
+        Hashes of the message's character n-grams, padded so short messages have shingles too
+    """
+    padded = f" {normalized} "
+    if len(padded) <= size:
+        return frozenset([zlib.crc32(padded.encode("utf-8"))])
+    return frozenset(zlib.crc32(padded[i:i + size].encode("utf-8")) for i in range(len(padded) - size + 1))
+
+
+def has_specifics(normalized: str) -> bool:
+    """
+    Check whether a normalized message contains digits, number words or negations.
+
+    Args:
+        normalized: Message from normalize_message
+
+    Returns:
+        True if the message must only match an identical message
+    """
+    return bool(SPECIFIC_WORDS.search(normalized))
+
+
+def similarity(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    """Get the Jaccard similarity of two shingle signatures."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class FallbackCacheEntry:
+    """The reply variants cached for one message at one stage."""
+
+    def __init__(self, stage_key: str, normalized: str, signature: FrozenSet[int], expires_at: float):
+        self.stage_key = stage_key
+        self.normalized = normalized
+        self.signature = signature
+        self.expires_at = expires_at
+        self.variants: List[str] = []
+        self.served = 0
+
+
+class FallbackReplyCache:
+    """
+    Cache generated out-of-scope fallback replies by normalized message and stage.
+
+    Messages are normalized and, if there is no exact entry, matched to the
+    most similar entry for the same stage by the Jaccard similarity of their
+    character shingles, found through an inverted index from shingles to
+    entries. Messages with digits, number words or negations only match
+    identical messages, since a one-word change there changes the facts.
+    Each entry collects several generated variants and is only served
+    once it has all of them, rotating through them so a repeated "lol" does not
+    always get the same answer. Entries expire after the TTL and the least
+    recently used are evicted beyond max_size.
+
+    The user's name is stored as a placeholder, so one user's name is never
+    served to another. Replies are shared between users, so only replies
+    generated not to repeat details of the message should be added.
+    """
+
+    def __init__(self,
+                 max_size: int = FALLBACK_CACHE_SIZE,
+                 ttl: float = FALLBACK_CACHE_TTL,
+                 variants: int = FALLBACK_CACHE_VARIANTS,
+                 threshold: float = FALLBACK_CACHE_SIMILARITY,
+                 max_chars: int = FALLBACK_CACHE_MAX_CHARS):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries (least recently used are evicted)
+            ttl: Time in seconds before an entry expires
+            variants: Replies collected per entry before it is served
+            threshold: Minimum similarity for a near-duplicate hit (1.0 allows exact matches only)
+            max_chars: Longest normalized message that is cached
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.variants = variants
+        self.threshold = threshold
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[Tuple[str, str], FallbackCacheEntry]" = OrderedDict()
+        self._index: Dict[Tuple[str, int], Set[Tuple[str, str]]] = {}
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        """Remove an entry and its shingles from the index."""
+        entry = self._entries.pop(key)
+        for shingle in entry.signature:
+            keys = self._index.get((entry.stage_key, shingle))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[(entry.stage_key, shingle)]
+
+    def _live(self, key: Tuple[str, str]) -> Optional[FallbackCacheEntry]:
+        """Get an entry, dropping it if it has expired."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.time():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _find(self, stage_key: str, normalized: str) -> Tuple[Optional[FallbackCacheEntry], bool]:
+        """
+        Find the entry for a message: the exact one, or else the most similar above the threshold.
+
+        Returns:
+            The entry (or None) and whether it was an exact match
+        """
+        entry = self._live((stage_key, normalized))
+        if entry is not None or self.threshold >= 1.0 or has_specifics(normalized):
+            return entry, entry is not None
+
+        signature = shingle_signature(normalized)
+        candidates: Set[Tuple[str, str]] = set()
+        for shingle in signature:
+            candidates |= self._index.get((stage_key, shingle), set())
+
+        best: Optional[FallbackCacheEntry] = None
+        best_score = self.threshold
+        for key in candidates:
+            candidate = self._live(key)
+            if candidate is None:
+                continue
+            score = similarity(signature, candidate.signature)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best, False
+
+    def cacheable(self, message: str) -> bool:
+        """
+        Check whether replies to a message are cached.
+
+        Args:
+            message: The user's message
+
+        Returns:
+            True if the message is short enough to share its replies
+        """
+        normalized = normalize_message(message)
+        return bool(normalized) and len(normalized) <= self.max_chars
+
+    def get(self, stage_key: str, message: str, name: str = "there") -> Optional[str]:
+        """
+        Get a cached reply for a message.
+
+        Args:
+            stage_key: The stage (and section) the reply is for
+            message: The user's message
+            name: Name the reply addresses the user by
+
+        Returns:
+            The next variant, or None on a miss or if the entry is still collecting variants
+        """
+        if not self.cacheable(message):
+            return None
+
+        entry, exact = self._find(stage_key, normalize_message(message))
+        if entry is None or len(entry.variants) < self.variants:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end((entry.stage_key, entry.normalized))
+        if exact:
+            self.hits += 1
+        else:
+            self.near_hits += 1
+        reply = entry.variants[entry.served % len(entry.variants)]
+        entry.served += 1
+        return reply.replace(NAME_PLACEHOLDER, name)
+
+    def add(self, stage_key: str, message: str, reply: str, name: str = "there") -> None:
+        """
+        Add a generated reply as a variant for a message.
+
+        The variant goes to the message's entry, or to a near-duplicate's entry if there is one.
+
+        Args:
+            stage_key: The stage (and section) the reply is for
+            message: The user's message
+            reply: The generated reply
+            name: Name the user was addressed by, stored as a placeholder
+        """
+        if not self.cacheable(message) or not reply.strip():
+            return
+
+        normalized = normalize_message(message)
+        entry, _ = self._find(stage_key, normalized)
+        if entry is None:
+            key = (stage_key, normalized)
+            entry = FallbackCacheEntry(stage_key, normalized, shingle_signature(normalized), time.time() + self.ttl)
+            self._entries[key] = entry
+            # Messages with specifics are left out of the index, so they are never a near-duplicate of another
+            if not has_specifics(normalized):
+                for shingle in entry.signature:
+                    self._index.setdefault((stage_key, shingle), set()).add(key)
+        self._entries.move_to_end((entry.stage_key, entry.normalized))
+
+        if name and name != "there":
+            reply = re.sub(rf"\b{re.escape(name)}\b", NAME_PLACEHOLDER, reply)
+        if len(entry.variants) < self.variants and reply not in entry.variants:
+            entry.variants.append(reply)
+
+        # Evict least recently used entries over the size limit
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with size, exact and near-duplicate hits, misses, evictions,
+            expirations and hit rate
+        """
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0
+        }
+
+
+_shared_cache: Optional[FallbackReplyCache] = None
+
+
+def get_fallback_cache() -> FallbackReplyCache:
+    """
+    Get the process-wide fallback reply cache.
+
+    Returns:
+        The shared FallbackReplyCache instance
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = FallbackReplyCache()
+    return _shared_cache
@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { createClient } from '@supabase/supabase-js';
+import { io } from 'socket.io-client';
 
 // Initialize Supabase client
 const supabaseUrl = process.env.REACT_APP_SUPABASE_URL || 'https://sxbmfehjgekagncfgepw.supabase.co';
@@ -10,11 +11,16 @@ const supabase = createClient(supabaseUrl, supabaseKey);
  * RasaChat Component - A chat interface that communicates with Rasa through Supabase Edge Functions
  * @param {string} userId - The user's ID
  * @param {string} chatId - The chat ID
+ * @param {string} streamUrl - URL of the reply streaming server (optional)
+ * @param {string} streamToken - Subscription token for chatId, issued by the backend (optional)
  */
-const RasaChat = ({ userId, chatId }) => {
+const RasaChat = ({ userId, chatId, streamUrl, streamToken }) => {
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
+  // Reply being streamed; it is replaced by the bot message once that is saved
+  const [draft, setDraft] = useState(null);
+  const socketRef = useRef(null);
   const messagesEndRef = useRef(null);
   
   // Scroll to bottom of messages
@@ -24,7 +30,7 @@ const RasaChat = ({ userId, chatId }) => {
   
   useEffect(() => {
     scrollToBottom();
-  }, [messages]);
+  }, [messages, draft]);
   
   // Load chat history on component mount
   useEffect(() => {
@@ -70,6 +76,11 @@ const RasaChat = ({ userId, chatId }) => {
         }, (payload) => {
           const newMessage = payload.new;
           
+          // The saved bot message replaces the streamed draft of it
+          if (newMessage.sender_uid !== userId) {
+            setDraft(null);
+          }
+          
           // Only add the message if it's not from the current user (to avoid duplicates)
           if (newMessage.sender_uid !== userId || !messages.some(m => m.id === newMessage.id)) {
             setMessages(prev => [...prev, {
@@ -91,8 +102,34 @@ const RasaChat = ({ userId, chatId }) => {
     initializeChat();
   }, [chatId, userId]);
   
+  // Show bot replies as they are generated, when a streaming server is configured
+  useEffect(() => {
+    if (!streamUrl || !streamToken || !chatId) return;
+    
+    const socket = io(streamUrl);
+    socketRef.current = socket;
+    socket.on('connect', () => {
+      socket.emit('subscribe', { session_id: chatId, token: streamToken });
+    });
+    socket.on('bot_stream', (data) => {
+      if (data.cancelled || data.error) {
+        setDraft(null);
+      } else if (data.done) {
+        setDraft(data.text);
+      } else {
+        // Chunks carry their own whitespace, so they join without a separator
+        setDraft(prev => (prev || '') + data.text);
+      }
+    });
+    
+    return () => {
+      socketRef.current = null;
+      socket.disconnect();
+    };
+  }, [streamUrl, streamToken, chatId]);
+  
   // Save message to Supabase via Edge Function
-  const saveMessageToSupabase = async (text, senderUid) => {
+  const saveMessageToSupabase = async (text, senderUid, messageId) => {
     try {
       // Call the messageHandler Edge Function
       const { data, error } = await supabase.functions.invoke('messageHandler', {
@@ -101,6 +138,7 @@ const RasaChat = ({ userId, chatId }) => {
             chat_id: chatId,
             sender_uid: senderUid,
             message_text: text,
+            message_id: messageId,
             type: 'text',
             sent_at: new Date().toISOString()
           }
@@ -126,6 +164,16 @@ const RasaChat = ({ userId, chatId }) => {
     setInput('');
     setLoading(true);
     
+    // The same ID goes to Rasa (as metadata.message_id) and to the streaming server,
+    // so the reply to this message is not cancelled if the notification arrives late
+    const messageId = crypto.randomUUID();
+    
+    // Cancel the reply still being generated for the previous message
+    if (socketRef.current) {
+      socketRef.current.emit('user_message', { session_id: chatId, token: streamToken, message_id: messageId });
+      setDraft(null);
+    }
+    
     // Add user message to UI immediately (optimistic update)
     const tempId = Date.now().toString();
     setMessages(prev => [...prev, {
@@ -137,7 +185,7 @@ const RasaChat = ({ userId, chatId }) => {
     
     try {
       // Send message to Edge Function, which will forward to Rasa
-      await saveMessageToSupabase(userMessage, userId);
+      await saveMessageToSupabase(userMessage, userId, messageId);
       
       // Note: We don't need to manually add the bot response here
       // It will come through the real-time subscription
@@ -172,6 +220,13 @@ const RasaChat = ({ userId, chatId }) => {
             </div>
           </div>
         ))}
+        {draft && (
+          <div className="message bot-message streaming">
+            <div className="message-bubble">
+              {draft}
+            </div>
+          </div>
+        )}
         <div ref={messagesEndRef} />
       </div>
       
@@ -32,9 +32,10 @@ class RasaClient {
   /**
    * Send a message to the Rasa server
    * @param {string} message - The message to send
+   * @param {string} [messageId] - Client message ID, also sent in the streaming server's user_message event
    * @returns {Promise<Object>} - The response from the Rasa server
    */
-  async sendMessage(message) {
+  async sendMessage(message, messageId = null) {
     if (!this.sessionId) {
       throw new Error('Session ID not set. Call setSessionId() first.');
     }
@@ -48,7 +49,7 @@ class RasaClient {
         body: JSON.stringify({
           sender: this.sessionId,
           message: message,
-          metadata: this.metadata
+          metadata: messageId ? { ...this.metadata, message_id: messageId } : this.metadata
         }),
       });
 
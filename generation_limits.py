@@ -0,0 +1,161 @@
+import os
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Generation caps per call type, sent to Ollama as num_predict (a lower limit set by the caller is kept)
+GENERATION_LIMITS = {
+    "extraction": int(os.environ.get("GENERATION_LIMIT_EXTRACTION", "160")),
+    "intent": int(os.environ.get("GENERATION_LIMIT_INTENT", "40")),
+    "generation": int(os.environ.get("GENERATION_LIMIT_GENERATION", "300")),
+    "fallback": int(os.environ.get("GENERATION_LIMIT_FALLBACK", "300"))
+}
+DEFAULT_GENERATION_LIMIT = int(os.environ.get("GENERATION_LIMIT_DEFAULT", "300"))
+
+# Stop sequences per call type - single-line answers end at the first newline
+STOP_SEQUENCES = {
+    "extraction": ["\n"],
+    "intent": ["\n"]
+}
+
+# Call types that are streamed and cut off as soon as their answer is complete
+EARLY_STOP_CALL_TYPES = [t.strip() for t in os.environ.get("EARLY_STOP_CALL_TYPES", "extraction").split(",") if t.strip()]
+
+
+def answer_end(content: str, structured: bool) -> Optional[int]:
+    """
+    Find where a complete answer ends in partially generated content.
+
+    A structured answer is complete once its first JSON object is closed; a
+    plain answer is complete at the first newline after some text.
+
+    Args:
+        content: Content generated so far
+        structured: Whether the answer is a JSON object
+
+    Returns:
+        Length of the complete answer, or None if it is not complete yet
+    """
+    if not structured:
+        start = len(content) - len(content.lstrip())
+        newline = content.find("\n", start)
+        return newline if newline > start else None
+
+    start = content.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(content)):
+        char = content[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+class GenerationPolicy:
+    """
+    Apply per call type generation limits and stop sequences.
+
+    Ollama reads the generation cap from num_predict; a max_tokens option is
+    ignored, so it is translated. Structured (JSON) calls get no newline stop,
+    since a JSON object may span lines. Call types in early_stop_call_types are
+    streamed by the client, which closes the request once the answer is complete.
+    """
+
+    def __init__(self,
+                 limits: Optional[Dict[str, int]] = None,
+                 stops: Optional[Dict[str, List[str]]] = None,
+                 early_stop_call_types: Optional[List[str]] = None):
+        """
+        Initialize the policy.
+
+        Args:
+            limits: Generation caps per call type (optional, defaults to GENERATION_LIMITS)
+            stops: Stop sequences per call type (optional, defaults to STOP_SEQUENCES)
+            early_stop_call_types: Call types cut off once complete (optional, defaults to EARLY_STOP_CALL_TYPES)
+        """
+        self.limits = limits if limits is not None else GENERATION_LIMITS
+        self.stops = stops if stops is not None else STOP_SEQUENCES
+        self.early_stop_call_types = early_stop_call_types if early_stop_call_types is not None else EARLY_STOP_CALL_TYPES
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def options(self, call_type: str, options: Optional[Dict[str, Any]], structured: bool = False,
+                tasks: int = 1) -> Dict[str, Any]:
+        """
+        Build the Ollama options for a call.
+
+        Args:
+            call_type: The kind of call
+            options: Options set by the caller (optional)
+            structured: Whether the answer is constrained to JSON
+            tasks: Number of answers the call holds, e.g. the size of an extraction batch (the cap applies per answer)
+
+        Returns:
+            The options with num_predict capped and the call type's stop sequences added
+        """
+        options = dict(options or {})
+        limit = self.limits.get(call_type, DEFAULT_GENERATION_LIMIT) * max(tasks, 1)
+        requested = options.pop("max_tokens", None)
+        requested = options.get("num_predict", requested)
+        options["num_predict"] = min(int(requested), limit) if requested is not None and int(requested) > 0 else limit
+
+        if not structured and "stop" not in options and call_type in self.stops:
+            options["stop"] = list(self.stops[call_type])
+        return options
+
+    def early_stop(self, call_type: str) -> bool:
+        """Check whether a call type is cut off once its answer is complete."""
+        return call_type in self.early_stop_call_types
+
+    def record(self, call_type: str, result: Dict[str, Any]) -> None:
+        """
+        Record how a call's generation ended.
+
+        Args:
+            call_type: The kind of call
+            result: The final Ollama response
+        """
+        metrics = self._metrics.setdefault(call_type, {"calls": 0, "tokens": 0, "early_stops": 0, "capped": 0})
+        metrics["calls"] += 1
+        metrics["tokens"] += result.get("eval_count", 0)
+        if result.get("done_reason") == "early_stop":
+            metrics["early_stops"] += 1
+        elif result.get("done_reason") == "length":
+            metrics["capped"] += 1
+            logger.warning(f"Ollama {call_type} call hit its generation limit")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get generation statistics.
+
+        Returns:
+            Dictionary mapping call types to calls, average generated tokens,
+            early stops, calls that hit the limit and the limit
+        """
+        return {
+            call_type: {
+                "calls": int(metrics["calls"]),
+                "average_tokens": metrics["tokens"] / metrics["calls"],
+                "early_stops": int(metrics["early_stops"]),
+                "capped": int(metrics["capped"]),
+                "limit": self.limits.get(call_type, DEFAULT_GENERATION_LIMIT)
+            }
+            for call_type, metrics in self._metrics.items()
+        }
+
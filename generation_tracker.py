@@ -0,0 +1,176 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cancel a sender's in-flight generation when a newer message arrives for them
+GENERATION_CANCEL_ENABLED = os.environ.get("GENERATION_CANCEL_ENABLED", "true").lower() == "true"
+# Maximum number of senders whose latest message is remembered
+GENERATION_TRACKER_MAX_SENDERS = int(os.environ.get("GENERATION_TRACKER_MAX_SENDERS", "10000"))
+
+
+class StaleGenerationError(Exception):
+    """Raised when a generation was cancelled because a newer message arrived for the sender."""
+
+
+class InFlightGeneration:
+    """One running generation and the message it answers."""
+
+    def __init__(self, message_key: str, call_type: str, task: "asyncio.Future[Any]"):
+        self.message_key = message_key
+        self.call_type = call_type
+        self.task = task
+        self.started = time.monotonic()
+        self.stale = False
+
+
+class GenerationTracker:
+    """
+    Track the in-flight LLM generations of each sender and cancel stale ones.
+
+    Each generation is registered with the key of the user message it
+    answers. When a message with a different key is seen for the same sender,
+    either through another generation or through notify(), every generation
+    for an earlier message is cancelled: its Ollama request is closed, which
+    frees the scheduler slot, and the waiting action gets StaleGenerationError
+    instead of a reply. Messages are ordered by when they are first seen.
+
+    Saved time is estimated from the average duration of completed
+    generations of the same call type, less the time already spent.
+    """
+
+    def __init__(self,
+                 enabled: bool = GENERATION_CANCEL_ENABLED,
+                 max_senders: int = GENERATION_TRACKER_MAX_SENDERS):
+        """
+        Initialize the tracker.
+
+        Args:
+            enabled: Cancel stale generations when True; otherwise only run them
+            max_senders: Maximum number of senders whose latest message is remembered
+        """
+        self.enabled = enabled
+        self.max_senders = max_senders
+        self._latest: "OrderedDict[str, str]" = OrderedDict()
+        self._inflight: Dict[str, List[InFlightGeneration]] = {}
+        self._durations: Dict[str, Tuple[int, float]] = {}
+
+        self.cancelled = 0
+        self.seconds_spent = 0.0
+        self.seconds_saved = 0.0
+
+    def notify(self, sender_id: str, message_key: str) -> int:
+        """
+        Record that a message arrived for a sender, cancelling generations for earlier messages.
+
+        Args:
+            sender_id: The ID of the user
+            message_key: Identifies the message, e.g. its Rasa message_id
+
+        Returns:
+            Number of generations cancelled
+        """
+        if self._latest.get(sender_id) == message_key:
+            return 0
+        self._latest[sender_id] = message_key
+        self._latest.move_to_end(sender_id)
+        while len(self._latest) > self.max_senders:
+            self._latest.popitem(last=False)
+        if not self.enabled:
+            return 0
+
+        cancelled = 0
+        for generation in self._inflight.get(sender_id, []):
+            if generation.message_key != message_key and not generation.task.done():
+                generation.stale = True
+                generation.task.cancel()
+                cancelled += 1
+                self._record_cancel(generation)
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} stale generation(s) for {sender_id}")
+        return cancelled
+
+    def _record_cancel(self, generation: InFlightGeneration) -> None:
+        """Count a cancelled generation and the time it would still have taken."""
+        elapsed = time.monotonic() - generation.started
+        count, total = self._durations.get(generation.call_type, (0, 0.0))
+        self.cancelled += 1
+        self.seconds_spent += elapsed
+        if count:
+            self.seconds_saved += max(0.0, total / count - elapsed)
+
+    async def run(self,
+                  sender_id: str,
+                  message_key: str,
+                  fn: Callable[[], Awaitable[Any]],
+                  call_type: str = "generation") -> Any:
+        """
+        Run a generation for a message, cancelling it if a newer message arrives.
+
+        Args:
+            sender_id: The ID of the user
+            message_key: Identifies the message the generation answers
+            fn: Starts the generation
+            call_type: Kind of call, used to estimate the time saved
+
+        Returns:
+            The result of fn
+
+        Raises:
+            StaleGenerationError: If a newer message arrived for the sender first
+        """
+        self.notify(sender_id, message_key)
+
+        generation = InFlightGeneration(message_key, call_type, asyncio.ensure_future(fn()))
+        inflight = self._inflight.setdefault(sender_id, [])
+        inflight.append(generation)
+        try:
+            result = await generation.task
+        except asyncio.CancelledError:
+            if generation.stale:
+                raise StaleGenerationError(f"A newer message arrived for {sender_id}")
+            generation.task.cancel()
+            raise
+        finally:
+            inflight.remove(generation)
+            if not inflight:
+                del self._inflight[sender_id]
+
+        count, total = self._durations.get(call_type, (0, 0.0))
+        self._durations[call_type] = (count + 1, total + time.monotonic() - generation.started)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cancellation statistics.
+
+        Returns:
+            Dictionary with generations in flight, cancelled generations, seconds spent on them
+            before they were cancelled and estimated generation seconds saved
+        """
+        return {
+            "in_flight": sum(len(generations) for generations in self._inflight.values()),
+            "cancelled": self.cancelled,
+            "seconds_spent": self.seconds_spent,
+            "seconds_saved": self.seconds_saved
+        }
+
+
+_shared_tracker: Optional[GenerationTracker] = None
+
+
+def get_generation_tracker() -> GenerationTracker:
+    """
+    Get the process-wide generation tracker.
+
+    Returns:
+        The shared GenerationTracker instance
+    """
+    global _shared_tracker
+    if _shared_tracker is None:
+        _shared_tracker = GenerationTracker()
+    return _shared_tracker
@@ -0,0 +1,212 @@
+import os
+import json
+import atexit
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cache settings - persistence is disabled unless a path is configured
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH") or None
+
+
+def normalize_input(text: str) -> str:
+    """
+    Normalize user input so trivially different messages share a cache entry.
+
+    Args:
+        text: The raw user input
+
+    Returns:
+        Lowercased input with surrounding and repeated whitespace removed
+    """
+    return " ".join(str(text).lower().split())
+
+
+class ResponseCache:
+    """
+    A bounded LRU cache with TTL expiry for LLM responses.
+    Entries can optionally be persisted to a JSON file so they survive restarts.
+    """
+
+    def __init__(self,
+                 max_size: int = LLM_CACHE_SIZE,
+                 ttl: float = LLM_CACHE_TTL,
+                 path: Optional[str] = LLM_CACHE_PATH,
+                 persist_interval: float = 5.0):
+        """
+        Initialize the response cache.
+
+        Args:
+            max_size: Maximum number of entries kept in memory
+            ttl: Time in seconds before an entry expires
+            path: JSON file used to persist entries (optional)
+            persist_interval: Minimum seconds between writes to the persistence file
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.persist_interval = persist_interval
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._last_persist = 0.0
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if self.path:
+            self.load()
+
+    @staticmethod
+    def make_key(model: str, template: str, user_input: str, temperature: float) -> str:
+        """
+        Build a cache key for an LLM request.
+
+        Args:
+            model: Model name
+            template: Prompt template (system prompt and user prompt template)
+            user_input: The user input substituted into the template
+            temperature: Sampling temperature
+
+        Returns:
+            A stable hex digest identifying the request
+        """
+        raw = json.dumps([model, template, normalize_input(user_input), temperature])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached response.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            self._dirty = True
+            return None
+
+        # Mark as most recently used
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a response in the cache.
+
+        Args:
+            key: Cache key from make_key
+            value: The LLM response
+        """
+        self._entries[key] = (value, time.time() + self.ttl)
+        self._entries.move_to_end(key)
+
+        # Evict least recently used entries over the size limit
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        self._dirty = True
+        if self.path and time.time() - self._last_persist >= self.persist_interval:
+            self.save()
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self._dirty = True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with size, hit/miss counters and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def load(self) -> None:
+        """Load unexpired entries from the persistence file."""
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "r") as f:
+                stored = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"Error loading LLM cache from {self.path}: {str(e)}")
+            return
+
+        now = time.time()
+        for key, value, expires_at in stored.get("entries", []):
+            if expires_at > now:
+                self._entries[key] = (value, expires_at)
+
+        # Keep only the most recent entries if the file is larger than the cache
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+        logger.info(f"Loaded {len(self._entries)} LLM cache entries from {self.path}")
+
+    def save(self) -> None:
+        """Write the cache to the persistence file."""
+        if not self.path or not self._dirty:
+            return
+
+        tmp_path = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({"entries": [[k, v, exp] for k, (v, exp) in self._entries.items()]}, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            self._last_persist = time.time()
+        except OSError as e:
+            logger.error(f"Error writing LLM cache to {self.path}: {str(e)}")
+
+
+_extraction_cache: Optional[ResponseCache] = None
+
+
+def get_extraction_cache() -> ResponseCache:
+    """
+    Get the process-wide cache for extraction prompts.
+
+    Returns:
+        The shared ResponseCache instance
+    """
+    global _extraction_cache
+    if _extraction_cache is None:
+        _extraction_cache = ResponseCache()
+        atexit.register(_extraction_cache.save)
+    return _extraction_cache
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Record/replay settings for the shared Ollama client
+OLLAMA_CASSETTE = os.environ.get("OLLAMA_CASSETTE", "")
+OLLAMA_CASSETTE_MODE = os.environ.get("OLLAMA_CASSETTE_MODE", "replay")
+OLLAMA_CASSETTE_TIMING = os.environ.get("OLLAMA_CASSETTE_TIMING", "false").lower() == "true"
+
+CASSETTE_MODES = ["record", "replay", "auto"]
+
+# Request fields that do not change the answer and are left out of the match key
+IGNORED_REQUEST_FIELDS = ["keep_alive"]
+
+# Response headers kept in the cassette
+RECORDED_HEADERS = ["content-type"]
+
+
+class CassetteMissError(Exception):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+def request_key(method: str, path: str, body: Any) -> str:
+    """
+    Build the key a request is matched on.
+
+    Args:
+        method: HTTP method
+        path: Request path, e.g. /api/chat
+        body: Decoded JSON request body (or None)
+
+    Returns:
+        A hex digest of the method, path and canonical body
+    """
+    if isinstance(body, dict):
+        body = {k: v for k, v in body.items() if k not in IGNORED_REQUEST_FIELDS}
+    canonical = json.dumps([method, path, body], sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ReplayStream(httpx.AsyncByteStream):
+    """A response body replayed from recorded chunks, optionally at the recorded pace."""
+
+    def __init__(self, chunks: List[Dict[str, Any]], timing: bool = False):
+        self.chunks = chunks
+        self.timing = timing
+
+    async def __aiter__(self):
+        previous = 0.0
+        for chunk in self.chunks:
+            if self.timing:
+                await asyncio.sleep(max(0.0, chunk["offset"] - previous))
+                previous = chunk["offset"]
+            yield chunk["data"].encode("utf-8", "surrogateescape")
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    An httpx transport that records LLM calls to a cassette file and replays them.
+
+    In record mode every request goes upstream and its response is saved; a
+    key recorded earlier in the file is overwritten the first time it is seen.
+    In replay mode nothing goes upstream and a request without a recording
+    raises CassetteMissError. Auto mode replays what it can and records the
+    rest. Identical requests replay their recordings in order, repeating the
+    last one once they run out.
+
+    Streamed bodies are recorded chunk by chunk with their offset from the
+    start of the request, so replay can reproduce time to first token and
+    streaming pace when timing is enabled. While recording, a response is read
+    in full before it is returned.
+    """
+
+    def __init__(self,
+                 path: str,
+                 mode: str = OLLAMA_CASSETTE_MODE,
+                 timing: bool = OLLAMA_CASSETTE_TIMING,
+                 upstream: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Initialize the transport and load the cassette.
+
+        Args:
+            path: Cassette file path
+            mode: One of record, replay or auto
+            timing: Replay responses at their recorded pace
+            upstream: Transport used for recording (optional, defaults to a plain HTTP transport)
+
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self._upstream = upstream
+        self._owns_upstream = upstream is None
+        self._interactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._rerecorded: Set[str] = set()
+
+        self.replayed = 0
+        self.recorded = 0
+        self.misses = 0
+
+        self._load()
+
+    def _load(self) -> None:
+        """Load recorded interactions from the cassette file, if it exists."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"Error loading cassette from {self.path}: {str(e)}")
+            return
+        for interaction in data.get("interactions", []):
+            request = interaction["request"]
+            key = request_key(request["method"], request["path"], request.get("body"))
+            self._interactions.setdefault(key, []).append(interaction)
+        logger.info(f"Loaded {len(data.get('interactions', []))} recorded LLM calls from {self.path}")
+
+    def _save(self) -> None:
+        """Write the cassette file atomically."""
+        interactions = [interaction for recorded in self._interactions.values() for interaction in recorded]
+        tmp_path = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({"version": 1, "interactions": interactions}, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Error writing cassette to {self.path}: {str(e)}")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """
+        Replay or record one request.
+
+        Args:
+            request: The outgoing request
+
+        Returns:
+            The recorded (or freshly recorded) response
+
+        Raises:
+            CassetteMissError: If replaying and the request was never recorded
+        """
+        body_bytes = await request.aread()
+        body = json.loads(body_bytes) if body_bytes else None
+        key = request_key(request.method, request.url.path, body)
+        recorded = self._interactions.get(key, [])
+        cursor = self._cursors.get(key, 0)
+
+        if self.mode == "replay" or (self.mode == "auto" and cursor < len(recorded)):
+            if not recorded:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded response for {request.method} {request.url.path} in {self.path}")
+            interaction = recorded[min(cursor, len(recorded) - 1)]
+            self._cursors[key] = cursor + 1
+            self.replayed += 1
+            return self._build_response(interaction["response"], self.timing)
+
+        interaction = await self._record(request, body)
+        if self.mode == "record" and key not in self._rerecorded:
+            self._rerecorded.add(key)
+            self._interactions[key] = []
+        self._interactions.setdefault(key, []).append(interaction)
+        self._cursors[key] = len(self._interactions[key])
+        self.recorded += 1
+        self._save()
+        return self._build_response(interaction["response"], False)
+
+    async def _record(self, request: httpx.Request, body: Any) -> Dict[str, Any]:
+        """Send a request upstream and capture its response chunks with timings."""
+        if self._upstream is None:
+            self._upstream = httpx.AsyncHTTPTransport()
+        start = time.monotonic()
+        response = await self._upstream.handle_async_request(request)
+        chunks = []
+        try:
+            async for data in response.aiter_bytes():
+                chunks.append({"offset": time.monotonic() - start, "data": data.decode("utf-8", "surrogateescape")})
+        finally:
+            await response.aclose()
+
+        return {
+            "request": {"method": request.method, "path": request.url.path, "body": body},
+            "response": {
+                "status": response.status_code,
+                "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+                "chunks": chunks,
+                "duration": time.monotonic() - start
+            }
+        }
+
+    def _build_response(self, recorded: Dict[str, Any], timing: bool) -> httpx.Response:
+        """Build an httpx response from a recorded one."""
+        return httpx.Response(
+            recorded["status"],
+            headers=recorded.get("headers", {}),
+            stream=ReplayStream(recorded["chunks"], timing)
+        )
+
+    async def aclose(self) -> None:
+        """Close the upstream transport it opened; a new one is opened if recording continues."""
+        if self._owns_upstream and self._upstream is not None:
+            await self._upstream.aclose()
+            self._upstream = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cassette statistics.
+
+        Returns:
+            Dictionary with the mode, recorded keys, and replayed, recorded and missed requests
+        """
+        return {
+            "mode": self.mode,
+            "keys": len(self._interactions),
+            "replayed": self.replayed,
+            "recorded": self.recorded,
+            "misses": self.misses
+        }
@@ -0,0 +1,308 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Tuple, Optional, Deque, AsyncIterator
+
+from prompt_builder import PROMPT_BUDGETS
+from generation_limits import GENERATION_LIMITS
+
+logger = logging.getLogger(__name__)
+
+# Global limit on concurrent Ollama requests
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+
+# Lower numbers are served first
+CALL_PRIORITIES = {
+    "extraction": 0,
+    "intent": 1,
+    "fallback": 2,
+    "generation": 2
+}
+DEFAULT_PRIORITY = 2
+
+# Generation turns a sender may take per budget window - one every 10 seconds by default,
+# more than a person typing, so the budgets only stop runaway clients
+LLM_SENDER_TURN_BUDGET = int(os.environ.get("LLM_SENDER_TURN_BUDGET", "60"))
+# Most tokens one turn can use: a full prompt plus a capped reply for its intent and generation calls
+MAX_TURN_TOKENS = sum(PROMPT_BUDGETS[call_type] + GENERATION_LIMITS[call_type] for call_type in ["intent", "generation"])
+# LLM calls per turn that count against the request budget (intent, generation and a retry)
+REQUESTS_PER_TURN = 3
+
+# Per-sender budgets per time window (0 disables a budget)
+LLM_SENDER_TOKEN_BUDGET = int(os.environ.get("LLM_SENDER_TOKEN_BUDGET", str(LLM_SENDER_TURN_BUDGET * MAX_TURN_TOKENS)))
+LLM_SENDER_REQUEST_BUDGET = int(os.environ.get("LLM_SENDER_REQUEST_BUDGET", str(LLM_SENDER_TURN_BUDGET * REQUESTS_PER_TURN)))
+LLM_SENDER_BUDGET_WINDOW = float(os.environ.get("LLM_SENDER_BUDGET_WINDOW", "600"))
+
+# Call types that are never refused for budget reasons - they block a user's progress
+BUDGET_EXEMPT_CALL_TYPES = {"extraction"}
+
+# Key used for calls that are not tied to a conversation
+ANONYMOUS_SENDER = "_anonymous"
+
+
+class QuotaExceededError(Exception):
+    """Raised when a sender has used up their LLM budget for the current window."""
+
+
+class SenderBudget:
+    """
+    Account LLM requests and tokens per sender over a sliding time window.
+    """
+
+    def __init__(self,
+                 token_budget: int = LLM_SENDER_TOKEN_BUDGET,
+                 request_budget: int = LLM_SENDER_REQUEST_BUDGET,
+                 window: float = LLM_SENDER_BUDGET_WINDOW):
+        """
+        Initialize the sender budget.
+
+        Args:
+            token_budget: Tokens a sender may use per window (0 for unlimited)
+            request_budget: Requests a sender may make per window (0 for unlimited)
+            window: Length of the sliding window in seconds
+        """
+        self.token_budget = token_budget
+        self.request_budget = request_budget
+        self.window = window
+        self._usage: Dict[str, Deque[Tuple[float, int]]] = {}
+        self.rejected = 0
+
+    def _prune(self, sender_id: str, now: float) -> Deque[Tuple[float, int]]:
+        """Drop usage older than the window and return what is left."""
+        usage = self._usage.get(sender_id)
+        if usage is None:
+            return deque()
+        while usage and usage[0][0] <= now - self.window:
+            usage.popleft()
+        if not usage:
+            del self._usage[sender_id]
+        return usage
+
+    def usage(self, sender_id: str) -> Dict[str, int]:
+        """
+        Get a sender's usage in the current window.
+
+        Args:
+            sender_id: The ID of the user
+
+        Returns:
+            Dictionary with requests and tokens used
+        """
+        usage = self._prune(sender_id, time.monotonic())
+        return {"requests": len(usage), "tokens": sum(tokens for _, tokens in usage)}
+
+    def check(self, sender_id: Optional[str], call_type: str) -> None:
+        """
+        Check that a sender may make another call.
+
+        Args:
+            sender_id: The ID of the user (optional)
+            call_type: Kind of call; exempt types are always allowed
+
+        Raises:
+            QuotaExceededError: If the sender is over a budget
+        """
+        if not sender_id or call_type in BUDGET_EXEMPT_CALL_TYPES:
+            return
+
+        usage = self.usage(sender_id)
+        if self.request_budget and usage["requests"] >= self.request_budget:
+            self.rejected += 1
+            raise QuotaExceededError(f"Sender {sender_id} exceeded {self.request_budget} LLM requests per {self.window:.0f}s")
+        if self.token_budget and usage["tokens"] >= self.token_budget:
+            self.rejected += 1
+            raise QuotaExceededError(f"Sender {sender_id} exceeded {self.token_budget} LLM tokens per {self.window:.0f}s")
+
+    def charge(self, sender_id: Optional[str], tokens: int) -> None:
+        """
+        Record a completed call against a sender.
+
+        Args:
+            sender_id: The ID of the user (optional)
+            tokens: Prompt and completion tokens used by the call
+        """
+        if not sender_id:
+            return
+        self._usage.setdefault(sender_id, deque()).append((time.monotonic(), tokens))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get budget statistics.
+
+        Returns:
+            Dictionary with budgets, tracked senders and rejections
+        """
+        now = time.monotonic()
+        for sender_id in list(self._usage):
+            self._prune(sender_id, now)
+        return {
+            "token_budget": self.token_budget,
+            "request_budget": self.request_budget,
+            "window": self.window,
+            "tracked_senders": len(self._usage),
+            "rejected": self.rejected
+        }
+
+
+class PriorityScheduler:
+    """
+    Limit concurrent LLM calls and serve queued calls by priority class.
+
+    Short extraction calls that block a user's progress are admitted before
+    intent analysis, which is admitted before free-form generation. Within a
+    class, calls are ordered by start-time fair queuing on their sender, so a
+    chatty conversation cannot crowd out everyone else.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrency: Maximum number of calls running at once
+        """
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self._queue: List[Tuple[int, float, int, str, "asyncio.Future[None]"]] = []
+        self._sequence = itertools.count()
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+        # Fair queuing state: virtual clock and each sender's last finish tag
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._weights: Dict[str, float] = {}
+
+    def set_weight(self, sender_id: str, weight: float) -> None:
+        """
+        Give a sender a larger (or smaller) share of capacity.
+
+        Args:
+            sender_id: The ID of the user
+            weight: Relative share; the default is 1.0
+        """
+        self._weights[sender_id] = weight
+
+    def _start_tag(self, sender_id: Optional[str], cost: float) -> float:
+        """
+        Assign a fair-queuing start tag to a call and advance the sender's finish tag.
+
+        Args:
+            sender_id: The ID of the user (optional)
+            cost: Estimated cost of the call, e.g. in tokens
+
+        Returns:
+            The start tag used to order calls within a priority class
+        """
+        sender = sender_id or ANONYMOUS_SENDER
+        start = max(self._virtual_time, self._last_finish.get(sender, 0.0))
+        self._last_finish[sender] = start + cost / self._weights.get(sender, 1.0)
+
+        # Forget idle senders so the table stays bounded
+        if len(self._last_finish) > 10000:
+            self._last_finish = {k: v for k, v in self._last_finish.items() if v > self._virtual_time}
+        return start
+
+    def _class_metrics(self, call_type: str) -> Dict[str, float]:
+        """Get (or create) the metrics for a call type."""
+        return self._metrics.setdefault(call_type, {
+            "queued": 0,
+            "max_queue_depth": 0,
+            "admitted": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0
+        })
+
+    @asynccontextmanager
+    async def slot(self, call_type: str, sender_id: Optional[str] = None, cost: float = 1.0) -> AsyncIterator[None]:
+        """
+        Hold one concurrency slot for the duration of a call.
+
+        Args:
+            call_type: Kind of call, used to pick its priority class
+            sender_id: The ID of the user the call is made for (optional)
+            cost: Estimated cost of the call, e.g. in tokens
+        """
+        await self.acquire(call_type, sender_id, cost)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, call_type: str, sender_id: Optional[str] = None, cost: float = 1.0) -> None:
+        """
+        Wait until a slot is free and no higher-priority or fairer call is queued.
+
+        Args:
+            call_type: Kind of call, used to pick its priority class
+            sender_id: The ID of the user the call is made for (optional)
+            cost: Estimated cost of the call, e.g. in tokens
+        """
+        metrics = self._class_metrics(call_type)
+        start = time.monotonic()
+        start_tag = self._start_tag(sender_id, cost)
+
+        if self.active < self.max_concurrency and not self._queue:
+            self.active += 1
+            self._virtual_time = max(self._virtual_time, start_tag)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            entry = (CALL_PRIORITIES.get(call_type, DEFAULT_PRIORITY), start_tag, next(self._sequence), call_type, future)
+            heapq.heappush(self._queue, entry)
+            metrics["queued"] += 1
+            metrics["max_queue_depth"] = max(metrics["max_queue_depth"], metrics["queued"])
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over just before cancellation - pass it on
+                    self.release()
+                elif entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    metrics["queued"] -= 1
+                raise
+
+        waited = time.monotonic() - start
+        metrics["admitted"] += 1
+        metrics["total_wait"] += waited
+        metrics["max_wait"] = max(metrics["max_wait"], waited)
+
+    def release(self) -> None:
+        """Release a slot, handing it to the highest-priority queued call."""
+        while self._queue:
+            _, start_tag, _, call_type, future = heapq.heappop(self._queue)
+            self._class_metrics(call_type)["queued"] -= 1
+            if not future.done():
+                # The active count is unchanged: the slot moves to the waiter
+                self._virtual_time = max(self._virtual_time, start_tag)
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get scheduler statistics.
+
+        Returns:
+            Dictionary with active calls, queue depth and per-class wait times
+        """
+        classes = {}
+        for call_type, metrics in self._metrics.items():
+            classes[call_type] = {
+                "queued": int(metrics["queued"]),
+                "max_queue_depth": int(metrics["max_queue_depth"]),
+                "admitted": int(metrics["admitted"]),
+                "average_wait": metrics["total_wait"] / metrics["admitted"] if metrics["admitted"] else 0.0,
+                "max_wait": metrics["max_wait"]
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "queue_depth": len(self._queue),
+            "classes": classes
+        }
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Model Benchmark
+
+This script runs the profile extraction prompt over the user messages in the
+conversation logs with several Ollama models and reports, per model, the
+latency and how often its answers agree with a reference model. It is used to
+pick the models in OLLAMA_MODEL_ROUTES, e.g. whether a smaller model can take
+over extraction without hurting accuracy.
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import logging
+from typing import Dict, Any, List, Optional
+
+from ollama_client import OLLAMA_MODEL, OllamaClient
+from profile_extractor import PROFILE_SCHEMA, PROFILE_SYSTEM_PROMPT, PROFILE_PROMPT_TEMPLATE, validate_profile
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Senders whose messages are not user input
+NON_USER_SENDERS = ["bot", "system"]
+
+
+def load_user_messages(log_dir: str = "conversation_logs", limit: Optional[int] = None) -> List[str]:
+    """
+    Load the distinct user messages from the conversation logs.
+
+    Both log formats are read: a list of messages with "content", and the
+    older object with a "messages" list whose entries use "text".
+
+    Args:
+        log_dir: Directory containing conversation logs
+        limit: Maximum number of messages to return (optional)
+
+    Returns:
+        List of user messages in log order
+    """
+    if not os.path.exists(log_dir):
+        logger.error(f"Log directory not found: {log_dir}")
+        return []
+
+    messages: List[str] = []
+    for filename in sorted(os.listdir(log_dir)):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(log_dir, filename), 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            logger.error(f"Error reading {filename}")
+            continue
+
+        entries = data.get("messages", []) if isinstance(data, dict) else data
+        for entry in entries:
+            if not isinstance(entry, dict) or entry.get("sender") in NON_USER_SENDERS:
+                continue
+            text = (entry.get("content") or entry.get("text") or "").strip()
+            if text and text not in messages:
+                messages.append(text)
+                if limit is not None and len(messages) >= limit:
+                    return messages
+
+    return messages
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Get a percentile of a list of values.
+
+    Args:
+        values: The values
+        fraction: Percentile as a fraction (0-1)
+
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ModelBenchmark:
+    """
+    Compare models on the profile extraction prompt.
+
+    Every message is sent to every model, one call at a time so latencies are
+    not skewed by queueing, and the validated profiles are compared with the
+    first (reference) model's. A message agrees when the whole profile
+    matches; field agreement counts matching fields over the fields either
+    model found.
+    """
+
+    def __init__(self, client: OllamaClient, models: List[str]):
+        """
+        Initialize the benchmark.
+
+        Args:
+            client: Ollama client the calls are made with
+            models: Models to compare; the first is the reference
+        """
+        self.client = client
+        self.models = models
+
+    async def _extract(self, model: str, message: str) -> Optional[Dict[str, Any]]:
+        """Run one extraction, returning None if the call failed or could not be parsed."""
+        messages = [
+            {"role": "system", "content": PROFILE_SYSTEM_PROMPT},
+            {"role": "user", "content": PROFILE_PROMPT_TEMPLATE.format(message=message)}
+        ]
+        try:
+            result = await self.client.chat(
+                messages,
+                model=model,
+                options={"temperature": 0.0, "num_predict": 120},
+                format=PROFILE_SCHEMA,
+                call_type="extraction"
+            )
+            return validate_profile(json.loads(result.get("message", {}).get("content", "")))
+        except (json.JSONDecodeError, TypeError):
+            return None
+        except Exception as e:
+            logger.warning(f"Extraction with {model} failed: {str(e)}")
+            return None
+
+    async def run(self, messages: List[str]) -> Dict[str, Any]:
+        """
+        Run the benchmark.
+
+        Args:
+            messages: User messages to extract from
+
+        Returns:
+            Dictionary mapping models to calls, failures, mean/p50/p95 latency,
+            agreement and field agreement with the reference model
+        """
+        answers: Dict[str, List[Optional[Dict[str, Any]]]] = {}
+        latencies: Dict[str, List[float]] = {}
+        for model in self.models:
+            answers[model] = []
+            latencies[model] = []
+            logger.info(f"Benchmarking {model} on {len(messages)} messages")
+            for message in messages:
+                start = time.monotonic()
+                answers[model].append(await self._extract(model, message))
+                latencies[model].append(time.monotonic() - start)
+
+        reference = answers[self.models[0]]
+        report = {}
+        for model in self.models:
+            agreed = 0
+            fields_matched = 0
+            fields_total = 0
+            compared = 0
+            for expected, actual in zip(reference, answers[model]):
+                if expected is None or actual is None:
+                    continue
+                compared += 1
+                agreed += expected == actual
+                for field in set(expected) | set(actual):
+                    fields_total += 1
+                    fields_matched += expected.get(field) == actual.get(field)
+
+            report[model] = {
+                "calls": len(messages),
+                "failures": sum(answer is None for answer in answers[model]),
+                "mean_latency": sum(latencies[model]) / len(messages) if messages else 0.0,
+                "p50_latency": percentile(latencies[model], 0.5),
+                "p95_latency": percentile(latencies[model], 0.95),
+                "agreement": agreed / compared if compared else 0.0,
+                "field_agreement": fields_matched / fields_total if fields_total else 1.0
+            }
+        return report
+
+
+def format_report(report: Dict[str, Any], reference: str) -> str:
+    """
+    Format a benchmark report as a table.
+
+    Args:
+        report: Report produced by ModelBenchmark.run
+        reference: The reference model
+
+    Returns:
+        The formatted table
+    """
+    lines = [
+        f"Agreement is measured against {reference}",
+        f"{'model':<24} {'calls':>6} {'fails':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'agree':>7} {'fields':>7}"
+    ]
+    for model, row in report.items():
+        lines.append(
+            f"{model:<24} {row['calls']:>6} {row['failures']:>6} "
+            f"{row['mean_latency']:>7.2f}s {row['p50_latency']:>7.2f}s {row['p95_latency']:>7.2f}s "
+            f"{row['agreement']:>7.1%} {row['field_agreement']:>7.1%}"
+        )
+    return "\n".join(lines)
+
+
+async def benchmark(models: List[str], log_dir: str, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Benchmark models on the logged user messages.
+
+    Args:
+        models: Models to compare; the first is the reference
+        log_dir: Directory containing conversation logs
+        limit: Maximum number of messages (optional)
+
+    Returns:
+        The benchmark report
+    """
+    messages = load_user_messages(log_dir, limit)
+    client = OllamaClient()
+    try:
+        return await ModelBenchmark(client, models).run(messages)
+    finally:
+        await client.aclose()
+
+
+def main():
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description='Compare Ollama models on profile extraction over the logged user messages')
+
+    parser.add_argument('--models', type=str, required=True, help=f'Comma-separated models to compare; the first is the reference (e.g. {OLLAMA_MODEL},phi3:mini)')
+    parser.add_argument('--log-dir', type=str, default='conversation_logs', help='Directory containing conversation logs')
+    parser.add_argument('--limit', type=int, help='Maximum number of messages to run')
+    parser.add_argument('--output', type=str, help='Also write the report as JSON to this file')
+
+    args = parser.parse_args()
+    models = [model.strip() for model in args.models.split(",") if model.strip()]
+
+    report = asyncio.run(benchmark(models, args.log_dir, args.limit))
+    print(format_report(report, models[0]))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Report written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Model Warm-up
+
+This script loads the configured Ollama models (the default model and any
+model a call type is routed to) and runs one warm-up prompt per call type
+before the action server starts, so the model-load cost and the first prompt
+evaluations are never paid by a real user.
+
+It exits with status 0 once the models are loaded and 1 if they could not be.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+from typing import Dict, Any, List, Optional
+
+from ollama_client import OllamaClient, get_ollama_client, close_ollama_client
+from profile_extractor import PROFILE_SCHEMA, PROFILE_SYSTEM_PROMPT, PROFILE_PROMPT_TEMPLATE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Warm-up settings
+OLLAMA_WARMUP_WAIT = float(os.environ.get("OLLAMA_WARMUP_WAIT", "120"))
+OLLAMA_WARMUP_CALL_TYPES = os.environ.get("OLLAMA_WARMUP_CALL_TYPES", "extraction,intent,generation,fallback").split(",")
+OLLAMA_READY_FILE = os.environ.get("OLLAMA_READY_FILE", "")
+
+# Seconds between checks while waiting for Ollama to come up
+POLL_INTERVAL = 2.0
+
+GENERATION_SYSTEM_PROMPT = "You are Hapa, a friendly dating profile assistant with a cat-like personality."
+
+# One short prompt per call type: (system prompt, user prompt, options, structured output format)
+WARMUP_PROMPTS = {
+    "extraction": (
+        PROFILE_SYSTEM_PROMPT,
+        PROFILE_PROMPT_TEMPLATE.format(message="Hi, I'm Sam and I'm 28"),
+        {"temperature": 0.0, "num_predict": 120},
+        PROFILE_SCHEMA
+    ),
+    "intent": (
+        "You are a helpful assistant that analyzes user messages to determine their intent.",
+        'User message: "tell me more"\n\nJust provide the category number and a brief explanation.',
+        {"temperature": 0.2, "num_predict": 20},
+        None
+    ),
+    "generation": (
+        GENERATION_SYSTEM_PROMPT,
+        "LATEST MESSAGE: I love hiking\n\nRespond in one short sentence.",
+        {"temperature": 0.7, "num_predict": 20},
+        None
+    ),
+    "fallback": (
+        GENERATION_SYSTEM_PROMPT,
+        "hello",
+        {"temperature": 0.7, "num_predict": 20},
+        None
+    )
+}
+
+
+def model_matches(name: str, model: str) -> bool:
+    """
+    Check whether an installed model name refers to the configured model.
+
+    Args:
+        name: Model name reported by /api/tags, e.g. "phi4:latest"
+        model: Configured model name, e.g. "phi4"
+
+    Returns:
+        True if they refer to the same model
+    """
+    if ":" not in model:
+        model = f"{model}:latest"
+    if ":" not in name:
+        name = f"{name}:latest"
+    return name == model
+
+
+class ModelWarmup:
+    """
+    Bring the Ollama model to a ready state and measure how long it took.
+
+    Warm-up waits for Ollama to answer, checks that every model the call types
+    are routed to is installed, loads each with an empty chat request (kept
+    loaded for the client's keep_alive), then runs one short prompt per call
+    type and times it.
+    With several backends, each one is warmed up in parallel and the model is
+    ready once every backend has loaded it.
+    """
+
+    def __init__(self,
+                 client: Optional[OllamaClient] = None,
+                 call_types: Optional[List[str]] = None,
+                 wait: float = OLLAMA_WARMUP_WAIT):
+        """
+        Initialize the warm-up.
+
+        Args:
+            client: Ollama client (optional, defaults to the shared client)
+            call_types: Call types to warm up (optional, defaults to OLLAMA_WARMUP_CALL_TYPES)
+            wait: Seconds to wait for Ollama to come up
+        """
+        self._client = client
+        self.call_types = call_types or OLLAMA_WARMUP_CALL_TYPES
+        self.wait = wait
+        self.report: Dict[str, Any] = {"ready": False}
+
+    @property
+    def client(self) -> OllamaClient:
+        return self._client or get_ollama_client()
+
+    async def _wait_for_server(self, client: OllamaClient) -> List[str]:
+        """Wait until Ollama answers and return the installed model names."""
+        deadline = time.monotonic() + self.wait
+        while True:
+            try:
+                return await client.list_models()
+            except Exception as e:
+                if time.monotonic() >= deadline:
+                    raise
+                logger.info(f"Waiting for Ollama at {client.host}: {str(e)}")
+                await asyncio.sleep(POLL_INTERVAL)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Warm the model up.
+
+        Returns:
+            Report with ready, load_seconds, per model load seconds, per call type warm-up seconds
+            (None if it failed) and total_seconds, or with ready and a report per backend when there are several
+        """
+        if self.client.backends is None:
+            self.report = await self._run_backend(self.client)
+            return self.report
+
+        hosts = [backend.host for backend in self.client.backends.backends]
+        clients = [
+            OllamaClient(host=host, model=self.client.model, keep_alive=self.client.keep_alive,
+                         model_routes=self.client.model_routes)
+            for host in hosts
+        ]
+        try:
+            reports = await asyncio.gather(*(self._run_backend(client) for client in clients))
+        finally:
+            for client in clients:
+                await client.aclose()
+
+        self.report = {
+            "ready": all(report["ready"] for report in reports),
+            "model": self.client.model,
+            "backends": dict(zip(hosts, reports))
+        }
+        return self.report
+
+    async def _run_backend(self, client: OllamaClient) -> Dict[str, Any]:
+        """Warm up the model on a single Ollama server."""
+        start = time.monotonic()
+        report: Dict[str, Any] = {"ready": False, "model": client.model, "load_seconds": None, "models": {}, "call_types": {}}
+
+        # The default model first, then each model a warmed-up call type is routed to
+        wanted = [client.model]
+        for call_type in self.call_types:
+            if client.model_for(call_type) not in wanted:
+                wanted.append(client.model_for(call_type))
+
+        try:
+            models = await self._wait_for_server(client)
+        except Exception as e:
+            logger.error(f"Ollama is not reachable at {client.host}: {str(e)}")
+            report["error"] = "unreachable"
+            return report
+
+        for model in wanted:
+            if not any(model_matches(name, model) for name in models):
+                logger.error(f"Model {model} is not installed in Ollama; run `ollama pull {model}`")
+                report["error"] = "model not installed"
+                return report
+
+        load_start = time.monotonic()
+        for model in wanted:
+            model_start = time.monotonic()
+            try:
+                await client.chat([], model=model, call_type="generation")
+            except Exception as e:
+                logger.error(f"Error loading model {model}: {str(e)}")
+                report["error"] = "load failed"
+                return report
+            report["models"][model] = time.monotonic() - model_start
+            logger.info(f"Loaded model {model} on {client.host} in {report['models'][model]:.2f}s")
+        report["load_seconds"] = time.monotonic() - load_start
+
+        for call_type in self.call_types:
+            if call_type not in WARMUP_PROMPTS:
+                logger.warning(f"No warm-up prompt for call type {call_type}")
+                continue
+            system_prompt, user_prompt, options, format = WARMUP_PROMPTS[call_type]
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+            call_start = time.monotonic()
+            try:
+                await client.chat(messages, options=options, format=format, call_type=call_type)
+                report["call_types"][call_type] = time.monotonic() - call_start
+                logger.info(f"Warmed up {call_type} in {report['call_types'][call_type]:.2f}s")
+            except Exception as e:
+                report["call_types"][call_type] = None
+                logger.warning(f"Warm-up {call_type} prompt failed: {str(e)}")
+
+        report["ready"] = True
+        report["total_seconds"] = time.monotonic() - start
+        logger.info(f"Models {', '.join(wanted)} are ready on {client.host} after {report['total_seconds']:.2f}s")
+        return report
+
+
+def write_ready_file(path: str, report: Dict[str, Any]) -> None:
+    """
+    Write the warm-up report so other processes can check readiness.
+
+    Args:
+        path: Ready file path
+        report: Report produced by ModelWarmup.run
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(dict(report, finished_at=time.time()), f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error(f"Error writing ready file {path}: {str(e)}")
+
+
+async def warm_up(call_types: Optional[List[str]] = None, wait: float = OLLAMA_WARMUP_WAIT) -> Dict[str, Any]:
+    """
+    Warm up the shared client's model and close the client afterwards.
+
+    Args:
+        call_types: Call types to warm up (optional)
+        wait: Seconds to wait for Ollama to come up
+
+    Returns:
+        The warm-up report
+    """
+    try:
+        return await ModelWarmup(call_types=call_types, wait=wait).run()
+    finally:
+        await close_ollama_client()
+
+
+def main():
+    """Main function to run the warm-up."""
+    parser = argparse.ArgumentParser(description='Load the Ollama model and warm it up before the action server starts')
+
+    parser.add_argument('--call-types', type=str, default=",".join(OLLAMA_WARMUP_CALL_TYPES), help='Comma-separated call types to warm up')
+    parser.add_argument('--wait', type=float, default=OLLAMA_WARMUP_WAIT, help='Seconds to wait for Ollama to come up')
+    parser.add_argument('--ready-file', type=str, default=OLLAMA_READY_FILE, help='Write the warm-up report to this file once ready')
+
+    args = parser.parse_args()
+
+    report = asyncio.run(warm_up(args.call_types.split(","), args.wait))
+    print(json.dumps(report, indent=2))
+
+    if args.ready_file:
+        if report["ready"]:
+            write_ready_file(args.ready_file, report)
+        elif os.path.exists(args.ready_file):
+            os.remove(args.ready_file)
+
+    sys.exit(0 if report["ready"] else 1)
+
+if __name__ == '__main__':
+    main()
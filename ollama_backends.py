@@ -0,0 +1,294 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Backend health settings
+OLLAMA_BACKEND_MAX_FAILURES = int(os.environ.get("OLLAMA_BACKEND_MAX_FAILURES", "3"))
+OLLAMA_BACKEND_EJECT_SECONDS = float(os.environ.get("OLLAMA_BACKEND_EJECT_SECONDS", "30"))
+OLLAMA_HEALTH_CHECK_INTERVAL = float(os.environ.get("OLLAMA_HEALTH_CHECK_INTERVAL", "10"))
+OLLAMA_HEALTH_CHECK_TIMEOUT = float(os.environ.get("OLLAMA_HEALTH_CHECK_TIMEOUT", "5"))
+
+
+class Backend:
+    """One Ollama server and its request counters."""
+
+    def __init__(self, host: str):
+        self.host = host.rstrip("/")
+        self.url = httpx.URL(self.host)
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.total_latency = 0.0
+
+    def healthy(self, now: float) -> bool:
+        """Check whether the backend is in rotation."""
+        return now >= self.ejected_until
+
+
+class BackendPool:
+    """
+    Route requests across several Ollama servers.
+
+    Each request goes to the healthy backend with the fewest outstanding
+    requests. A backend that fails several requests in a row, or fails a
+    health check, is ejected for a while; a passing health check puts it back.
+    If every backend is ejected, requests still go to the one whose ejection
+    ends first rather than failing outright.
+    """
+
+    def __init__(self,
+                 hosts: List[str],
+                 max_failures: int = OLLAMA_BACKEND_MAX_FAILURES,
+                 eject_seconds: float = OLLAMA_BACKEND_EJECT_SECONDS):
+        """
+        Initialize the pool.
+
+        Args:
+            hosts: Base URLs of the Ollama servers
+            max_failures: Consecutive failures after which a backend is ejected
+            eject_seconds: How long an ejected backend stays out of rotation
+        """
+        self.backends = [Backend(host) for host in hosts]
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.forced = 0
+
+    def choose(self) -> Backend:
+        """
+        Pick the backend for the next request and count it as outstanding.
+
+        Returns:
+            The chosen Backend
+        """
+        now = time.monotonic()
+        healthy = [backend for backend in self.backends if backend.healthy(now)]
+        if healthy:
+            backend = min(healthy, key=lambda b: (b.outstanding, b.requests))
+        else:
+            self.forced += 1
+            backend = min(self.backends, key=lambda b: b.ejected_until)
+        backend.outstanding += 1
+        backend.requests += 1
+        return backend
+
+    def release(self, backend: Backend, ok: Optional[bool], latency: Optional[float] = None) -> None:
+        """
+        Record the outcome of a request to a backend.
+
+        Args:
+            backend: The backend the request went to
+            ok: Whether the backend answered without a server error (None if the request was cancelled)
+            latency: Seconds until the response headers arrived (optional)
+        """
+        backend.outstanding -= 1
+        if latency is not None:
+            backend.total_latency += latency
+        if ok is None:
+            return
+        if ok:
+            backend.consecutive_failures = 0
+            return
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= self.max_failures:
+            self.eject(backend)
+
+    def eject(self, backend: Backend) -> None:
+        """
+        Take a backend out of rotation.
+
+        Args:
+            backend: The backend to eject
+        """
+        if backend.healthy(time.monotonic()):
+            backend.ejections += 1
+            logger.warning(f"Ejecting Ollama backend {backend.host} for {self.eject_seconds:.0f}s")
+        backend.ejected_until = time.monotonic() + self.eject_seconds
+
+    def restore(self, backend: Backend) -> None:
+        """
+        Put a backend back into rotation.
+
+        Args:
+            backend: The backend to restore
+        """
+        if not backend.healthy(time.monotonic()):
+            logger.info(f"Ollama backend {backend.host} is healthy again")
+        backend.ejected_until = 0.0
+        backend.consecutive_failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get per-backend statistics.
+
+        Returns:
+            Dictionary mapping backend hosts to health, outstanding and total requests,
+            failures, ejections and average latency, plus the number of forced requests
+        """
+        now = time.monotonic()
+        return {
+            "forced": self.forced,
+            "backends": {
+                backend.host: {
+                    "healthy": backend.healthy(now),
+                    "outstanding": backend.outstanding,
+                    "requests": backend.requests,
+                    "failures": backend.failures,
+                    "ejections": backend.ejections,
+                    "average_latency": backend.total_latency / backend.requests if backend.requests else 0.0
+                }
+                for backend in self.backends
+            }
+        }
+
+
+class TrackedStream(httpx.AsyncByteStream):
+    """A response body that releases its backend once it is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self.stream = stream
+        self.on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+                self.on_close = None
+
+
+class BalancingTransport(httpx.AsyncBaseTransport):
+    """
+    An httpx transport that sends each request to a backend chosen by a BackendPool.
+
+    A request counts as outstanding until its response body is closed, so a
+    long streamed generation keeps its backend busy for its whole duration.
+    Health checks (GET /api/tags) run in the background on the event loop
+    that sends the requests.
+    """
+
+    def __init__(self,
+                 pool: BackendPool,
+                 upstream: Optional[httpx.AsyncBaseTransport] = None,
+                 health_check_interval: float = OLLAMA_HEALTH_CHECK_INTERVAL,
+                 limits: Optional[httpx.Limits] = None):
+        """
+        Initialize the transport.
+
+        Args:
+            pool: The backend pool
+            upstream: Transport that performs the requests (optional, defaults to a plain HTTP transport)
+            health_check_interval: Seconds between health checks (0 disables them)
+            limits: Connection limits for the default upstream transport (optional)
+        """
+        self.pool = pool
+        self._upstream = upstream
+        self._owns_upstream = upstream is None
+        self.health_check_interval = health_check_interval
+        self.limits = limits or httpx.Limits()
+        self._health_task: Optional["asyncio.Task[None]"] = None
+        self._health_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def upstream(self) -> httpx.AsyncBaseTransport:
+        if self._upstream is None:
+            self._upstream = httpx.AsyncHTTPTransport(limits=self.limits)
+        return self._upstream
+
+    def _start_health_checks(self) -> None:
+        """Start the health check loop on the running event loop (once)."""
+        if self.health_check_interval <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        if self._health_task is None or self._health_task.done() or self._health_loop is not loop:
+            self._health_task = loop.create_task(self._health_check_loop())
+            self._health_loop = loop
+
+    async def _health_check_loop(self) -> None:
+        """Check every backend periodically."""
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await self.check_health()
+
+    async def check_health(self) -> None:
+        """Check every backend once, ejecting or restoring it."""
+        await asyncio.gather(*(self._check_backend(backend) for backend in self.pool.backends))
+
+    async def _check_backend(self, backend: Backend) -> None:
+        """Check one backend with GET /api/tags."""
+        request = httpx.Request(
+            "GET",
+            backend.url.join("/api/tags"),
+            extensions={"timeout": httpx.Timeout(OLLAMA_HEALTH_CHECK_TIMEOUT).as_dict()}
+        )
+        try:
+            response = await self.upstream.handle_async_request(request)
+            await response.aclose()
+            ok = response.status_code < 500
+        except Exception as e:
+            logger.warning(f"Health check failed for Ollama backend {backend.host}: {str(e)}")
+            ok = False
+        if ok:
+            self.pool.restore(backend)
+        else:
+            self.pool.eject(backend)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """
+        Send a request to the chosen backend.
+
+        Args:
+            request: The outgoing request, addressed to any backend
+
+        Returns:
+            The backend's response
+        """
+        self._start_health_checks()
+        backend = self.pool.choose()
+        request.url = request.url.copy_with(scheme=backend.url.scheme, host=backend.url.host, port=backend.url.port)
+        request.headers["Host"] = request.url.netloc.decode("ascii")
+
+        start = time.monotonic()
+        try:
+            response = await self.upstream.handle_async_request(request)
+        except Exception:
+            self.pool.release(backend, ok=False)
+            raise
+        except BaseException:
+            # A cancelled call frees its slot without counting against the backend
+            self.pool.release(backend, ok=None)
+            raise
+
+        latency = time.monotonic() - start
+        ok = response.status_code < 500
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=TrackedStream(response.stream, lambda: self.pool.release(backend, ok, latency)),
+            extensions=response.extensions
+        )
+
+    async def aclose(self) -> None:
+        """Stop the health checks and close the upstream transport it opened."""
+        if self._health_task is not None:
+            if self._health_loop is asyncio.get_running_loop():
+                self._health_task.cancel()
+            self._health_task = None
+            self._health_loop = None
+        if self._owns_upstream and self._upstream is not None:
+            await self._upstream.aclose()
+            self._upstream = None
@@ -0,0 +1,601 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncIterator
+
+import httpx
+
+from circuit_breaker import CircuitBreaker, LatencyTracker
+from request_hedging import RequestHedger
+from generation_limits import GenerationPolicy, answer_end
+from turn_deadline import DeadlineExceededError, current_deadline, get_turn_budgets
+from llm_scheduler import LLM_MAX_CONCURRENCY, PriorityScheduler, SenderBudget
+from llm_cassette import OLLAMA_CASSETTE, CassetteTransport
+from ollama_backends import BackendPool, BalancingTransport
+from prompt_builder import estimate_message_tokens
+
+logger = logging.getLogger(__name__)
+
+# Ollama API endpoint and model - defaults target a local Ollama install
+OLLAMA_API_HOST = os.environ.get("OLLAMA_API_HOST", "http://localhost:11434")
+# Comma-separated list of Ollama servers to balance across (defaults to OLLAMA_API_HOST)
+OLLAMA_API_HOSTS = [host.strip() for host in os.environ.get("OLLAMA_API_HOSTS", OLLAMA_API_HOST).split(",") if host.strip()]
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "phi4")
+# Models per call type, e.g. "extraction=phi3:mini,intent=phi3:mini" - other call types use OLLAMA_MODEL
+OLLAMA_MODEL_ROUTES = os.environ.get("OLLAMA_MODEL_ROUTES", "")
+
+# Connection pool settings for the shared client
+OLLAMA_TIMEOUT = float(os.environ.get("OLLAMA_TIMEOUT", "300.0"))
+OLLAMA_MAX_CONNECTIONS = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "20"))
+OLLAMA_MAX_KEEPALIVE = int(os.environ.get("OLLAMA_MAX_KEEPALIVE", "10"))
+
+# How long Ollama keeps the model (and its prompt cache) loaded after a request
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+# Calls that spent longer than this loading the model are counted as cold starts
+OLLAMA_COLD_LOAD_SECONDS = float(os.environ.get("OLLAMA_COLD_LOAD_SECONDS", "1.0"))
+
+
+def parse_model_routes(routes: str) -> Dict[str, str]:
+    """
+    Parse a model routing table.
+
+    Args:
+        routes: Comma-separated call_type=model pairs
+
+    Returns:
+        Dictionary mapping call types to model names
+    """
+    table = {}
+    for route in routes.split(","):
+        call_type, _, model = route.partition("=")
+        if call_type.strip() and model.strip():
+            table[call_type.strip()] = model.strip()
+    return table
+
+
+def estimate_tokens(payload: Dict[str, Any]) -> int:
+    """
+    Roughly estimate the tokens a chat request will use.
+
+    Args:
+        payload: The /api/chat request body
+
+    Returns:
+        Estimated prompt tokens plus the generation limit
+    """
+    return estimate_message_tokens(payload.get("messages", [])) + int(payload.get("options", {}).get("num_predict", 0))
+
+
+def used_tokens(result: Dict[str, Any], payload: Dict[str, Any]) -> int:
+    """
+    Get the tokens a completed call used, falling back to an estimate.
+
+    Args:
+        result: The final Ollama response (or last streamed chunk)
+        payload: The /api/chat request body
+
+    Returns:
+        Prompt plus completion tokens
+    """
+    counted = result.get("prompt_eval_count", 0) + result.get("eval_count", 0)
+    return counted or estimate_tokens(payload)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical requests into a single in-flight call.
+    Callers that ask for a key that is already running await the same result
+    instead of starting a duplicate request.
+    """
+
+    def __init__(self):
+        """Initialize the single-flight group."""
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self._waiters: Dict[str, int] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key: Identifies identical requests
+            fn: Coroutine function performing the request
+
+        Returns:
+            The shared result of fn
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"Coalescing identical in-flight Ollama request ({len(self._inflight)} in flight)")
+
+        # Shield the shared task so one cancelled caller does not cancel the others
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Stop the upstream request once nobody is waiting for it
+            if self._waiters.get(key) == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def _finish(self, key: str, task: "asyncio.Future[Any]") -> None:
+        """Forget a completed task and mark its exception as retrieved."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get single-flight statistics.
+
+        Returns:
+            Dictionary with upstream calls, coalesced callers and requests in flight
+        """
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight)
+        }
+
+
+class PromptEvalTracker:
+    """
+    Track how many prompt tokens Ollama had to evaluate per call type, and how long it took.
+    Prompt prefixes Ollama reuses from its cache are not counted in prompt_eval_count.
+    Calls that had to wait for the model to load are counted as cold starts.
+    """
+
+    def __init__(self):
+        """Initialize the tracker."""
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def record(self, call_type: str, result: Dict[str, Any]) -> None:
+        """
+        Record the prompt evaluation figures from a final Ollama response.
+
+        Args:
+            call_type: The kind of call
+            result: The final Ollama response (or last streamed chunk)
+        """
+        if "prompt_eval_count" not in result and "prompt_eval_duration" not in result:
+            return
+        metrics = self._metrics.setdefault(call_type, {"calls": 0, "prompt_tokens": 0, "prompt_eval_seconds": 0.0, "last_prompt_eval_seconds": 0.0, "cold_loads": 0})
+        seconds = result.get("prompt_eval_duration", 0) / 1e9
+        load_seconds = result.get("load_duration", 0) / 1e9
+        if load_seconds > OLLAMA_COLD_LOAD_SECONDS:
+            metrics["cold_loads"] += 1
+            logger.warning(f"Ollama {call_type} call waited {load_seconds:.1f}s for the model to load")
+        metrics["calls"] += 1
+        metrics["prompt_tokens"] += result.get("prompt_eval_count", 0)
+        metrics["prompt_eval_seconds"] += seconds
+        metrics["last_prompt_eval_seconds"] = seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get prompt evaluation statistics per call type.
+
+        Returns:
+            Dictionary mapping call types to average evaluated prompt tokens, prompt eval time and cold starts
+        """
+        return {
+            call_type: {
+                "calls": int(metrics["calls"]),
+                "average_prompt_tokens": metrics["prompt_tokens"] / metrics["calls"],
+                "average_prompt_eval_seconds": metrics["prompt_eval_seconds"] / metrics["calls"],
+                "last_prompt_eval_seconds": metrics["last_prompt_eval_seconds"],
+                "cold_loads": int(metrics["cold_loads"])
+            }
+            for call_type, metrics in self._metrics.items()
+        }
+
+
+class OllamaClient:
+    """
+    An async client for the Ollama chat API.
+    A single instance is shared by every action so that HTTP connections are
+    pooled and kept alive across turns and conversations.
+    """
+
+    def __init__(self,
+                 host: str = OLLAMA_API_HOST,
+                 model: str = OLLAMA_MODEL,
+                 timeout: float = OLLAMA_TIMEOUT,
+                 max_connections: int = OLLAMA_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = OLLAMA_MAX_KEEPALIVE,
+                 keep_alive: Optional[str] = OLLAMA_KEEP_ALIVE,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 hosts: Optional[List[str]] = None,
+                 model_routes: Optional[Dict[str, str]] = None):
+        """
+        Initialize the Ollama client.
+
+        With more than one host, requests are balanced across them and the
+        concurrency limit applies per host.
+
+        Args:
+            host: Base URL of the Ollama server
+            model: Default model used for chat requests
+            timeout: Read timeout in seconds for a single request
+            max_connections: Maximum number of open connections
+            max_keepalive_connections: Maximum number of idle connections kept alive
+            keep_alive: How long Ollama keeps the model loaded, e.g. "30m" (optional)
+            transport: Custom httpx transport (optional, used by tests)
+            hosts: Base URLs of several Ollama servers to balance across (optional, overrides host)
+            model_routes: Models per call type (optional, defaults to OLLAMA_MODEL_ROUTES)
+        """
+        self.model = model
+        self.model_routes = model_routes if model_routes is not None else parse_model_routes(OLLAMA_MODEL_ROUTES)
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.backends: Optional[BackendPool] = None
+        if hosts and len(hosts) > 1:
+            host = hosts[0]
+            self.backends = BackendPool(hosts)
+            transport = BalancingTransport(self.backends, transport, limits=self.limits)
+        self.host = host.rstrip("/")
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.single_flight = SingleFlight()
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyTracker(max_timeout=timeout)
+        self.hedger = RequestHedger(self.latency)
+        self.scheduler = PriorityScheduler(LLM_MAX_CONCURRENCY * len(self.backends.backends) if self.backends else LLM_MAX_CONCURRENCY)
+        self.budget = SenderBudget()
+        self.prompt_eval = PromptEvalTracker()
+        self.generation = GenerationPolicy()
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """
+        Return the pooled HTTP client, creating it on first use.
+
+        The pool is bound to the event loop it was created on, so a new one is
+        opened if the running loop changes (e.g. between asyncio.run calls).
+
+        Returns:
+            The shared httpx.AsyncClient
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.host,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=self.limits,
+                transport=self._transport
+            )
+            self._loop = loop
+        return self._client
+
+    def model_for(self, call_type: str) -> str:
+        """
+        Get the model a call type is routed to.
+
+        Args:
+            call_type: The kind of call
+
+        Returns:
+            The routed model, or the default model
+        """
+        return self.model_routes.get(call_type, self.model)
+
+    def expected_latency(self, call_type: str) -> Optional[float]:
+        """
+        Estimate how long a call would take to complete under the current load.
+
+        Args:
+            call_type: The kind of call
+
+        Returns:
+            The median latency of the call type scaled by the queued calls per
+            scheduler slot, or None if no latencies have been recorded
+        """
+        median = self.latency.percentile_latency(call_type, 0.5)
+        if median is None:
+            return None
+        return median * (1 + self.scheduler.stats()["queue_depth"] / self.scheduler.max_concurrency)
+
+    async def chat(self,
+                   messages: List[Dict[str, str]],
+                   model: Optional[str] = None,
+                   options: Optional[Dict[str, Any]] = None,
+                   format: Optional[Any] = None,
+                   call_type: str = "generation",
+                   sender_id: Optional[str] = None,
+                   tasks: int = 1) -> Dict[str, Any]:
+        """
+        Send a non-streaming chat request.
+
+        Identical requests that are already in flight share one upstream call.
+        Calls fail fast while the circuit breaker is open, the sender is over
+        budget or the call would not finish within the turn's deadline, and each
+        call type gets a timeout derived from its observed latencies (capped at
+        the turn's remaining budget). The call type's generation limit and stop
+        sequences are applied to the options.
+
+        Args:
+            messages: Chat messages in Ollama format
+            model: Model name (optional, defaults to the model routed for the call type)
+            options: Ollama generation options (optional)
+            format: Structured output format, "json" or a JSON schema (optional)
+            call_type: Kind of call used for priority and timeouts (extraction, intent, generation, fallback)
+            sender_id: The ID of the user the call is made for, used for fair sharing (optional)
+            tasks: Number of answers the call holds; the generation limit applies per answer (optional)
+
+        Returns:
+            The decoded JSON response from Ollama
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            QuotaExceededError: If the sender has used up their budget
+            DeadlineExceededError: If the call would not finish within the turn's deadline
+            asyncio.TimeoutError: If the call exceeds its adaptive timeout
+        """
+        payload = {
+            "model": model or self.model_for(call_type),
+            "messages": messages,
+            "stream": False,
+            "options": self.generation.options(call_type, options, format is not None, tasks)
+        }
+        if format is not None:
+            payload["format"] = format
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+        get_turn_budgets().admit(call_type, self.expected_latency(call_type))
+        self.budget.check(sender_id, call_type)
+        probe = self.breaker.before_call()
+        try:
+            return await self.single_flight.do(key, lambda: self._run_chat(payload, call_type, sender_id))
+        except BaseException:
+            # However the probe ended, it must not stay in flight
+            if probe:
+                self.breaker.record_cancelled()
+            raise
+
+    async def _run_chat(self, payload: Dict[str, Any], call_type: str, sender_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run one upstream chat call in a scheduler slot with its adaptive timeout.
+
+        The timeout covers only the upstream request, not the time spent queued.
+        Slow calls of hedged call types get a duplicate request, which shares the
+        slot. Coalesced calls are charged to the sender that started them.
+
+        Args:
+            payload: The /api/chat request body
+            call_type: Kind of call, used for priority and timeout
+            sender_id: The ID of the user the call is made for (optional)
+
+        Returns:
+            The decoded JSON response from Ollama
+        """
+        async with self.scheduler.slot(call_type, sender_id, estimate_tokens(payload)):
+            timeout = self.latency.timeout_for(call_type)
+            deadline = current_deadline()
+            capped = deadline is not None and deadline.remaining() < timeout
+            if capped:
+                timeout = deadline.remaining()
+            start = time.monotonic()
+            try:
+                result = await asyncio.wait_for(self.hedger.run(call_type, lambda: self._post_chat(payload, call_type)), timeout)
+            except asyncio.TimeoutError:
+                if capped:
+                    # Running out of turn budget says nothing about Ollama's health
+                    # (chat() releases the probe if this was one)
+                    raise DeadlineExceededError(f"Ollama {call_type} call ran past the turn deadline") from None
+                logger.warning(f"Ollama {call_type} call timed out after {timeout:.1f}s")
+                self.breaker.record_failure()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
+
+            self.breaker.record_success()
+            self.latency.record(call_type, time.monotonic() - start)
+            self.prompt_eval.record(call_type, result)
+            self.generation.record(call_type, result)
+            self.budget.charge(sender_id, used_tokens(result, payload))
+            return result
+
+    async def _post_chat(self, payload: Dict[str, Any], call_type: str = "generation") -> Dict[str, Any]:
+        """
+        Post a chat payload to Ollama.
+
+        Call types that stop early are streamed instead, and the request is
+        closed as soon as the answer is complete so Ollama stops generating.
+
+        Args:
+            payload: The /api/chat request body
+            call_type: Kind of call, used to decide whether to stop early
+
+        Returns:
+            The decoded JSON response from Ollama
+        """
+        if self.generation.early_stop(call_type):
+            return await self._post_chat_until_complete(payload)
+
+        logger.info(f"Sending request to Ollama API at {self.host}/api/chat")
+        response = await self._get_http_client().post("/api/chat", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def _post_chat_until_complete(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Stream a chat payload and stop reading once the answer is complete.
+
+        A structured answer is complete when its JSON object closes and a plain
+        answer at its first newline. If the answer completes before Ollama is
+        done, the result has done_reason "early_stop" and eval_count holds the
+        chunks received.
+
+        Args:
+            payload: The /api/chat request body (sent with streaming on)
+
+        Returns:
+            A response shaped like a non-streaming Ollama response
+        """
+        structured = "format" in payload
+        logger.info(f"Sending streaming request to Ollama API at {self.host}/api/chat")
+        content = ""
+        chunks = 0
+        async with self._get_http_client().stream("POST", "/api/chat", json=dict(payload, stream=True)) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Ollama streaming error: {chunk['error']}")
+                content += chunk.get("message", {}).get("content", "")
+                if chunk.get("done"):
+                    return dict(chunk, message={"role": "assistant", "content": content})
+                chunks += 1
+                end = answer_end(content, structured)
+                if end is not None:
+                    # Leaving the block closes the connection, which stops the generation
+                    return {
+                        "model": chunk.get("model", payload["model"]),
+                        "created_at": chunk.get("created_at"),
+                        "message": {"role": "assistant", "content": content[:end]},
+                        "done": True,
+                        "done_reason": "early_stop",
+                        "eval_count": chunks
+                    }
+        return {"message": {"role": "assistant", "content": content}, "done": True}
+
+    async def chat_stream(self,
+                          messages: List[Dict[str, str]],
+                          model: Optional[str] = None,
+                          options: Optional[Dict[str, Any]] = None,
+                          call_type: str = "generation",
+                          sender_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Send a streaming chat request and yield content as it is generated.
+
+        Args:
+            messages: Chat messages in Ollama format
+            model: Model name (optional, defaults to the model routed for the call type)
+            options: Ollama generation options (optional)
+            call_type: Kind of call, used to pick its scheduler priority
+            sender_id: The ID of the user the call is made for, used for fair sharing (optional)
+
+        Yields:
+            Pieces of the assistant message content
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            QuotaExceededError: If the sender has used up their budget
+            DeadlineExceededError: If the call would not finish within the turn's deadline
+        """
+        payload = {
+            "model": model or self.model_for(call_type),
+            "messages": messages,
+            "stream": True,
+            "options": self.generation.options(call_type, options)
+        }
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+
+        get_turn_budgets().admit(call_type, self.expected_latency(call_type))
+        self.budget.check(sender_id, call_type)
+        probe = self.breaker.before_call()
+        logger.info(f"Sending streaming request to Ollama API at {self.host}/api/chat")
+        last_chunk: Dict[str, Any] = {}
+        try:
+            async with self.scheduler.slot(call_type, sender_id, estimate_tokens(payload)):
+                async with self._get_http_client().stream("POST", "/api/chat", json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if "error" in chunk:
+                            raise RuntimeError(f"Ollama streaming error: {chunk['error']}")
+                        content = chunk.get("message", {}).get("content", "")
+                        if content:
+                            yield content
+                        if chunk.get("done"):
+                            last_chunk = chunk
+                            break
+        except (asyncio.CancelledError, GeneratorExit):
+            if probe:
+                self.breaker.record_cancelled()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        self.prompt_eval.record(call_type, last_chunk)
+        self.generation.record(call_type, last_chunk)
+        self.budget.charge(sender_id, used_tokens(last_chunk, payload))
+
+    async def list_models(self) -> List[str]:
+        """
+        List the models installed in Ollama.
+
+        Returns:
+            Model names, e.g. "phi4:latest"
+        """
+        response = await self._get_http_client().get("/api/tags")
+        response.raise_for_status()
+        return [model.get("name", "") for model in response.json().get("models", [])]
+
+    async def aclose(self) -> None:
+        """Close the pooled connections."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+_shared_client: Optional[OllamaClient] = None
+
+
+def get_ollama_client() -> OllamaClient:
+    """
+    Get the process-wide Ollama client.
+
+    If OLLAMA_CASSETTE is set, calls are recorded to or replayed from that
+    cassette file according to OLLAMA_CASSETTE_MODE.
+
+    Returns:
+        The shared OllamaClient instance
+    """
+    global _shared_client
+    if _shared_client is None:
+        # Record or replay LLM calls from a cassette file when one is configured
+        transport = CassetteTransport(OLLAMA_CASSETTE) if OLLAMA_CASSETTE else None
+        _shared_client = OllamaClient(transport=transport, hosts=OLLAMA_API_HOSTS)
+        hosts = ", ".join(backend.host for backend in _shared_client.backends.backends) if _shared_client.backends else _shared_client.host
+        logger.info(f"Ollama client configured with host: {hosts} and model: {_shared_client.model}")
+    return _shared_client
+
+
+async def close_ollama_client() -> None:
+    """Close the process-wide Ollama client, if one was created."""
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
@@ -0,0 +1,622 @@
+#!/usr/bin/env python3
+"""
+Ollama Stub Server
+
+This script serves an Ollama-compatible /api/chat endpoint with canned answers,
+so the action server can be load-tested without a real model.
+
+Point the action server at it with OLLAMA_API_HOST=http://localhost:11435.
+"""
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Stub server defaults
+OLLAMA_STUB_HOST = os.environ.get("OLLAMA_STUB_HOST", "127.0.0.1")
+OLLAMA_STUB_PORT = int(os.environ.get("OLLAMA_STUB_PORT", "11435"))
+OLLAMA_STUB_PROFILE = os.environ.get("OLLAMA_STUB_PROFILE", "phi4-gpu")
+OLLAMA_STUB_ERROR_RATE = float(os.environ.get("OLLAMA_STUB_ERROR_RATE", "0.0"))
+OLLAMA_STUB_MAX_PARALLEL = int(os.environ.get("OLLAMA_STUB_MAX_PARALLEL", "4"))
+OLLAMA_STUB_MAX_QUEUE = int(os.environ.get("OLLAMA_STUB_MAX_QUEUE", "512"))
+OLLAMA_STUB_LOAD_TIME = float(os.environ.get("OLLAMA_STUB_LOAD_TIME", "0.0"))
+OLLAMA_STUB_MODELS = [m.strip() for m in os.environ.get("OLLAMA_STUB_MODELS", "phi4:latest").split(",") if m.strip()]
+
+# Error bodies match the ones Ollama returns
+BUSY_ERROR = "server busy, please try again.  maximum pending requests exceeded"
+INJECTED_ERROR = "stub injected error"
+
+GENERATION_REPLIES = [
+    "That sounds purr-fect! What do you enjoy doing on a lazy weekend?",
+    "Meow, I love that! What's something that always makes you smile?",
+    "How paw-some! Tell me a little more about what you're passionate about.",
+    "Fur real? That's great to hear! What would your ideal first date look like?"
+]
+
+INTENT_REPLY = "2. Wants to provide more information - the user is sharing details about themselves."
+
+# First age of each decade word, for age preferences like "thirties"
+DECADES = {"twenties": 20, "thirties": 30, "forties": 40, "fifties": 50, "sixties": 60}
+
+
+class LatencyProfile:
+    """
+    Time a stubbed model spends on a request.
+
+    The time to first token is drawn from a distribution (fixed, uniform,
+    normal or lognormal) and each further token takes token_delay seconds.
+    """
+
+    DISTRIBUTIONS = ["fixed", "uniform", "normal", "lognormal"]
+
+    def __init__(self, distribution: str = "fixed", mean: float = 0.0, spread: float = 0.0, token_delay: float = 0.0):
+        """
+        Initialize the latency profile.
+
+        Args:
+            distribution: One of fixed, uniform, normal or lognormal
+            mean: Mean time to first token in seconds (the median for lognormal)
+            spread: Half-width for uniform, standard deviation for normal, sigma for lognormal
+            token_delay: Seconds per generated token after the first
+
+        Raises:
+            ValueError: If the distribution is unknown
+        """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.distribution = distribution
+        self.mean = mean
+        self.spread = spread
+        self.token_delay = token_delay
+
+    def first_token(self, rng: random.Random) -> float:
+        """
+        Draw a time to first token.
+
+        Args:
+            rng: Random number generator
+
+        Returns:
+            Delay in seconds (never negative)
+        """
+        if self.distribution == "uniform":
+            delay = rng.uniform(self.mean - self.spread, self.mean + self.spread)
+        elif self.distribution == "normal":
+            delay = rng.gauss(self.mean, self.spread)
+        elif self.distribution == "lognormal":
+            delay = self.mean * rng.lognormvariate(0.0, self.spread) if self.mean > 0 else 0.0
+        else:
+            delay = self.mean
+        return max(0.0, delay)
+
+
+# Named latency profiles, roughly matching phi4 on common hardware
+LATENCY_PROFILES = {
+    "instant": LatencyProfile("fixed", 0.0, 0.0, 0.0),
+    "phi4-gpu": LatencyProfile("lognormal", 0.25, 0.4, 0.02),
+    "phi4-cpu": LatencyProfile("lognormal", 1.5, 0.6, 0.12)
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a reply into word-sized streaming tokens.
+
+    Args:
+        text: The reply text
+
+    Returns:
+        Tokens that join back into the original text
+    """
+    return re.findall(r"\s*\S+", text) or [text]
+
+
+def apply_limits(tokens: List[str], options: Dict[str, Any]) -> Tuple[List[str], str]:
+    """
+    Cut a reply at the first stop sequence and at num_predict tokens, as Ollama does.
+
+    Args:
+        tokens: The reply tokens
+        options: The request's generation options
+
+    Returns:
+        The tokens kept and the done reason ("stop" or "length")
+    """
+    text = "".join(tokens)
+    for stop in options.get("stop") or []:
+        if stop and stop in text:
+            text = text[:text.index(stop)]
+    tokens = tokenize(text) if text else []
+
+    num_predict = int(options.get("num_predict", -1))
+    if 0 <= num_predict < len(tokens):
+        return tokens[:num_predict], "length"
+    return tokens, "stop"
+
+
+def _last_content(messages: List[Dict[str, Any]], role: str) -> str:
+    """Get the content of the last message with a role."""
+    for message in reversed(messages):
+        if message.get("role") == role:
+            return message.get("content", "")
+    return ""
+
+
+def canned_profile(text: str) -> Dict[str, Any]:
+    """
+    Pick out profile fields from a message with a few simple patterns.
+
+    Args:
+        text: The user's message
+
+    Returns:
+        A profile object in the PROFILE_SCHEMA shape, with null for fields not found
+    """
+    lower = text.lower()
+    profile: Dict[str, Any] = {
+        "name": None, "age": None, "gender": None,
+        "gender_preference": None, "age_preference": None, "height": None
+    }
+
+    name = re.search(r"(?:my name is|i'm|i am|call me)\s+([A-Za-z][a-z]+)", text, re.IGNORECASE)
+    if name and not name.group(1).isdigit():
+        profile["name"] = name.group(1).capitalize()
+
+    age_range = re.search(r"\b(\d{2})\s*(?:-|to)\s*(\d{2})\b", lower)
+    decade = re.search(r"\b(twenties|thirties|forties|fifties|sixties)\b", lower)
+    if age_range:
+        profile["age_preference"] = f"{age_range.group(1)}-{age_range.group(2)}"
+    elif decade:
+        start = DECADES[decade.group(1)]
+        profile["age_preference"] = f"{start}-{start + 9}"
+
+    feet = re.search(r"\b([4-7])\s*(?:'|ft|foot|feet)\s*(\d{1,2})?", lower)
+    cm = re.search(r"\b(1[4-9]\d|2[0-2]\d)\s*cm\b", lower)
+    if feet:
+        profile["height"] = f"{feet.group(1)}'{feet.group(2) or 0}\""
+    elif cm:
+        profile["height"] = f"{cm.group(1)}cm"
+
+    if not age_range:
+        age = re.search(r"\b(1[89]|[2-9]\d)\b(?!\s*cm)", lower)
+        if age:
+            profile["age"] = int(age.group(1))
+
+    if re.search(r"\b(woman|female|girl)\b", lower):
+        profile["gender"] = "female"
+    elif re.search(r"\b(man|male|guy)\b", lower):
+        profile["gender"] = "male"
+    elif "non-binary" in lower or "nonbinary" in lower:
+        profile["gender"] = "non-binary"
+
+    preferences = []
+    if re.search(r"\b(everyone|anyone|both)\b", lower):
+        preferences = ["everyone"]
+    else:
+        if re.search(r"\b(women|girls)\b", lower):
+            preferences.append("women")
+        if re.search(r"\b(men|guys)\b", lower):
+            preferences.append("men")
+    profile["gender_preference"] = preferences or None
+
+    # A message that is a single word and nothing else is taken as a name
+    word = re.fullmatch(r'(?:message:\s*)?"?([A-Za-z][a-z]+)"?', text.strip(), re.IGNORECASE)
+    if word and not any(profile.values()):
+        profile["name"] = word.group(1).capitalize()
+    return profile
+
+
+def canned_height(text: str) -> str:
+    """
+    Format a height the way the height extraction prompt asks for.
+
+    Args:
+        text: The extraction prompt including the user's message
+
+    Returns:
+        A height like 5'10" or 178cm, or "unknown"
+    """
+    profile = canned_profile(text)
+    if profile["height"]:
+        return profile["height"]
+    number = re.search(r"\b(\d{1,3})\b", text)
+    if number:
+        value = int(number.group(1))
+        if 150 <= value <= 220:
+            return f"{value}cm"
+        if 4 <= value <= 7:
+            return f"{value}'0\""
+    return "unknown"
+
+
+def canned_task_answer(system_prompt: str, user_prompt: str) -> str:
+    """
+    Answer a single extraction task.
+
+    Args:
+        system_prompt: The task instructions
+        user_prompt: The task prompt including the user's message
+
+    Returns:
+        The answer text
+    """
+    if "height" in system_prompt.lower():
+        return canned_height(user_prompt)
+    return json.dumps(canned_profile(user_prompt))
+
+
+def canned_reply(payload: Dict[str, Any], rng: random.Random) -> str:
+    """
+    Pick a plausible reply for a chat request.
+
+    Structured profile extraction gets a JSON object, batched extraction gets a
+    JSON object with one answer per task, single extraction prompts get a bare
+    value, intent prompts get a category and everything else gets a persona reply.
+
+    Args:
+        payload: The /api/chat request body
+        rng: Random number generator used to pick a persona reply
+
+    Returns:
+        The assistant message content
+    """
+    messages = payload.get("messages", [])
+    system_prompt = _last_content(messages, "system")
+    user_prompt = _last_content(messages, "user")
+
+    if payload.get("format") is not None and "several independent extraction tasks" in system_prompt:
+        # A batch with schema tasks maps each task id to its own schema; those answers are objects
+        schemas = payload["format"].get("properties", {}) if isinstance(payload["format"], dict) else {}
+        answers = {}
+        for task in re.split(r"\n\n(?=Task \d+\n)", user_prompt):
+            match = re.match(r"Task (\d+)\nInstructions: (.*?)\n(.*)", task, re.DOTALL)
+            if match:
+                answer = canned_task_answer(match.group(2), match.group(3))
+                if schemas.get(match.group(1), {}).get("type") == "object":
+                    answer = json.loads(answer)
+                answers[match.group(1)] = answer
+        return json.dumps(answers)
+
+    if isinstance(payload.get("format"), dict):
+        return json.dumps(canned_profile(user_prompt))
+
+    if "extracts height" in system_prompt:
+        return canned_height(user_prompt)
+    if "determine their intent" in system_prompt:
+        return INTENT_REPLY
+    return rng.choice(GENERATION_REPLIES)
+
+
+class OllamaStub:
+    """
+    An Ollama-compatible chat server with configurable latency, errors and capacity.
+
+    Like Ollama, at most max_parallel requests are generated at once and up
+    to max_queue more wait for a slot; anything beyond that is rejected with
+    a 503 "server busy" error. A share of requests given by error_rate fails
+    with a 500 error after the time to first token. The first request also
+    waits load_time seconds while the model is "loaded", and a request
+    without messages only loads the model, as with Ollama.
+    """
+
+    def __init__(self,
+                 latency: Optional[LatencyProfile] = None,
+                 error_rate: float = OLLAMA_STUB_ERROR_RATE,
+                 max_parallel: int = OLLAMA_STUB_MAX_PARALLEL,
+                 max_queue: int = OLLAMA_STUB_MAX_QUEUE,
+                 load_time: float = OLLAMA_STUB_LOAD_TIME,
+                 seed: Optional[int] = None,
+                 models: Optional[List[str]] = None):
+        """
+        Initialize the stub.
+
+        Args:
+            latency: Latency profile (optional, defaults to the OLLAMA_STUB_PROFILE preset)
+            error_rate: Fraction of requests that fail with a 500 error
+            max_parallel: Maximum number of requests generated at once
+            max_queue: Maximum number of requests waiting for a slot
+            load_time: Seconds the first request waits for the model to load
+            seed: Random seed for reproducible runs (optional)
+            models: Installed model names reported by /api/tags (optional, defaults to OLLAMA_STUB_MODELS)
+        """
+        self.latency = latency or LATENCY_PROFILES[OLLAMA_STUB_PROFILE]
+        self.error_rate = error_rate
+        self.max_parallel = max_parallel
+        self.max_queue = max_queue
+        self.load_time = load_time
+        self.loaded = False
+        self.rng = random.Random(seed)
+        self.models = models or OLLAMA_STUB_MODELS
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.port: Optional[int] = None
+
+        self.requests = 0
+        self.streamed = 0
+        self.errors = 0
+        self.rejected = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.total_latency = 0.0
+
+    async def start(self, host: str = OLLAMA_STUB_HOST, port: int = OLLAMA_STUB_PORT) -> int:
+        """
+        Start serving.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+
+        Returns:
+            The port the server is listening on
+        """
+        self._slots = asyncio.Semaphore(self.max_parallel)
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Ollama stub listening on http://{host}:{self.port}")
+        return self.port
+
+    async def close(self) -> None:
+        """Stop serving."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one keep-alive connection."""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                await self._route(method, path, body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        """Read one request, or return None when the client closes the connection."""
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        body = await reader.readexactly(int(headers.get("content-length", "0")))
+        return method, path, headers, body
+
+    async def _route(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        """Dispatch a request to its handler."""
+        if method == "POST" and path == "/api/chat":
+            try:
+                payload = json.loads(body or b"{}")
+            except json.JSONDecodeError:
+                await self._send_json(writer, 400, {"error": "invalid JSON body"})
+                return
+            await self._chat(payload, writer)
+        elif method == "GET" and path == "/api/tags":
+            await self._send_json(writer, 200, {"models": [{"name": name, "model": name} for name in self.models]})
+        elif method == "GET" and path == "/stub/stats":
+            await self._send_json(writer, 200, self.stats())
+        elif method in ("GET", "HEAD") and path == "/":
+            await self._send(writer, 200, b"Ollama is running", "text/plain; charset=utf-8")
+        else:
+            await self._send_json(writer, 404, {"error": "not found"})
+
+    async def _chat(self, payload: Dict[str, Any], writer: asyncio.StreamWriter) -> None:
+        """Handle an /api/chat request within the capacity limits."""
+        self.requests += 1
+        if self.waiting >= self.max_queue and self._slots.locked():
+            self.rejected += 1
+            await self._send_json(writer, 503, {"error": BUSY_ERROR})
+            return
+
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            load_ns = 0
+            if not self.loaded:
+                await asyncio.sleep(self.load_time)
+                self.loaded = True
+                load_ns = int(self.load_time * 1e9)
+
+            model = payload.get("model", "phi4")
+            if not payload.get("messages"):
+                await self._send_json(writer, 200, {
+                    "model": model,
+                    "created_at": _now(),
+                    "message": {"role": "assistant", "content": ""},
+                    "done_reason": "load",
+                    "done": True
+                })
+                return
+
+            await asyncio.sleep(self.latency.first_token(self.rng))
+            if self.rng.random() < self.error_rate:
+                self.errors += 1
+                await self._send_json(writer, 500, {"error": INJECTED_ERROR})
+                return
+
+            tokens, done_reason = apply_limits(tokenize(canned_reply(payload, self.rng)), payload.get("options") or {})
+            if payload.get("stream", True):
+                self.streamed += 1
+                await self._stream_reply(writer, model, tokens, payload, start, load_ns, done_reason)
+            else:
+                await asyncio.sleep(self.latency.token_delay * max(0, len(tokens) - 1))
+                await self._send_json(writer, 200, self._final_chunk(model, "".join(tokens), tokens, payload, start, load_ns, done_reason))
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+            self.total_latency += time.monotonic() - start
+
+    async def _stream_reply(self,
+                            writer: asyncio.StreamWriter,
+                            model: str,
+                            tokens: List[str],
+                            payload: Dict[str, Any],
+                            start: float,
+                            load_ns: int = 0,
+                            done_reason: str = "stop") -> None:
+        """Stream a reply as newline-delimited JSON chunks, one token at a time."""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self.latency.token_delay)
+            chunk = {"model": model, "created_at": _now(), "message": {"role": "assistant", "content": token}, "done": False}
+            await self._write_chunk(writer, chunk)
+
+        final = self._final_chunk(model, "", tokens, payload, start, load_ns, done_reason)
+        await self._write_chunk(writer, final)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    def _final_chunk(self,
+                     model: str,
+                     content: str,
+                     tokens: List[str],
+                     payload: Dict[str, Any],
+                     start: float,
+                     load_ns: int = 0,
+                     done_reason: str = "stop") -> Dict[str, Any]:
+        """Build the final response object with Ollama's timing fields."""
+        elapsed_ns = int((time.monotonic() - start) * 1e9) - load_ns
+        prompt_tokens = sum(len(message.get("content", "")) for message in payload.get("messages", [])) // 4
+        return {
+            "model": model,
+            "created_at": _now(),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": done_reason,
+            "total_duration": elapsed_ns + load_ns,
+            "load_duration": load_ns,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": elapsed_ns // 2,
+            "eval_count": len(tokens),
+            "eval_duration": elapsed_ns - elapsed_ns // 2
+        }
+
+    async def _write_chunk(self, writer: asyncio.StreamWriter, chunk: Dict[str, Any]) -> None:
+        """Write one NDJSON line as an HTTP chunk."""
+        data = json.dumps(chunk).encode("utf-8") + b"\n"
+        writer.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, body: Dict[str, Any]) -> None:
+        """Send a complete JSON response."""
+        await self._send(writer, status, json.dumps(body).encode("utf-8"), "application/json; charset=utf-8")
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str) -> None:
+        """Send a complete response."""
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error", 503: "Service Unavailable"}
+        writer.write(
+            f"HTTP/1.1 {status} {reasons.get(status, 'OK')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get stub statistics.
+
+        Returns:
+            Dictionary with request, streaming, error and rejection counts, concurrency and average latency
+        """
+        served = self.requests - self.rejected
+        return {
+            "requests": self.requests,
+            "streamed": self.streamed,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "average_latency": self.total_latency / served if served else 0.0
+        }
+
+
+def _now() -> str:
+    """Get the current time in Ollama's created_at format."""
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+async def serve(stub: OllamaStub, host: str, port: int) -> None:
+    """Run the stub until interrupted."""
+    await stub.start(host, port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stub.close()
+
+
+def main():
+    """Main function to run the stub server."""
+    parser = argparse.ArgumentParser(description='Serve an Ollama-compatible /api/chat endpoint with canned answers')
+
+    parser.add_argument('--host', type=str, default=OLLAMA_STUB_HOST, help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=OLLAMA_STUB_PORT, help='Port to listen on')
+    parser.add_argument('--profile', type=str, choices=sorted(LATENCY_PROFILES), default=OLLAMA_STUB_PROFILE, help='Named latency profile')
+    parser.add_argument('--distribution', type=str, choices=LatencyProfile.DISTRIBUTIONS, help='Time to first token distribution (overrides the profile)')
+    parser.add_argument('--mean', type=float, help='Mean time to first token in seconds')
+    parser.add_argument('--spread', type=float, help='Spread of the time to first token')
+    parser.add_argument('--token-delay', type=float, help='Seconds per generated token')
+    parser.add_argument('--error-rate', type=float, default=OLLAMA_STUB_ERROR_RATE, help='Fraction of requests that fail with a 500 error')
+    parser.add_argument('--max-parallel', type=int, default=OLLAMA_STUB_MAX_PARALLEL, help='Maximum requests generated at once')
+    parser.add_argument('--max-queue', type=int, default=OLLAMA_STUB_MAX_QUEUE, help='Maximum requests waiting before 503 responses')
+    parser.add_argument('--load-time', type=float, default=OLLAMA_STUB_LOAD_TIME, help='Seconds the first request waits for the model to load')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible runs')
+    parser.add_argument('--models', type=str, default=",".join(OLLAMA_STUB_MODELS), help='Comma-separated installed model names')
+
+    args = parser.parse_args()
+
+    preset = LATENCY_PROFILES[args.profile]
+    latency = LatencyProfile(
+        args.distribution or preset.distribution,
+        args.mean if args.mean is not None else preset.mean,
+        args.spread if args.spread is not None else preset.spread,
+        args.token_delay if args.token_delay is not None else preset.token_delay
+    )
+    stub = OllamaStub(latency, args.error_rate, args.max_parallel, args.max_queue, args.load_time, args.seed, args.models.split(","))
+
+    try:
+        asyncio.run(serve(stub, args.host, args.port))
+    except KeyboardInterrupt:
+        logger.info(f"Ollama stub stopped: {stub.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from prompt_builder import estimate_message_tokens
+
+logger = logging.getLogger(__name__)
+
+# Per-sender chat sessions for the persona generation actions
+PERSONA_SESSION_MAX = int(os.environ.get("PERSONA_SESSION_MAX", "1000"))
+PERSONA_SESSION_TTL = float(os.environ.get("PERSONA_SESSION_TTL", "1800"))
+PERSONA_SESSION_MAX_TURNS = int(os.environ.get("PERSONA_SESSION_MAX_TURNS", "8"))
+
+
+class PersonaSession:
+    """The messages sent so far for one sender, starting with the persona system prompt."""
+
+    def __init__(self, persona: str, messages: List[Dict[str, str]]):
+        self.persona = persona
+        self.messages = messages
+        self.turns = 0
+        self.last_used = time.monotonic()
+
+
+class PersonaSessionStore:
+    """
+    Keep a chat session per sender so the persona prompt and earlier turns form
+    a stable prefix across turns.
+
+    Ollama reuses the evaluated KV cache for the longest prefix it has already
+    seen, so as long as the model stays loaded only the newest turn is
+    evaluated. A session is restarted with the full context when the persona
+    changes, it has gone idle for longer than the TTL, it reaches the turn
+    limit, or continuing it would exceed the prompt token budget.
+    """
+
+    def __init__(self,
+                 max_sessions: int = PERSONA_SESSION_MAX,
+                 ttl: float = PERSONA_SESSION_TTL,
+                 max_turns: int = PERSONA_SESSION_MAX_TURNS):
+        """
+        Initialize the session store.
+
+        Args:
+            max_sessions: Maximum number of senders kept (least recently used are dropped)
+            ttl: Seconds of inactivity after which a session is restarted
+            max_turns: Turns after which a session is restarted from the full context
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[str, PersonaSession]" = OrderedDict()
+
+        self.reused = 0
+        self.started = 0
+        self.over_budget = 0
+
+    def _get(self, sender_id: str, persona: str) -> Optional[PersonaSession]:
+        """Get a sender's session if it can be continued."""
+        session = self._sessions.get(sender_id)
+        if session is None:
+            return None
+        if (session.persona != persona
+                or time.monotonic() - session.last_used > self.ttl
+                or session.turns >= self.max_turns):
+            del self._sessions[sender_id]
+            return None
+        return session
+
+    def build_messages(self,
+                       sender_id: str,
+                       persona: str,
+                       full_prompt: str,
+                       turn_prompt: str,
+                       max_tokens: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Build the messages for the next turn.
+
+        Args:
+            sender_id: The ID of the user
+            persona: The persona system prompt
+            full_prompt: The user prompt with full context, used to start a session
+            turn_prompt: The user prompt with only the new turn, used to continue a session
+            max_tokens: Prompt token budget; a session that would exceed it is restarted (optional)
+
+        Returns:
+            Chat messages in Ollama format
+        """
+        session = self._get(sender_id, persona)
+        if session is not None and max_tokens is not None:
+            continued = session.messages + [{"role": "user", "content": turn_prompt}]
+            if estimate_message_tokens(continued) > max_tokens:
+                self.over_budget += 1
+                del self._sessions[sender_id]
+                session = None
+
+        if session is None:
+            self.started += 1
+            return [
+                {"role": "system", "content": persona},
+                {"role": "user", "content": full_prompt}
+            ]
+
+        self.reused += 1
+        return session.messages + [{"role": "user", "content": turn_prompt}]
+
+    def record_reply(self, sender_id: str, persona: str, messages: List[Dict[str, str]], reply: str) -> None:
+        """
+        Store a completed turn so the next one continues from it.
+
+        Args:
+            sender_id: The ID of the user
+            persona: The persona system prompt
+            messages: The messages that were sent for the turn
+            reply: The assistant reply
+        """
+        session = self._sessions.get(sender_id)
+        turns = session.turns if session is not None and session.persona == persona else 0
+
+        session = PersonaSession(persona, messages + [{"role": "assistant", "content": reply}])
+        session.turns = turns + 1
+        self._sessions[sender_id] = session
+        self._sessions.move_to_end(sender_id)
+
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def reset(self, sender_id: str) -> None:
+        """
+        Forget a sender's session.
+
+        Args:
+            sender_id: The ID of the user
+        """
+        self._sessions.pop(sender_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get session statistics.
+
+        Returns:
+            Dictionary with active sessions and how many turns started or continued a session
+        """
+        turns = self.started + self.reused
+        return {
+            "sessions": len(self._sessions),
+            "started": self.started,
+            "reused": self.reused,
+            "over_budget": self.over_budget,
+            "reuse_rate": self.reused / turns if turns else 0.0
+        }
+
+
+_shared_sessions: Optional[PersonaSessionStore] = None
+
+
+def get_persona_sessions() -> PersonaSessionStore:
+    """
+    Get the process-wide persona session store.
+
+    Returns:
+        The shared PersonaSessionStore instance
+    """
+    global _shared_sessions
+    if _shared_sessions is None:
+        _shared_sessions = PersonaSessionStore()
+    return _shared_sessions
@@ -0,0 +1,259 @@
+import re
+import json
+import logging
+from datetime import date
+from typing import Dict, Any, List, Optional
+
+from ollama_client import OllamaClient, get_ollama_client
+from llm_cache import ResponseCache, get_extraction_cache
+from extraction_batcher import ExtractionBatcher, get_extraction_batcher
+
+logger = logging.getLogger(__name__)
+
+# Profile fields in the order they are collected
+PROFILE_FIELDS = ["name", "age", "gender", "gender_preference", "age_preference", "height"]
+
+GENDERS = ["male", "female", "non-binary"]
+GENDER_PREFERENCES = ["men", "women", "non-binary", "everyone"]
+
+# JSON schema passed to Ollama's structured output ("format") mode
+PROFILE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": ["string", "null"]},
+        "age": {"type": ["integer", "null"]},
+        "gender": {"type": ["string", "null"], "enum": GENDERS + [None]},
+        "gender_preference": {
+            "type": ["array", "null"],
+            "items": {"type": "string", "enum": GENDER_PREFERENCES}
+        },
+        "age_preference": {"type": ["string", "null"]},
+        "height": {"type": ["string", "null"]}
+    },
+    "required": PROFILE_FIELDS
+}
+
+PROFILE_SYSTEM_PROMPT = (
+    "You are a helpful assistant that extracts dating profile details from a user's message. "
+    "Only report facts the user states about themselves; use null for anything not mentioned. "
+    "name: the user's first name. "
+    "age: the user's age in years as a number (convert words to numbers, and a birth year to an age). "
+    f"gender: the user's own gender, one of {', '.join(GENDERS)}. "
+    f"gender_preference: the genders the user wants to date, a list drawn from {', '.join(GENDER_PREFERENCES)}. "
+    "age_preference: the age range the user wants in a partner, formatted like 25-35. "
+    "height: the user's height, formatted like 5'10\" for feet/inches or 178cm for centimeters. "
+    "Respond with a JSON object only."
+)
+
+PROFILE_PROMPT_TEMPLATE = "Message: \"{message}\""
+
+NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z' -]{0,39}$")
+AGE_PREFERENCE_PATTERN = re.compile(r"^\d{2,3}(-\d{2,3})?$")
+HEIGHT_PATTERN = re.compile(r"^(\d{3}cm|\d'\d{1,2}\")$")
+
+
+def validate_profile(data: Any) -> Dict[str, Any]:
+    """
+    Validate extracted profile fields against the schema and the collectors' formats.
+
+    Invalid or missing fields are dropped rather than failing the whole object.
+
+    Args:
+        data: Decoded JSON object returned by the model
+
+    Returns:
+        Dictionary containing only the valid, normalized fields
+    """
+    if not isinstance(data, dict):
+        return {}
+
+    profile: Dict[str, Any] = {}
+
+    name = data.get("name")
+    if isinstance(name, str):
+        name = name.strip().strip('"').strip()
+        if NAME_PATTERN.match(name) and name.lower() not in ["none", "null", "no name"]:
+            profile["name"] = name.capitalize()
+
+    age = data.get("age")
+    if isinstance(age, str) and age.strip().isdigit():
+        age = int(age.strip())
+    if isinstance(age, (int, float)) and not isinstance(age, bool) and 18 <= age <= 120:
+        profile["age"] = int(age)
+
+    gender = data.get("gender")
+    if isinstance(gender, str) and gender.strip().lower() in GENDERS:
+        profile["gender"] = gender.strip().lower()
+
+    preferences = data.get("gender_preference")
+    if isinstance(preferences, str):
+        preferences = preferences.split(",")
+    if isinstance(preferences, list):
+        cleaned: List[str] = []
+        for preference in preferences:
+            if isinstance(preference, str) and preference.strip().lower() in GENDER_PREFERENCES:
+                if preference.strip().lower() not in cleaned:
+                    cleaned.append(preference.strip().lower())
+        if cleaned:
+            profile["gender_preference"] = ["everyone"] if "everyone" in cleaned else cleaned
+
+    age_preference = data.get("age_preference")
+    if isinstance(age_preference, (int, float)) and not isinstance(age_preference, bool):
+        age_preference = str(int(age_preference))
+    if isinstance(age_preference, str):
+        age_preference = age_preference.strip().strip('"').replace(" ", "")
+        if AGE_PREFERENCE_PATTERN.match(age_preference):
+            profile["age_preference"] = age_preference
+
+    height = data.get("height")
+    if isinstance(height, str):
+        height = height.strip().replace(" ", "")
+        if HEIGHT_PATTERN.match(height):
+            profile["height"] = height
+
+    return profile
+
+
+def estimate_dob(age: int, today: Optional[date] = None) -> str:
+    """
+    Estimate a date of birth from an age, assuming the birthday is today.
+
+    Args:
+        age: Age in years
+        today: Reference date (optional, defaults to today)
+
+    Returns:
+        The date of birth formatted as YYYY-MM-DD
+    """
+    today = today or date.today()
+    try:
+        return today.replace(year=today.year - age).isoformat()
+    except ValueError:
+        # 29 February in a non-leap year
+        return today.replace(year=today.year - age, day=28).isoformat()
+
+
+class ProfileExtractor:
+    """
+    Extract every profile field from a user message in one structured Ollama call.
+
+    The model is asked for a JSON object matching PROFILE_SCHEMA, and answers
+    are cached on model and normalized message so that a message is only sent
+    once however many collectors read from it. Calls go through the extraction
+    batcher, so profile extractions from concurrent conversations share one
+    Ollama call with the other extraction prompts.
+    """
+
+    def __init__(self,
+                 client: Optional[OllamaClient] = None,
+                 cache: Optional[ResponseCache] = None,
+                 batcher: Optional[ExtractionBatcher] = None):
+        """
+        Initialize the profile extractor.
+
+        Args:
+            client: Ollama client (optional, defaults to the shared client)
+            cache: Response cache (optional, defaults to the shared extraction cache)
+            batcher: Extraction batcher (optional, defaults to a batcher on client, or the shared batcher)
+        """
+        self._client = client
+        self._cache = cache
+        self._batcher = batcher or (ExtractionBatcher(client=client) if client is not None else None)
+
+        self.calls = 0
+        self.failures = 0
+        self.fields_found: Dict[str, int] = {field: 0 for field in PROFILE_FIELDS}
+
+    @property
+    def client(self) -> OllamaClient:
+        return self._client or get_ollama_client()
+
+    @property
+    def cache(self) -> ResponseCache:
+        return self._cache or get_extraction_cache()
+
+    @property
+    def batcher(self) -> ExtractionBatcher:
+        return self._batcher or get_extraction_batcher()
+
+    async def extract(self, message: str, sender_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Extract the profile fields found in a message.
+
+        Args:
+            message: The user's message
+            sender_id: The ID of the user (optional)
+
+        Returns:
+            Dictionary of the valid fields found (empty if none were found)
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+        """
+        if not message or not message.strip():
+            return {}
+
+        template = f"{PROFILE_SYSTEM_PROMPT}\n{PROFILE_PROMPT_TEMPLATE}\n{json.dumps(PROFILE_SCHEMA, sort_keys=True)}"
+        key = self.cache.make_key(self.client.model_for("extraction"), template, message, 0.0)
+
+        content = self.cache.get(key)
+        cached = content is not None
+        if not cached:
+            self.calls += 1
+            content = await self.batcher.submit(
+                PROFILE_SYSTEM_PROMPT,
+                PROFILE_PROMPT_TEMPLATE.format(message=message),
+                max_tokens=120,
+                temperature=0.0,
+                schema=PROFILE_SCHEMA,
+                sender_id=sender_id
+            )
+        else:
+            logger.info("Using cached profile extraction response")
+
+        try:
+            data = json.loads(content)
+        except (json.JSONDecodeError, TypeError):
+            self.failures += 1
+            logger.warning(f"Could not parse profile extraction response: {content}")
+            return {}
+
+        # Only responses that parse are cached, so a malformed one is retried next time
+        if not cached:
+            self.cache.set(key, content)
+
+        profile = validate_profile(data)
+
+        for field in profile:
+            self.fields_found[field] += 1
+        logger.info(f"Extracted profile fields: {profile}")
+        return profile
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get extraction statistics.
+
+        Returns:
+            Dictionary with upstream calls, parse failures and fields found per field
+        """
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "fields_found": dict(self.fields_found)
+        }
+
+
+_shared_extractor: Optional[ProfileExtractor] = None
+
+
+def get_profile_extractor() -> ProfileExtractor:
+    """
+    Get the process-wide profile extractor.
+
+    Returns:
+        The shared ProfileExtractor instance
+    """
+    global _shared_extractor
+    if _shared_extractor is None:
+        _shared_extractor = ProfileExtractor()
+    return _shared_extractor
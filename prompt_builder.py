@@ -0,0 +1,238 @@
+import os
+import math
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Prompt token budgets per call type (system prompt included)
+PROMPT_BUDGETS = {
+    "generation": int(os.environ.get("PROMPT_BUDGET_GENERATION", "1500")),
+    "fallback": int(os.environ.get("PROMPT_BUDGET_FALLBACK", "600")),
+    "intent": int(os.environ.get("PROMPT_BUDGET_INTENT", "600"))
+}
+DEFAULT_PROMPT_BUDGET = int(os.environ.get("PROMPT_BUDGET_DEFAULT", "1500"))
+
+# Sections with less room than this are dropped instead of trimmed
+MIN_SECTION_TOKENS = 16
+
+# Rough characters per token for English text
+CHARS_PER_TOKEN = 4
+
+# Section priorities - lower numbers are kept first
+PRIORITY_INSTRUCTION = 0
+PRIORITY_LATEST_MESSAGE = 1
+PRIORITY_PROFILE = 2
+PRIORITY_RECENT_TURNS = 3
+PRIORITY_SUMMARY = 4
+
+
+def estimate_text_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of tokens in a text.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        Estimated token count
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def estimate_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """
+    Roughly estimate the number of tokens in a list of chat messages.
+
+    Args:
+        messages: Chat messages in Ollama format
+
+    Returns:
+        Estimated token count
+    """
+    return sum(estimate_text_tokens(message.get("content", "")) for message in messages)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep: str = "head") -> str:
+    """
+    Cut text down to roughly max_tokens, at a line or word boundary.
+
+    Args:
+        text: The text to cut
+        max_tokens: Token limit for the result
+        keep: "head" to keep the beginning, "tail" to keep the end
+
+    Returns:
+        The truncated text, marked with "..." where it was cut
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN - 3
+    if len(text) <= max_tokens * CHARS_PER_TOKEN:
+        return text
+    if max_chars <= 0:
+        return ""
+
+    if keep == "tail":
+        cut = text[-max_chars:]
+        boundary = max(cut.find("\n"), cut.find(" "))
+        return "..." + (cut[boundary + 1:] if 0 <= boundary < len(cut) // 2 else cut)
+
+    cut = text[:max_chars]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    return (cut[:boundary] if boundary > len(cut) // 2 else cut) + "..."
+
+
+class PromptSection:
+    """A named piece of a prompt with a priority and a trimming direction."""
+
+    def __init__(self, name: str, text: str, priority: int, header: str = "", keep: str = "head"):
+        self.name = name
+        self.text = text
+        self.priority = priority
+        self.header = header
+        self.keep = keep
+
+
+class PromptStats:
+    """
+    Track the size of assembled prompts per call type.
+    """
+
+    def __init__(self):
+        """Initialize the statistics."""
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def record(self, report: Dict[str, Any]) -> None:
+        """
+        Record a prompt assembly report.
+
+        Args:
+            report: Report produced by PromptBuilder.build
+        """
+        metrics = self._metrics.setdefault(report["call_type"], {"prompts": 0, "total_tokens": 0, "max_tokens": 0, "trimmed": 0})
+        metrics["prompts"] += 1
+        metrics["total_tokens"] += report["tokens"]
+        metrics["max_tokens"] = max(metrics["max_tokens"], report["tokens"])
+        if report["trimmed"] or report["dropped"]:
+            metrics["trimmed"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get prompt size statistics per call type.
+
+        Returns:
+            Dictionary mapping call types to prompt count, average and max tokens, and trimmed prompts
+        """
+        return {
+            call_type: {
+                "prompts": int(metrics["prompts"]),
+                "average_tokens": metrics["total_tokens"] / metrics["prompts"],
+                "max_tokens": int(metrics["max_tokens"]),
+                "trimmed": int(metrics["trimmed"]),
+                "budget": PROMPT_BUDGETS.get(call_type, DEFAULT_PROMPT_BUDGET)
+            }
+            for call_type, metrics in self._metrics.items()
+        }
+
+
+_shared_stats: Optional[PromptStats] = None
+
+
+def get_prompt_stats() -> PromptStats:
+    """
+    Get the process-wide prompt statistics.
+
+    Returns:
+        The shared PromptStats instance
+    """
+    global _shared_stats
+    if _shared_stats is None:
+        _shared_stats = PromptStats()
+    return _shared_stats
+
+
+class PromptBuilder:
+    """
+    Assemble a user prompt from sections within a token budget.
+
+    The system prompt counts against the budget but is never trimmed. Sections
+    are given room in priority order (latest message, then profile, then recent
+    turns, then the older summary); a section that does not fit is trimmed,
+    or dropped if almost no room is left. Sections are rendered in the order
+    they were added.
+    """
+
+    def __init__(self, call_type: str, system_prompt: str = "", budget: Optional[int] = None):
+        """
+        Initialize the builder.
+
+        Args:
+            call_type: Kind of call, used to pick the budget and for statistics
+            system_prompt: System prompt sent with the user prompt
+            budget: Token budget for the whole prompt (optional, defaults to the call type's budget)
+        """
+        self.call_type = call_type
+        self.system_prompt = system_prompt
+        self.budget = budget if budget is not None else PROMPT_BUDGETS.get(call_type, DEFAULT_PROMPT_BUDGET)
+        self.sections: List[PromptSection] = []
+        self.report: Dict[str, Any] = {}
+
+    def add(self, name: str, text: str, priority: int, header: str = "", keep: str = "head") -> "PromptBuilder":
+        """
+        Add a section.
+
+        Args:
+            name: Section name used in the report
+            text: Section content (empty sections are skipped)
+            priority: Lower numbers are kept first
+            header: Text rendered before the content, e.g. "USER PROFILE:\\n"
+            keep: "head" to keep the beginning when trimming, "tail" to keep the end
+
+        Returns:
+            The builder, for chaining
+        """
+        if text and text.strip():
+            self.sections.append(PromptSection(name, text.strip(), priority, header, keep))
+        return self
+
+    def build(self) -> str:
+        """
+        Assemble the prompt within the budget.
+
+        Returns:
+            The user prompt
+        """
+        remaining = self.budget - estimate_text_tokens(self.system_prompt)
+        rendered: Dict[int, str] = {}
+        trimmed: List[str] = []
+        dropped: List[str] = []
+
+        for index, section in sorted(enumerate(self.sections), key=lambda item: item[1].priority):
+            # Separators between sections cost roughly one token each
+            available = remaining - estimate_text_tokens(section.header) - 1
+            if estimate_text_tokens(section.text) <= available:
+                text = section.text
+            elif available >= MIN_SECTION_TOKENS:
+                text = truncate_to_tokens(section.text, available, section.keep)
+                trimmed.append(section.name)
+            else:
+                dropped.append(section.name)
+                continue
+            rendered[index] = f"{section.header}{text}"
+            remaining -= estimate_text_tokens(rendered[index]) + 1
+
+        prompt = "\n" + "\n\n".join(rendered[index] for index in sorted(rendered)) + "\n"
+        tokens = estimate_text_tokens(self.system_prompt) + estimate_text_tokens(prompt)
+        self.report = {
+            "call_type": self.call_type,
+            "budget": self.budget,
+            "tokens": tokens,
+            "trimmed": trimmed,
+            "dropped": dropped
+        }
+        get_prompt_stats().record(self.report)
+
+        if trimmed or dropped:
+            logger.info(f"Assembled {self.call_type} prompt of ~{tokens} tokens (budget {self.budget}), trimmed: {trimmed}, dropped: {dropped}")
+        else:
+            logger.info(f"Assembled {self.call_type} prompt of ~{tokens} tokens (budget {self.budget})")
+        return prompt
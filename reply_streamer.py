@@ -0,0 +1,303 @@
+import os
+import re
+import hmac
+import time
+import hashlib
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from ollama_client import OllamaClient, get_ollama_client
+from generation_tracker import get_generation_tracker
+
+logger = logging.getLogger(__name__)
+
+# -- SOCKET.IO STREAMING INITIALIZATION --
+try:
+    import socketio
+    from aiohttp import web
+    SOCKETIO_AVAILABLE = True
+except ImportError:
+    logger.warning("python-socketio/aiohttp not available. Streamed replies will not be forwarded.")
+    SOCKETIO_AVAILABLE = False
+
+# Streaming settings - disabled unless explicitly enabled
+STREAMING_ENABLED = os.environ.get("STREAMING_ENABLED", "false").lower() == "true"
+# Listen on localhost only; expose the server through a reverse proxy
+STREAMING_HOST = os.environ.get("STREAMING_HOST", "127.0.0.1")
+STREAMING_PORT = int(os.environ.get("STREAMING_PORT", "5056"))
+# Secret that subscription tokens are signed with; the server does not start without it
+STREAMING_SECRET = os.environ.get("STREAMING_SECRET", "")
+# Comma-separated origins allowed to connect (empty allows the server's own origin only)
+STREAMING_CORS_ORIGINS = [o.strip() for o in os.environ.get("STREAMING_CORS_ORIGINS", "").split(",") if o.strip()]
+STREAMING_EVENT = os.environ.get("STREAMING_EVENT", "bot_stream")
+STREAMING_CHUNK_MODE = os.environ.get("STREAMING_CHUNK_MODE", "sentence")
+
+# A sentence ends with terminal punctuation followed by whitespace
+SENTENCE_END = re.compile(r"[.!?…]\s+")
+
+
+def split_sentences(buffer: str) -> Tuple[List[str], str]:
+    """
+    Split complete sentences off the front of a text buffer.
+
+    Each sentence keeps the whitespace that follows it, so the chunks join
+    back into the original text.
+
+    Args:
+        buffer: Text received so far that has not been sent
+
+    Returns:
+        Tuple of (complete sentences, remaining partial text)
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(buffer):
+        sentences.append(buffer[start:match.end()])
+        start = match.end()
+    return sentences, buffer[start:]
+
+
+def session_token(session_id: str, secret: str = STREAMING_SECRET) -> str:
+    """
+    Get the token that lets a client subscribe to, and cancel, a session's replies.
+
+    Tokens are issued by the backend that knows which user owns the session,
+    so a client can only subscribe to its own session.
+
+    Args:
+        session_id: The conversation (socket.io session) ID
+        secret: Secret the token is signed with
+
+    Returns:
+        Hex HMAC-SHA256 of the session ID
+    """
+    return hmac.new(secret.encode("utf-8"), str(session_id).encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class ReplyStreamer:
+    """
+    Stream generated replies from Ollama to the user's socket.io session.
+
+    Clients connect to a small socket.io server run by the action server and
+    subscribe with the same session_id they use for Rasa, plus the token from
+    session_token for it; subscriptions with a wrong token are refused.
+    Chunks are emitted as {"text": ..., "done": False} followed by a final
+    {"text": <full reply>, "done": True} event. Rasa handles a sender's
+    messages one at a time, so the action server only sees a new message once
+    the previous reply is done. A client that emits "user_message" (with the
+    same session_id and token) as the user sends a new message cancels the
+    reply still being generated for them, which ends with {"done": True,
+    "cancelled": True}.
+    """
+
+    def __init__(self,
+                 client: Optional[OllamaClient] = None,
+                 host: str = STREAMING_HOST,
+                 port: int = STREAMING_PORT,
+                 secret: str = STREAMING_SECRET,
+                 cors_origins: Optional[List[str]] = None,
+                 event: str = STREAMING_EVENT,
+                 chunk_mode: str = STREAMING_CHUNK_MODE):
+        """
+        Initialize the reply streamer.
+
+        Args:
+            client: Ollama client (optional, defaults to the shared client)
+            host: Interface the socket.io server listens on
+            port: Port the socket.io server listens on
+            secret: Secret subscription tokens are signed with
+            cors_origins: Origins allowed to connect (defaults to STREAMING_CORS_ORIGINS)
+            event: Name of the socket.io event carrying reply chunks
+            chunk_mode: "sentence" to emit whole sentences, "token" to emit every token
+        """
+        self._client = client
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.cors_origins = STREAMING_CORS_ORIGINS if cors_origins is None else cors_origins
+        self.event = event
+        self.chunk_mode = chunk_mode
+        self.sio = None
+        self._runner = None
+        self._start_lock: Optional[asyncio.Lock] = None
+
+        self._user_messages = 0
+
+        self.refused = 0
+
+        self.streams = 0
+        self.total_ttft = 0.0
+        self.last_ttft: Optional[float] = None
+
+    @property
+    def client(self) -> OllamaClient:
+        return self._client or get_ollama_client()
+
+    async def start(self) -> None:
+        """Start the socket.io server on the running event loop (once)."""
+        if not SOCKETIO_AVAILABLE or self._runner is not None:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+
+        async with self._start_lock:
+            if self._runner is not None:
+                return
+            if not self.secret:
+                logger.error("STREAMING_SECRET is not set, so the reply streaming server was not started")
+                return
+
+            self.sio = socketio.AsyncServer(async_mode="aiohttp", cors_allowed_origins=self.cors_origins or None)
+            app = web.Application()
+            self.sio.attach(app)
+
+            self.sio.on("subscribe", self._on_subscribe)
+            self.sio.on("user_message", self._on_user_message)
+
+            runner = web.AppRunner(app)
+            await runner.setup()
+            await web.TCPSite(runner, self.host, self.port).start()
+            self._runner = runner
+            logger.info(f"Reply streaming server listening on {self.host}:{self.port}")
+
+    def _authorized(self, sid: str, data: Optional[Dict[str, Any]], event: str) -> Optional[str]:
+        """Get the session a socket event is for, or None (counted as refused) if its token is wrong."""
+        session_id = (data or {}).get("session_id")
+        if not session_id or not self.verify(session_id, (data or {}).get("token")):
+            self.refused += 1
+            logger.warning(f"Socket {sid} was refused {event} for {session_id}")
+            return None
+        return session_id
+
+    async def _on_subscribe(self, sid: str, data: Optional[Dict[str, Any]]) -> bool:
+        """Join a socket to its session's room, so it receives the session's reply stream."""
+        session_id = self._authorized(sid, data, "subscribe")
+        if session_id is None:
+            return False
+        self.sio.enter_room(sid, session_id)
+        logger.info(f"Socket {sid} subscribed to reply stream for {session_id}")
+        return True
+
+    async def _on_user_message(self, sid: str, data: Optional[Dict[str, Any]]) -> bool:
+        """Cancel the replies still generating for a session, because its user sent a new message."""
+        session_id = self._authorized(sid, data, "user_message")
+        if session_id is None:
+            return False
+        self._user_messages += 1
+        get_generation_tracker().notify(session_id, data.get("message_id") or f"socket-{self._user_messages}")
+        return True
+
+    def verify(self, session_id: str, token: Optional[str]) -> bool:
+        """
+        Check a subscription token for a session.
+
+        Args:
+            session_id: The session the client subscribes to
+            token: Token the client presented
+
+        Returns:
+            True if the token was issued for the session with this server's secret
+        """
+        if not self.secret or not token:
+            return False
+        return hmac.compare_digest(session_token(session_id, self.secret), str(token))
+
+    async def stop(self) -> None:
+        """Stop the socket.io server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            self.sio = None
+
+    async def _emit(self, sender_id: str, data: Dict[str, Any]) -> None:
+        """Emit a stream event to every socket subscribed to the sender."""
+        if self.sio is not None:
+            await self.sio.emit(self.event, data, room=sender_id)
+
+    async def stream_reply(self,
+                           sender_id: str,
+                           messages: List[Dict[str, str]],
+                           options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Stream a reply to the sender's session and return the full text.
+
+        Args:
+            sender_id: The conversation (socket.io session) ID
+            messages: Chat messages in Ollama format
+            options: Ollama generation options (optional)
+
+        Returns:
+            The complete generated reply
+        """
+        await self.start()
+
+        start = time.monotonic()
+        first_chunk_at = None
+        pieces: List[str] = []
+        buffer = ""
+
+        try:
+            async for content in self.client.chat_stream(messages, options=options, sender_id=sender_id):
+                pieces.append(content)
+                if self.chunk_mode == "token":
+                    chunks = [content]
+                else:
+                    buffer += content
+                    chunks, buffer = split_sentences(buffer)
+
+                for chunk in chunks:
+                    if first_chunk_at is None:
+                        first_chunk_at = time.monotonic() - start
+                    await self._emit(sender_id, {"text": chunk, "done": False})
+
+            if buffer.strip():
+                if first_chunk_at is None:
+                    first_chunk_at = time.monotonic() - start
+                await self._emit(sender_id, {"text": buffer, "done": False})
+        except asyncio.CancelledError:
+            await self._emit(sender_id, {"text": "", "done": True, "cancelled": True})
+            raise
+        except Exception:
+            await self._emit(sender_id, {"text": "", "done": True, "error": True})
+            raise
+
+        full_text = "".join(pieces)
+        await self._emit(sender_id, {"text": full_text, "done": True})
+
+        if first_chunk_at is not None:
+            self.streams += 1
+            self.total_ttft += first_chunk_at
+            self.last_ttft = first_chunk_at
+            logger.info(f"Streamed reply to {sender_id}, time to first chunk: {first_chunk_at:.2f}s")
+        return full_text
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get streaming statistics.
+
+        Returns:
+            Dictionary with stream count, refused subscriptions and time-to-first-chunk figures
+        """
+        return {
+            "streams": self.streams,
+            "refused": self.refused,
+            "last_ttft": self.last_ttft,
+            "average_ttft": self.total_ttft / self.streams if self.streams else None
+        }
+
+
+_shared_streamer: Optional[ReplyStreamer] = None
+
+
+def get_reply_streamer() -> ReplyStreamer:
+    """
+    Get the process-wide reply streamer.
+
+    Returns:
+        The shared ReplyStreamer instance
+    """
+    global _shared_streamer
+    if _shared_streamer is None:
+        _shared_streamer = ReplyStreamer()
+    return _shared_streamer
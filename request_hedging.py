@@ -0,0 +1,150 @@
+import os
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+from circuit_breaker import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# Hedging settings - a duplicate is sent when a call is slower than the percentile latency
+OLLAMA_HEDGE_ENABLED = os.environ.get("OLLAMA_HEDGE_ENABLED", "false").lower() == "true"
+OLLAMA_HEDGE_CALL_TYPES = [t.strip() for t in os.environ.get("OLLAMA_HEDGE_CALL_TYPES", "extraction").split(",") if t.strip()]
+OLLAMA_HEDGE_PERCENTILE = float(os.environ.get("OLLAMA_HEDGE_PERCENTILE", "0.95"))
+OLLAMA_HEDGE_MAX_RATE = float(os.environ.get("OLLAMA_HEDGE_MAX_RATE", "0.05"))
+OLLAMA_HEDGE_MIN_DELAY = float(os.environ.get("OLLAMA_HEDGE_MIN_DELAY", "0.05"))
+
+
+class RequestHedger:
+    """
+    Send a duplicate of a slow call and use whichever answer arrives first.
+
+    A call that has not answered within the call type's percentile latency
+    gets one hedge; the first successful answer wins and the other request is
+    cancelled. Hedges are capped at max_rate of the calls of each type, and
+    no hedges are sent until enough latencies have been observed.
+    """
+
+    def __init__(self,
+                 latency: LatencyTracker,
+                 enabled: bool = OLLAMA_HEDGE_ENABLED,
+                 call_types: Optional[List[str]] = None,
+                 percentile: float = OLLAMA_HEDGE_PERCENTILE,
+                 max_rate: float = OLLAMA_HEDGE_MAX_RATE,
+                 min_delay: float = OLLAMA_HEDGE_MIN_DELAY):
+        """
+        Initialize the hedger.
+
+        Args:
+            latency: Latency tracker the hedge delay is derived from
+            enabled: Whether hedging is on
+            call_types: Call types that may be hedged (optional, defaults to OLLAMA_HEDGE_CALL_TYPES)
+            percentile: Latency percentile after which a hedge is sent (0-1)
+            max_rate: Maximum share of calls that may be hedged
+            min_delay: Lower bound for the hedge delay in seconds
+        """
+        self.latency = latency
+        self.enabled = enabled
+        self.call_types = call_types if call_types is not None else OLLAMA_HEDGE_CALL_TYPES
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_delay = min_delay
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def _call_metrics(self, call_type: str) -> Dict[str, float]:
+        """Get (or create) the metrics for a call type."""
+        return self._metrics.setdefault(call_type, {
+            "calls": 0,
+            "hedges_sent": 0,
+            "hedges_won": 0,
+            "capped": 0,
+            "last_delay": 0.0
+        })
+
+    def hedge_delay(self, call_type: str) -> Optional[float]:
+        """
+        Get how long to wait before hedging a call.
+
+        Args:
+            call_type: The kind of call
+
+        Returns:
+            Delay in seconds, or None if the call should not be hedged
+        """
+        if not self.enabled or call_type not in self.call_types:
+            return None
+        if self.latency.sample_count(call_type) < self.latency.min_samples:
+            return None
+        return max(self.min_delay, self.latency.percentile_latency(call_type, self.percentile))
+
+    async def run(self, call_type: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run a call, hedging it if it is slow.
+
+        Args:
+            call_type: The kind of call
+            fn: Starts the call; called a second time for the hedge
+
+        Returns:
+            The first successful result
+        """
+        metrics = self._call_metrics(call_type)
+        metrics["calls"] += 1
+        delay = self.hedge_delay(call_type)
+        if delay is None:
+            return await fn()
+
+        primary = asyncio.ensure_future(fn())
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+
+            if metrics["hedges_sent"] >= self.max_rate * metrics["calls"]:
+                metrics["capped"] += 1
+                return await primary
+
+            hedge = asyncio.ensure_future(fn())
+            pending.add(hedge)
+            metrics["hedges_sent"] += 1
+            metrics["last_delay"] = delay
+            logger.info(f"Hedging {call_type} call after {delay:.2f}s")
+
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            metrics["hedges_won"] += 1
+                        return task.result()
+                    if task is primary or error is None:
+                        error = task.exception()
+            raise error
+        finally:
+            # Cancel whichever request lost
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hedging statistics.
+
+        Returns:
+            Dictionary mapping call types to calls, hedges sent and won, capped hedges,
+            hedge rate, hedge win rate and the last hedge delay
+        """
+        return {
+            call_type: {
+                "calls": int(metrics["calls"]),
+                "hedges_sent": int(metrics["hedges_sent"]),
+                "hedges_won": int(metrics["hedges_won"]),
+                "capped": int(metrics["capped"]),
+                "hedge_rate": metrics["hedges_sent"] / metrics["calls"] if metrics["calls"] else 0.0,
+                "win_rate": metrics["hedges_won"] / metrics["hedges_sent"] if metrics["hedges_sent"] else 0.0,
+                "last_delay": metrics["last_delay"]
+            }
+            for call_type, metrics in self._metrics.items()
+        }
@@ -49,6 +49,24 @@ run_rasa_server() {
 
 # Function to run Rasa action server
 run_action_server() {
+    # Load and warm up the model first so no user pays the cold start
+    echo "Warming up the Ollama model..."
+    
+    if ! python model_warmup.py; then
+        echo "Model warm-up failed. Starting the action server anyway; AI replies will use fallbacks until Ollama is ready."
+    fi
+    
+    # Out-of-scope messages are answered from the pre-generated fallback bank
+    FALLBACK_BANK_FILE=${FALLBACK_BANK_PATH:-fallback_bank.json.gz}
+    if [ ! -f "$FALLBACK_BANK_FILE" ]; then
+        # A small bank keeps startup quick; run fallback_bank.py with a larger --size offline for more variety
+        echo "Building the fallback reply bank at $FALLBACK_BANK_FILE..."
+        
+        if ! python fallback_bank.py --output "$FALLBACK_BANK_FILE" --size 10 --log-dir conversation_logs; then
+            echo "Building the fallback bank failed. Out-of-scope messages will get a generic reply until it is built."
+        fi
+    fi
+    
     echo "Starting Rasa action server..."
     
     python -m rasa run actions
@@ -0,0 +1,145 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+
+from ollama_client import get_ollama_client
+from llm_cache import get_extraction_cache
+from extraction_batcher import get_extraction_batcher
+from extraction_cascade import cascade_stats
+from profile_extractor import get_profile_extractor
+from prompt_builder import get_prompt_stats
+from conversation_summary import get_summary_store
+from persona_session import get_persona_sessions
+from turn_deadline import get_turn_budgets
+from generation_tracker import get_generation_tracker
+from reply_streamer import get_reply_streamer
+from fallback_cache import get_fallback_cache
+from fallback_bank import get_fallback_bank
+from action_idempotency import get_action_idempotency
+
+logger = logging.getLogger(__name__)
+
+# Seconds between service stats log lines (0 disables them)
+SERVICE_STATS_INTERVAL = float(os.environ.get("SERVICE_STATS_INTERVAL", "300"))
+
+
+def collect_stats() -> Dict[str, Any]:
+    """
+    Collect the statistics of every shared component.
+
+    Returns:
+        Dictionary mapping component names to their stats() output
+    """
+    client = get_ollama_client()
+    ollama = {
+        "single_flight": client.single_flight.stats(),
+        "circuit_breaker": client.breaker.stats(),
+        "latency": client.latency.stats(),
+        "hedging": client.hedger.stats(),
+        "scheduler": client.scheduler.stats(),
+        "sender_budget": client.budget.stats(),
+        "prompt_eval": client.prompt_eval.stats(),
+        "generation_limits": client.generation.stats()
+    }
+    if client.backends is not None:
+        ollama["backends"] = client.backends.stats()
+
+    return {
+        "ollama": ollama,
+        "extraction_cache": get_extraction_cache().stats(),
+        "extraction_batcher": get_extraction_batcher().stats(),
+        "extraction_cascades": cascade_stats(),
+        "profile_extractor": get_profile_extractor().stats(),
+        "prompts": get_prompt_stats().stats(),
+        "conversation_summary": get_summary_store().stats(),
+        "persona_sessions": get_persona_sessions().stats(),
+        "turn_deadlines": get_turn_budgets().stats(),
+        "generation_tracker": get_generation_tracker().stats(),
+        "reply_streamer": get_reply_streamer().stats(),
+        "fallback_cache": get_fallback_cache().stats(),
+        "fallback_bank": get_fallback_bank().stats(),
+        "action_idempotency": get_action_idempotency().stats()
+    }
+
+
+class StatsReporter:
+    """
+    Log the statistics of every shared component at a fixed interval.
+
+    Each report is one "Service stats:" log line holding a JSON object from
+    collect_stats(), so the counters behind the stats() helpers can be
+    followed in the action server's log.
+    """
+
+    def __init__(self, interval: float = SERVICE_STATS_INTERVAL):
+        """
+        Initialize the reporter.
+
+        Args:
+            interval: Seconds between reports (0 disables them)
+        """
+        self.interval = interval
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.reports = 0
+
+    def start(self) -> None:
+        """Start the reporting loop on the running event loop (once)."""
+        if self.interval <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._task = loop.create_task(self._report_loop())
+            self._loop = loop
+
+    async def _report_loop(self) -> None:
+        """Report every interval."""
+        while True:
+            await asyncio.sleep(self.interval)
+            self.report()
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Log the current statistics.
+
+        Returns:
+            The statistics logged (empty if they could not be collected)
+        """
+        try:
+            stats = collect_stats()
+        except Exception as e:
+            logger.error(f"Error collecting service stats: {str(e)}")
+            return {}
+        self.reports += 1
+        logger.info(f"Service stats: {json.dumps(stats, sort_keys=True, default=str)}")
+        return stats
+
+    async def stop(self) -> None:
+        """Stop the reporting loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+
+
+_shared_reporter: Optional[StatsReporter] = None
+
+
+def get_stats_reporter() -> StatsReporter:
+    """
+    Get the process-wide stats reporter.
+
+    Returns:
+        The shared StatsReporter instance
+    """
+    global _shared_reporter
+    if _shared_reporter is None:
+        _shared_reporter = StatsReporter()
+    return _shared_reporter
@@ -0,0 +1,115 @@
+import asyncio
+import unittest
+
+from rasa_sdk import Tracker
+from rasa_sdk.events import SlotSet
+from rasa_sdk.executor import CollectingDispatcher
+
+import action_idempotency
+from action_idempotency import ActionIdempotencyCache, idempotent_action, run_key
+
+
+def create_tracker(sender_id="user-1", message_id="m1", timestamp=100.0):
+    """Helper function to create a tracker whose latest event is a user message."""
+    latest_message = {"text": "hi", "message_id": message_id}
+    events = [{"event": "user", "timestamp": timestamp, "text": "hi", "message_id": message_id}]
+    return Tracker(sender_id, {}, latest_message, events, False, None, {}, "action_listen")
+
+
+class FakeAction:
+    """A stand-in for a slow LLM-backed Rasa action."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def name(self):
+        return "action_fake"
+
+    @idempotent_action
+    async def run(self, dispatcher, tracker, domain):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        dispatcher.utter_message(text=f"reply {self.calls}")
+        return [SlotSet("age", 28)]
+
+
+class TestActionIdempotency(unittest.IsolatedAsyncioTestCase):
+    """Test cases for replaying retried action runs."""
+
+    def setUp(self):
+        action_idempotency._shared_cache = ActionIdempotencyCache(enabled=True, ttl=60, max_entries=10)
+
+    def tearDown(self):
+        action_idempotency._shared_cache = None
+
+    def test_key_uses_latest_event(self):
+        """Test that the run key changes with the latest message and event timestamp."""
+        key = run_key("user-1", "action_fake", create_tracker())
+        self.assertEqual(key, ("user-1", "action_fake", "m1", "100.0"))
+        self.assertNotEqual(key, run_key("user-1", "action_fake", create_tracker(timestamp=101.0)))
+
+    async def test_retry_replays_result(self):
+        """Test that a retried call gets the first run's events and messages without running again."""
+        action = FakeAction()
+        first = CollectingDispatcher()
+        retry = CollectingDispatcher()
+
+        events = await action.run(first, create_tracker(), {})
+        replayed = await action.run(retry, create_tracker(), {})
+
+        self.assertEqual(action.calls, 1)
+        self.assertEqual(replayed, events)
+        self.assertEqual(retry.messages, first.messages)
+        self.assertEqual(len(first.messages), 1)
+
+    async def test_retry_during_run_waits_for_it(self):
+        """Test that a retry arriving while the first run is going does not start another run."""
+        action = FakeAction(delay=0.05)
+        first = CollectingDispatcher()
+        retry = CollectingDispatcher()
+
+        results = await asyncio.gather(
+            action.run(first, create_tracker(), {}),
+            action.run(retry, create_tracker(), {})
+        )
+
+        self.assertEqual(action.calls, 1)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(retry.messages, first.messages)
+        self.assertEqual(action_idempotency._shared_cache.stats()["joined"], 1)
+
+    async def test_new_message_runs_again(self):
+        """Test that a call for a newer message runs the action."""
+        action = FakeAction()
+        await action.run(CollectingDispatcher(), create_tracker(), {})
+        await action.run(CollectingDispatcher(), create_tracker(message_id="m2", timestamp=101.0), {})
+        self.assertEqual(action.calls, 2)
+
+    async def test_errors_and_expiry_are_not_replayed(self):
+        """Test that failed runs are not kept and kept results expire and are bounded."""
+        cache = ActionIdempotencyCache(enabled=True, ttl=0, max_entries=1)
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            raise RuntimeError("Ollama down")
+
+        with self.assertRaises(RuntimeError):
+            await cache.run(("u", "a", "m", "1"), failing)
+        with self.assertRaises(RuntimeError):
+            await cache.run(("u", "a", "m", "1"), failing)
+        self.assertEqual(len(calls), 2)
+
+        async def succeeding():
+            calls.append(1)
+            return [], []
+
+        await cache.run(("u", "a", "m", "2"), succeeding)
+        await cache.run(("u", "a", "m", "2"), succeeding)
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(cache.stats()["size"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,17 @@
+import os
+import uuid
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 from rasa_sdk import Tracker
 from rasa_sdk.executor import CollectingDispatcher
-from rasa_sdk.events import SlotSet
+
+from llm_cache import ResponseCache
+from llm_cassette import CassetteTransport
+from ollama_client import OllamaClient
+
+# LLM calls made by the actions are replayed from this cassette. To re-record it,
+# point OLLAMA_API_HOST at Ollama (or ollama_stub.py) and set OLLAMA_CASSETTE_MODE=record.
+CASSETTE_PATH = os.environ.get("OLLAMA_CASSETTE") or os.path.join(os.path.dirname(__file__), "cassettes", "actions.json")
 
 # Import your custom actions
 # Note: Update import path as needed for your project structure
@@ -19,40 +28,42 @@ except ImportError:
     print("Note: This test assumes actions are in 'actions/actions.py'. Adjust import path as needed.")
     # Create mock classes for testing if import fails
     class ActionCollectName:
-        def run(self, dispatcher, tracker, domain):
+        async def run(self, dispatcher, tracker, domain):
             return []
             
     class ActionCollectAge:
-        def run(self, dispatcher, tracker, domain):
+        async def run(self, dispatcher, tracker, domain):
             return []
             
     class ActionCollectGender:
-        def run(self, dispatcher, tracker, domain):
+        async def run(self, dispatcher, tracker, domain):
             return []
             
     class ActionCollectGenderPreference:
-        def run(self, dispatcher, tracker, domain):
+        async def run(self, dispatcher, tracker, domain):
             return []
             
     class ActionCollectAgePreference:
-        def run(self, dispatcher, tracker, domain):
+        async def run(self, dispatcher, tracker, domain):
             return []
             
     class ActionCollectHeight:
-        def run(self, dispatcher, tracker, domain):
+        async def run(self, dispatcher, tracker, domain):
             return []
 
 
 def create_mock_tracker(sender_id="test_user", slot_values=None, latest_message=None):
     """Helper function to create a mock tracker for testing."""
     slot_values = slot_values or {}
-    latest_message = latest_message or {}
+    # Every tracker carries a new message, so retried-run replay never crosses tests
+    latest_message = {"message_id": uuid.uuid4().hex, **(latest_message or {})}
     
     # Create a mock tracker
     tracker = MagicMock(spec=Tracker)
     tracker.sender_id = sender_id
     tracker.slots = slot_values
     tracker.latest_message = latest_message
+    tracker.events = []
     
     # Add get_slot method
     def get_slot(slot_name):
@@ -63,15 +74,38 @@ def create_mock_tracker(sender_id="test_user", slot_values=None, latest_message=
     return tracker
 
 
-class TestActionCollectName(unittest.TestCase):
+def find_slot_event(events, slot_name):
+    """Helper function to find the SlotSet event for a slot."""
+    return next((e for e in events if e.get("event") == "slot" and e.get("name") == slot_name), None)
+
+
+class ActionTestCase(unittest.IsolatedAsyncioTestCase):
+    """Base class that runs actions against the LLM calls recorded in the cassette."""
+
+    async def asyncSetUp(self):
+        self.transport = CassetteTransport(CASSETTE_PATH)
+        self.client = OllamaClient(transport=self.transport)
+        # A fresh extraction cache, so every LLM call goes to the cassette
+        for target, value in [("ollama_client._shared_client", self.client),
+                              ("llm_cache._extraction_cache", ResponseCache(max_size=100, ttl=60))]:
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+
+class TestActionCollectName(ActionTestCase):
     """Test cases for ActionCollectName."""
     
-    def setUp(self):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
         self.action = ActionCollectName()
         self.dispatcher = CollectingDispatcher()
         self.domain = {}
     
-    def test_valid_name_entity(self):
+    async def test_valid_name_entity(self):
         """Test when a valid name entity is provided."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 1},
@@ -81,19 +115,19 @@ class TestActionCollectName(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
         # Check if name slot is set correctly
-        name_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "name"), None)
+        name_slot_event = find_slot_event(events, "name")
         self.assertIsNotNone(name_slot_event, "Name slot should be set")
-        self.assertEqual(name_slot_event.value, "John", "Name value should be 'John'")
+        self.assertEqual(name_slot_event["value"], "John", "Name value should be 'John'")
         
         # Check if personal_data_stage is incremented
-        stage_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "personal_data_stage"), None)
+        stage_slot_event = find_slot_event(events, "personal_data_stage")
         self.assertIsNotNone(stage_slot_event, "personal_data_stage slot should be set")
-        self.assertEqual(stage_slot_event.value, 2, "personal_data_stage should be incremented to 2")
+        self.assertEqual(stage_slot_event["value"], 2, "personal_data_stage should be incremented to 2")
     
-    def test_international_name(self):
+    async def test_international_name(self):
         """Test with an international name with diacritics."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 1},
@@ -103,14 +137,14 @@ class TestActionCollectName(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
         # Check if name slot preserves diacritics
-        name_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "name"), None)
+        name_slot_event = find_slot_event(events, "name")
         self.assertIsNotNone(name_slot_event, "Name slot should be set")
-        self.assertEqual(name_slot_event.value, "José García", "Name should preserve diacritics")
+        self.assertEqual(name_slot_event["value"], "José García", "Name should preserve diacritics")
     
-    def test_no_name_entity(self):
+    async def test_no_name_entity(self):
         """Test when no name entity is extracted but name is in the message."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 1},
@@ -120,23 +154,24 @@ class TestActionCollectName(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
-        # Check if fallback extraction uses the full message as name
-        name_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "name"), None)
-        if name_slot_event:  # This depends on your implementation
-            self.assertEqual(name_slot_event.value, "John", "Fallback should use message text as name")
+        # Check that the LLM extraction (replayed from the cassette) finds the name
+        name_slot_event = find_slot_event(events, "name")
+        self.assertIsNotNone(name_slot_event, "Name slot should be set")
+        self.assertEqual(name_slot_event["value"], "John", "Fallback should use message text as name")
 
 
-class TestActionCollectAge(unittest.TestCase):
+class TestActionCollectAge(ActionTestCase):
     """Test cases for ActionCollectAge."""
     
-    def setUp(self):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
         self.action = ActionCollectAge()
         self.dispatcher = CollectingDispatcher()
         self.domain = {}
     
-    def test_valid_numeric_age(self):
+    async def test_valid_numeric_age(self):
         """Test when a valid numeric age is provided."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 2},
@@ -146,23 +181,23 @@ class TestActionCollectAge(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
         # Check if age slot is set correctly
-        age_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "age"), None)
+        age_slot_event = find_slot_event(events, "age")
         self.assertIsNotNone(age_slot_event, "Age slot should be set")
-        self.assertEqual(age_slot_event.value, 28, "Age value should be 28")
+        self.assertEqual(age_slot_event["value"], 28, "Age value should be 28")
         
         # Check if personal_data_stage is incremented
-        stage_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "personal_data_stage"), None)
+        stage_slot_event = find_slot_event(events, "personal_data_stage")
         self.assertIsNotNone(stage_slot_event, "personal_data_stage slot should be set")
-        self.assertEqual(stage_slot_event.value, 3, "personal_data_stage should be incremented to 3")
+        self.assertEqual(stage_slot_event["value"], 3, "personal_data_stage should be incremented to 3")
         
         # Check if dob is calculated and set
-        dob_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "dob"), None)
+        dob_slot_event = find_slot_event(events, "dob")
         self.assertIsNotNone(dob_slot_event, "DOB slot should be set")
     
-    def test_invalid_age(self):
+    async def test_invalid_age(self):
         """Test with an invalid age."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 2},
@@ -172,22 +207,23 @@ class TestActionCollectAge(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
         # Check that no slots are set for invalid age
-        age_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "age"), None)
+        age_slot_event = find_slot_event(events, "age")
         self.assertIsNone(age_slot_event, "Age slot should not be set for invalid input")
 
 
-class TestActionCollectGender(unittest.TestCase):
+class TestActionCollectGender(ActionTestCase):
     """Test cases for ActionCollectGender."""
     
-    def setUp(self):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
         self.action = ActionCollectGender()
         self.dispatcher = CollectingDispatcher()
         self.domain = {}
     
-    def test_valid_gender(self):
+    async def test_valid_gender(self):
         """Test when a valid gender is provided."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 3},
@@ -197,19 +233,19 @@ class TestActionCollectGender(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
         # Check if gender slot is set correctly
-        gender_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "gender"), None)
+        gender_slot_event = find_slot_event(events, "gender")
         self.assertIsNotNone(gender_slot_event, "Gender slot should be set")
-        self.assertEqual(gender_slot_event.value, "male", "Gender value should be 'male'")
+        self.assertEqual(gender_slot_event["value"], "male", "Gender value should be 'male'")
         
         # Check if personal_data_stage is incremented
-        stage_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "personal_data_stage"), None)
+        stage_slot_event = find_slot_event(events, "personal_data_stage")
         self.assertIsNotNone(stage_slot_event, "personal_data_stage slot should be set")
-        self.assertEqual(stage_slot_event.value, 4, "personal_data_stage should be incremented to 4")
+        self.assertEqual(stage_slot_event["value"], 4, "personal_data_stage should be incremented to 4")
     
-    def test_nonbinary_gender(self):
+    async def test_nonbinary_gender(self):
         """Test with non-binary gender."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 3},
@@ -219,23 +255,24 @@ class TestActionCollectGender(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
         # Check if gender slot handles non-binary input
-        gender_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "gender"), None)
+        gender_slot_event = find_slot_event(events, "gender")
         self.assertIsNotNone(gender_slot_event, "Gender slot should be set")
-        self.assertEqual(gender_slot_event.value, "non-binary", "Gender should accept 'non-binary'")
+        self.assertEqual(gender_slot_event["value"], "non-binary", "Gender should accept 'non-binary'")
 
 
-class TestActionCollectGenderPreference(unittest.TestCase):
+class TestActionCollectGenderPreference(ActionTestCase):
     """Test cases for ActionCollectGenderPreference."""
     
-    def setUp(self):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
         self.action = ActionCollectGenderPreference()
         self.dispatcher = CollectingDispatcher()
         self.domain = {}
     
-    def test_single_preference(self):
+    async def test_single_preference(self):
         """Test when a single gender preference is provided."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 4},
@@ -245,19 +282,19 @@ class TestActionCollectGenderPreference(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
         # Check if gender_preference slot is set correctly
-        pref_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "gender_preference"), None)
+        pref_slot_event = find_slot_event(events, "gender_preference")
         self.assertIsNotNone(pref_slot_event, "Gender preference slot should be set")
-        self.assertEqual(pref_slot_event.value, "women", "Gender preference should be 'women'")
+        self.assertEqual(pref_slot_event["value"], "women", "Gender preference should be 'women'")
         
         # Check if personal_data_stage is incremented
-        stage_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "personal_data_stage"), None)
+        stage_slot_event = find_slot_event(events, "personal_data_stage")
         self.assertIsNotNone(stage_slot_event, "personal_data_stage slot should be set")
-        self.assertEqual(stage_slot_event.value, 5, "personal_data_stage should be incremented to 5")
+        self.assertEqual(stage_slot_event["value"], 5, "personal_data_stage should be incremented to 5")
     
-    def test_multiple_preference(self):
+    async def test_multiple_preference(self):
         """Test with multiple gender preferences."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 4},
@@ -270,25 +307,26 @@ class TestActionCollectGenderPreference(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
         # Check if gender_preference slot handles multiple preferences
-        pref_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "gender_preference"), None)
+        pref_slot_event = find_slot_event(events, "gender_preference")
         self.assertIsNotNone(pref_slot_event, "Gender preference slot should be set")
         # The exact format depends on your implementation, but it should contain both values
-        self.assertTrue("men" in str(pref_slot_event.value) and "women" in str(pref_slot_event.value),
+        self.assertTrue("men" in str(pref_slot_event["value"]) and "women" in str(pref_slot_event["value"]),
                        "Gender preference should include both 'men' and 'women'")
 
 
-class TestActionCollectAgePreference(unittest.TestCase):
+class TestActionCollectAgePreference(ActionTestCase):
     """Test cases for ActionCollectAgePreference."""
     
-    def setUp(self):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
         self.action = ActionCollectAgePreference()
         self.dispatcher = CollectingDispatcher()
         self.domain = {}
     
-    def test_numeric_range(self):
+    async def test_numeric_range(self):
         """Test when a numeric age range is provided."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 5},
@@ -298,46 +336,46 @@ class TestActionCollectAgePreference(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
         # Check if age_preference slot is set correctly
-        pref_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "age_preference"), None)
+        pref_slot_event = find_slot_event(events, "age_preference")
         self.assertIsNotNone(pref_slot_event, "Age preference slot should be set")
-        self.assertEqual(pref_slot_event.value, "25-35", "Age preference should be '25-35'")
+        self.assertEqual(pref_slot_event["value"], "25-35", "Age preference should be '25-35'")
         
         # Check if personal_data_stage is incremented
-        stage_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "personal_data_stage"), None)
+        stage_slot_event = find_slot_event(events, "personal_data_stage")
         self.assertIsNotNone(stage_slot_event, "personal_data_stage slot should be set")
-        self.assertEqual(stage_slot_event.value, 6, "personal_data_stage should be incremented to 6")
+        self.assertEqual(stage_slot_event["value"], 6, "personal_data_stage should be incremented to 6")
     
-    def test_decade_preference(self):
-        """Test with age preference expressed as a decade."""
+    async def test_decade_preference(self):
+        """Test with age preference expressed as a decade and no entity, so the LLM extracts it."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 5},
             latest_message={
-                "text": "thirties",
-                "entities": [{"entity": "age_preference", "value": "thirties"}]
+                "text": "someone in their thirties",
+                "entities": []
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
         # Check if age_preference slot handles decade expressions
-        pref_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "age_preference"), None)
+        pref_slot_event = find_slot_event(events, "age_preference")
         self.assertIsNotNone(pref_slot_event, "Age preference slot should be set")
-        # The actual value depends on implementation, but should reflect the 30s range
-        self.assertTrue("30" in str(pref_slot_event.value), "Age preference should convert 'thirties' to numeric range")
+        self.assertEqual(pref_slot_event["value"], "30-39", "Age preference should convert 'thirties' to numeric range")
 
 
-class TestActionCollectHeight(unittest.TestCase):
+class TestActionCollectHeight(ActionTestCase):
     """Test cases for ActionCollectHeight."""
     
-    def setUp(self):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
         self.action = ActionCollectHeight()
         self.dispatcher = CollectingDispatcher()
         self.domain = {}
     
-    def test_imperial_height(self):
+    async def test_imperial_height(self):
         """Test when height is provided in imperial format."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 6},
@@ -347,25 +385,19 @@ class TestActionCollectHeight(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
-        # Check if height slot is set correctly (converted to cm)
-        height_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "height"), None)
+        # Check if height slot is set correctly (kept in the format it was given)
+        height_slot_event = find_slot_event(events, "height")
         self.assertIsNotNone(height_slot_event, "Height slot should be set")
-        self.assertTrue(175 <= height_slot_event.value <= 180, 
-                       f"Height value {height_slot_event.value} should be around 178cm for 5'10\"")
+        self.assertEqual(height_slot_event["value"], "5'10\"", "Height should be 5'10\"")
         
         # Check if personal_data_stage is incremented
-        stage_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "personal_data_stage"), None)
+        stage_slot_event = find_slot_event(events, "personal_data_stage")
         self.assertIsNotNone(stage_slot_event, "personal_data_stage slot should be set")
-        self.assertEqual(stage_slot_event.value, 7, "personal_data_stage should be incremented to 7")
-        
-        # Check if current_section is updated
-        section_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "current_section"), None)
-        self.assertIsNotNone(section_slot_event, "current_section slot should be set")
-        self.assertEqual(section_slot_event.value, "userInfo", "current_section should be updated to 'userInfo'")
+        self.assertEqual(stage_slot_event["value"], 7, "personal_data_stage should be incremented to 7")
     
-    def test_metric_height(self):
+    async def test_metric_height(self):
         """Test with height provided in metric format."""
         tracker = create_mock_tracker(
             slot_values={"personal_data_stage": 6},
@@ -375,12 +407,30 @@ class TestActionCollectHeight(unittest.TestCase):
             }
         )
         
-        events = self.action.run(self.dispatcher, tracker, self.domain)
+        events = await self.action.run(self.dispatcher, tracker, self.domain)
         
         # Check if height slot handles metric input correctly
-        height_slot_event = next((e for e in events if isinstance(e, SlotSet) and e.key == "height"), None)
+        height_slot_event = find_slot_event(events, "height")
         self.assertIsNotNone(height_slot_event, "Height slot should be set")
-        self.assertEqual(height_slot_event.value, 178, "Height should be 178cm")
+        self.assertEqual(height_slot_event["value"], "178cm", "Height should be 178cm")
+
+
+class TestCallOllamaExtraction(ActionTestCase):
+    """Test cases for the cached extraction helper."""
+    
+    async def test_rejected_response_is_not_cached(self):
+        """Test that an answer the validator rejects is asked again next time."""
+        from actions.actions import call_ollama_extraction
+        batcher = MagicMock()
+        batcher.submit = AsyncMock(side_effect=["about average", "5'9\"", "unused"])
+        
+        with patch("actions.actions.get_extraction_batcher", return_value=batcher):
+            answers = [await call_ollama_extraction("Extract height.", "'{message}'", "average height",
+                                                    validate=lambda r: r.endswith('"'))
+                       for _ in range(3)]
+        
+        self.assertEqual(answers, ["about average", "5'9\"", "5'9\""])
+        self.assertEqual(batcher.submit.await_count, 2)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from ollama_client import OllamaClient
+from circuit_breaker import CircuitBreaker, CircuitOpenError, LatencyTracker
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for the CircuitBreaker."""
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the breaker opens and rejects calls after repeated failures."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_half_open_probe(self):
+        """Test that a single probe is allowed after the reset timeout and closes the breaker."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        with patch("circuit_breaker.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+
+        with patch("circuit_breaker.time.monotonic", return_value=131.0):
+            breaker.before_call()
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            with self.assertRaises(CircuitOpenError):
+                breaker.before_call()
+            breaker.record_success()
+
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        """Test that a failed probe reopens the breaker."""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0)
+        for _ in range(3):
+            breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+class TestLatencyTracker(unittest.TestCase):
+    """Test cases for adaptive timeouts."""
+
+    def test_default_timeout_until_enough_samples(self):
+        """Test that the per-type default is used before enough samples exist."""
+        tracker = LatencyTracker(min_samples=5, max_timeout=300)
+        tracker.record("extraction", 1.0)
+        self.assertEqual(tracker.timeout_for("extraction"), 30.0)
+
+    def test_timeout_follows_percentile(self):
+        """Test that the timeout is derived from the observed percentile latency."""
+        tracker = LatencyTracker(percentile=0.99, multiplier=3.0, min_timeout=1.0, max_timeout=300, min_samples=5)
+        for latency in [1.0, 1.0, 1.0, 1.0, 2.0]:
+            tracker.record("extraction", latency)
+        self.assertAlmostEqual(tracker.timeout_for("extraction"), 6.0)
+
+
+class TestClientFastFail(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the circuit breaker inside OllamaClient."""
+
+    async def test_open_breaker_skips_request(self):
+        """Test that an open breaker fails fast without contacting Ollama."""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503, json={"error": "overloaded"})
+
+        client = OllamaClient(host="http://ollama.test", transport=httpx.MockTransport(handler))
+        client.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+        for i in range(2):
+            with self.assertRaises(httpx.HTTPStatusError):
+                await client.chat([{"role": "user", "content": str(i)}], call_type="extraction")
+        with self.assertRaises(CircuitOpenError):
+            await client.chat([{"role": "user", "content": "again"}], call_type="extraction")
+
+        self.assertEqual(len(calls), 2)
+        await client.aclose()
+
+    async def test_cancelled_call_does_not_release_the_probe(self):
+        """Test that cancelling a call admitted before the breaker opened leaves the probe in flight."""
+
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, json={"message": {"role": "assistant", "content": "ok"}, "done": True})
+
+        client = OllamaClient(host="http://ollama.test", transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(client.aclose)
+        client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+
+        earlier = asyncio.ensure_future(client.chat([{"role": "user", "content": "earlier"}]))
+        await asyncio.sleep(0.01)
+        client.breaker.record_failure()
+        probe = asyncio.ensure_future(client.chat([{"role": "user", "content": "probe"}]))
+        await asyncio.sleep(0.01)
+        earlier.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await earlier
+
+        with self.assertRaises(CircuitOpenError):
+            await client.chat([{"role": "user", "content": "second probe"}])
+        probe.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await probe
+        # Cancelling the probe itself lets the next call probe
+        self.assertTrue(client.breaker.before_call())
+
+
+if __name__ == "__main__":
+    unittest.main()
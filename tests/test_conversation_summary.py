@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from conversation_summary import RollingSummary, ConversationSummaryStore, latest_completed_turn, shorten
+
+
+class TestRollingSummary(unittest.TestCase):
+    """Test cases for the RollingSummary."""
+
+    def test_recent_turns_are_verbatim(self):
+        """Test that the latest turns are rendered as they were said."""
+        summary = RollingSummary(recent_turns=2, max_points=3)
+        summary.add_turn("I love hiking", "Where do you hike?", "userInfo")
+
+        self.assertEqual(summary.render(), "RECENT:\nUSER: I love hiking\nBOT: Where do you hike?")
+        self.assertEqual(RollingSummary().render(), "No previous conversation.")
+
+    def test_summary_size_is_bounded(self):
+        """Test that old turns are condensed and the oldest points dropped."""
+        summary = RollingSummary(recent_turns=2, max_points=3, point_chars=40)
+        for i in range(10):
+            summary.add_turn(f"user message number {i} " + "padding " * 10, f"reply {i}", "userInfo")
+
+        self.assertEqual(len(summary.recent), 2)
+        self.assertEqual(len(summary.points), 3)
+        self.assertTrue(summary.points[-1].startswith("[userInfo] user message number 7"))
+        self.assertIn("EARLIER (8 turns)", summary.render())
+
+    def test_shorten(self):
+        """Test that text is cut at a word boundary."""
+        self.assertEqual(shorten("one two   three", 20), "one two three")
+        self.assertEqual(shorten("alpha beta gamma delta", 15), "alpha beta...")
+
+    def test_latest_completed_turn(self):
+        """Test that the latest answered message is found with every reply to it."""
+        events = [
+            {"event": "user", "text": "hi", "message_id": "m1"},
+            {"event": "bot", "text": "Hi! What's your name?"},
+            {"event": "user", "text": "Sam", "message_id": "m2"},
+            {"event": "action", "name": "action_collect_name"},
+            {"event": "bot", "text": "Thanks, Sam!"},
+            {"event": "bot", "text": "How old are you?"},
+            {"event": "user", "text": "28", "message_id": "m3"}
+        ]
+
+        self.assertEqual(latest_completed_turn(events), {"user": "Sam", "bot": "Thanks, Sam! How old are you?", "message_id": "m2"})
+        self.assertIsNone(latest_completed_turn(events[:1]))
+
+
+class TestConversationSummaryStore(unittest.TestCase):
+    """Test cases for the ConversationSummaryStore."""
+
+    def setUp(self):
+        self.summary_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.summary_dir)
+
+    def test_summary_is_persisted(self):
+        """Test that a summary survives a new store instance."""
+        store = ConversationSummaryStore(summary_dir=self.summary_dir)
+        store.record_turn("user1", "I play guitar", "Nice! What music?", "userInfo")
+
+        self.assertTrue(os.path.exists(os.path.join(self.summary_dir, "summary_user1.json")))
+        reloaded = ConversationSummaryStore(summary_dir=self.summary_dir)
+        self.assertIn("USER: I play guitar", reloaded.render("user1"))
+        self.assertEqual(reloaded.stats()["loads"], 1)
+
+    def test_turn_is_recorded_once(self):
+        """Test that a turn recorded by both a generating action and the logger counts once."""
+        store = ConversationSummaryStore(summary_dir=self.summary_dir)
+
+        self.assertTrue(store.record_turn("user1", "I play guitar", "Nice! What music?", "userInfo", "m1"))
+        self.assertFalse(store.record_turn("user1", "I play guitar", "Nice! What music?", "userInfo", "m1"))
+        self.assertFalse(ConversationSummaryStore(summary_dir=self.summary_dir).record_turn("user1", "I play guitar", "Nice!", None, "m1"))
+
+        self.assertEqual(store.get("user1").turns, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import asyncio
+import unittest
+
+import httpx
+
+from ollama_client import OllamaClient
+from extraction_batcher import ExtractionBatcher
+from turn_deadline import TurnBudgets
+
+
+def create_batch_transport(calls):
+    """Helper function to create a fake Ollama that answers batched prompts."""
+
+    async def handler(request):
+        payload = json.loads(request.content)
+        calls.append(payload)
+        if payload.get("format") == "json":
+            prompt = payload["messages"][1]["content"]
+            task_count = prompt.count("Task ")
+            content = json.dumps({str(i): f"answer {i}" for i in range(1, task_count + 1)})
+        elif isinstance(payload.get("format"), dict) and "1" in payload["format"]["properties"]:
+            properties = payload["format"]["properties"]
+            content = json.dumps({key: {"name": "Sam"} if schema.get("type") == "object" else f"answer {key}"
+                                  for key, schema in properties.items()})
+        else:
+            content = "single answer"
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": content}, "done": True})
+
+    return httpx.MockTransport(handler)
+
+
+class TestExtractionBatcher(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the ExtractionBatcher."""
+
+    async def asyncSetUp(self):
+        self.calls = []
+        self.client = OllamaClient(host="http://ollama.test", transport=create_batch_transport(self.calls))
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_concurrent_requests_share_one_call(self):
+        """Test that requests within the window are sent as one JSON prompt."""
+        batcher = ExtractionBatcher(client=self.client, window_ms=20, max_batch_size=8)
+
+        results = await asyncio.gather(*[batcher.submit("Extract names.", f"Sentence: \"I'm user {i}\"") for i in range(3)])
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.calls[0]["format"], "json")
+        self.assertEqual(results, ["answer 1", "answer 2", "answer 3"])
+        self.assertEqual(batcher.stats()["batched_requests"], 3)
+
+    async def test_batch_does_not_inherit_the_openers_deadline(self):
+        """Test that an expired deadline of the run that opened the window does not fail the other waiters."""
+        batcher = ExtractionBatcher(client=self.client, window_ms=20, max_batch_size=8)
+
+        with TurnBudgets(default_budget=0.001, budgets={}).turn("action_collect_age"):
+            first = asyncio.ensure_future(batcher.submit("Extract ages.", "Sentence: \"I'm 28\""))
+        second = batcher.submit("Extract names.", "Sentence: \"I'm Sam\"")
+
+        results = await asyncio.gather(first, second)
+
+        self.assertEqual(results, ["answer 1", "answer 2"])
+
+    async def test_schema_tasks_are_batched_under_a_combined_schema(self):
+        """Test that a task with a JSON schema shares the batch and gets a JSON object back."""
+        batcher = ExtractionBatcher(client=self.client, window_ms=20, max_batch_size=8)
+        schema = {"type": "object", "properties": {"name": {"type": "string"}}}
+
+        results = await asyncio.gather(
+            batcher.submit("Extract the profile.", "Message: \"I'm Sam\"", schema=schema),
+            batcher.submit("Extract names.", "Sentence: \"I'm Sam\"")
+        )
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.calls[0]["format"]["properties"], {"1": schema, "2": {"type": "string"}})
+        self.assertEqual(json.loads(results[0]), {"name": "Sam"})
+        self.assertEqual(results[1], "answer 2")
+
+    async def test_batch_generation_limit_scales_with_its_size(self):
+        """Test that the per-call extraction cap does not truncate a batch of long answers."""
+        batcher = ExtractionBatcher(client=self.client, window_ms=20, max_batch_size=8)
+
+        await asyncio.gather(*[batcher.submit("Extract the profile.", f"Message: \"I'm user {i}\"", max_tokens=120)
+                               for i in range(6)])
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.calls[0]["options"]["num_predict"], 6 * 120 + 8 * 6)
+
+    async def test_single_request_is_sent_alone(self):
+        """Test that a lone request uses the plain extraction prompt."""
+        batcher = ExtractionBatcher(client=self.client, window_ms=5)
+
+        result = await batcher.submit("Extract ages.", "Message: \"25\"")
+
+        self.assertEqual(result, "single answer")
+        self.assertNotIn("format", self.calls[0])
+
+    async def test_full_batch_is_sent_immediately(self):
+        """Test that reaching the batch size does not wait for the window."""
+        batcher = ExtractionBatcher(client=self.client, window_ms=10000, max_batch_size=2)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.submit("a", "1"), batcher.submit("b", "2")), timeout=1.0
+        )
+
+        self.assertEqual(results, ["answer 1", "answer 2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from extraction_cascade import ExtractionCascade
+
+
+class TestExtractionCascade(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the ExtractionCascade."""
+
+    async def test_cheap_tier_skips_llm(self):
+        """Test that a validated cheap tier wins without starting the LLM tier."""
+        cascade = ExtractionCascade("age")
+        llm_calls = []
+
+        async def llm():
+            llm_calls.append(1)
+            return 30
+
+        value, tier = await cascade.run([
+            ("entity", lambda: None),
+            ("regex", lambda: 25),
+            ("llm", llm)
+        ])
+
+        self.assertEqual((value, tier), (25, "regex"))
+        self.assertEqual(llm_calls, [])
+        stats = cascade.stats()["tiers"]
+        self.assertEqual(stats["regex"]["wins"], 1)
+        self.assertNotIn("llm", stats)
+
+    async def test_validation_rejects_candidates(self):
+        """Test that an invalid cheap value falls through to the next tier."""
+        cascade = ExtractionCascade("gender")
+
+        async def llm():
+            return "female"
+
+        value, tier = await cascade.run([
+            ("entity", lambda: "robot"),
+            ("llm", llm)
+        ], validate=lambda v: v if v in ["male", "female"] else None)
+
+        self.assertEqual((value, tier), ("female", "llm"))
+
+    async def test_losing_llm_tier_is_cancelled(self):
+        """Test that a slow LLM tier is cancelled once a faster tier wins."""
+        cascade = ExtractionCascade("height")
+        cancelled = asyncio.Event()
+
+        async def llm():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def lookup():
+            await asyncio.sleep(0.01)
+            return "178cm"
+
+        value, tier = await asyncio.wait_for(cascade.run([("llm", llm), ("lookup", lookup)]), timeout=1.0)
+        await asyncio.sleep(0)
+
+        self.assertEqual((value, tier), ("178cm", "lookup"))
+        self.assertTrue(cancelled.is_set())
+        self.assertEqual(cascade.stats()["tiers"]["llm"]["cancelled"], 1)
+
+    async def test_all_tiers_inconclusive(self):
+        """Test that a miss is recorded when no tier finds a value."""
+        cascade = ExtractionCascade("name")
+
+        async def llm():
+            raise RuntimeError("backend down")
+
+        value, tier = await cascade.run([("entity", lambda: None), ("llm", llm)])
+
+        self.assertEqual((value, tier), (None, None))
+        self.assertEqual(cascade.stats()["misses"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
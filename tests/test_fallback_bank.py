@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+from fallback_bank import (
+    FallbackBank, FallbackBankBuilder, bank_key, bank_keys, clean_reply,
+    fallback_section, fallback_system_message, load_bank, save_bank
+)
+from ollama_client import OllamaClient
+from ollama_stub import LatencyProfile, OllamaStub
+
+
+class TestFallbackBank(unittest.TestCase):
+    """Test cases for serving banked fallback replies."""
+
+    def setUp(self):
+        self.replies = {
+            "2:personal_data": ["Purr-haps later! What's your gender, {name}?", "Meow! Back to you - your gender?", "Cat-ch you later! Gender?"],
+            "7:userPref": ["Fun! So what are you looking for in a partner?"]
+        }
+
+    def test_sections(self):
+        """Test that stages and sections map to bank keys."""
+        self.assertEqual(fallback_section(3, "userInfo"), "personal_data")
+        self.assertEqual(fallback_section(7, "userPref"), "userPref")
+        self.assertEqual(fallback_section(8, None), "general")
+        self.assertEqual(bank_key(9, "userInfo"), "7:userInfo")
+        self.assertEqual(len(bank_keys()), 9)
+        self.assertIn("gender preference", fallback_system_message(3))
+
+    def test_rotation_without_repeats(self):
+        """Test that a sender sees every reply for a stage before any repeats."""
+        bank = FallbackBank(self.replies)
+        served = [bank.reply("user-1", 2, "personal_data", "Sam") for _ in range(3)]
+
+        self.assertEqual(len(set(served)), 3)
+        self.assertIn("Purr-haps later! What's your gender, Sam?", served)
+        self.assertEqual(bank.reply("user-1", 2, "personal_data", "Sam"), served[0])
+
+    def test_miss(self):
+        """Test that stages without replies return None and are counted."""
+        bank = FallbackBank(self.replies)
+        self.assertIsNone(bank.reply("user-1", 1, "personal_data"))
+        self.assertEqual(bank.stats()["misses"], 1)
+
+    def test_bounded_senders(self):
+        """Test that only max_senders rotation positions are kept."""
+        bank = FallbackBank(self.replies, max_senders=2)
+        for sender_id in ["a", "b", "c"]:
+            bank.reply(sender_id, 2, "personal_data")
+        self.assertEqual(len(bank._positions), 2)
+
+    def test_file_round_trip(self):
+        """Test that a saved bank loads back and a missing file gives an empty bank."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bank.json.gz")
+            save_bank(path, self.replies, "phi4")
+            self.assertEqual(load_bank(path), self.replies)
+            self.assertEqual(load_bank(os.path.join(tmp, "missing.json.gz")), {})
+
+    def test_clean_reply(self):
+        """Test that quotes are stripped and replies with stray braces are dropped."""
+        self.assertEqual(clean_reply(' "Meow, {name}!" '), "Meow, {name}!")
+        self.assertEqual(clean_reply("Meow {user}!"), "")
+
+
+class TestFallbackBankBuilder(unittest.IsolatedAsyncioTestCase):
+    """Test cases for generating the bank."""
+
+    async def asyncSetUp(self):
+        self.stub = OllamaStub(latency=LatencyProfile(), seed=0)
+        port = await self.stub.start("127.0.0.1", 0)
+        self.client = OllamaClient(host=f"http://127.0.0.1:{port}")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await self.stub.close()
+
+    async def test_build_distinct_replies(self):
+        """Test that every stage and section gets distinct replies, capped at the bank size."""
+        replies = await FallbackBankBuilder(self.client, size=2).build()
+
+        self.assertEqual(set(replies), {bank_key(stage, section) for stage, section in bank_keys()})
+        for key_replies in replies.values():
+            self.assertTrue(0 < len(key_replies) <= 2)
+            self.assertEqual(len(set(key_replies)), len(key_replies))
+
+
+if __name__ == "__main__":
+    unittest.main()
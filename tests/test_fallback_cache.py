@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import patch
+
+from fallback_cache import FallbackReplyCache, normalize_message, shingle_signature, similarity
+
+
+class TestFallbackReplyCache(unittest.TestCase):
+    """Test cases for the near-duplicate fallback reply cache."""
+
+    def fill(self, cache, stage_key, message, replies, name="there"):
+        for reply in replies:
+            cache.add(stage_key, message, reply, name)
+
+    def test_normalization(self):
+        """Test that case, punctuation and stretched letters are normalized away."""
+        self.assertEqual(normalize_message("  LOLLLL!!! "), "loll")
+        self.assertEqual(normalize_message("Who are you?"), normalize_message("who   are you"))
+
+    def test_signature_similarity(self):
+        """Test that near-duplicates are more similar than unrelated messages."""
+        base = shingle_signature("are you a bot")
+        self.assertGreater(similarity(base, shingle_signature("are you a bot or")), 0.6)
+        self.assertLess(similarity(base, shingle_signature("whats the weather")), 0.2)
+
+    def test_served_once_all_variants_collected(self):
+        """Test that an entry is only served once it has every variant, then rotates through them."""
+        cache = FallbackReplyCache(variants=2)
+        cache.add("1:personal_data", "lol", "Glad I made you laugh! How old are you?")
+        self.assertIsNone(cache.get("1:personal_data", "lol"))
+
+        cache.add("1:personal_data", "lol", "Hehe, purr-fect! What's your age?")
+        served = [cache.get("1:personal_data", "LOL!!") for _ in range(2)]
+        self.assertEqual(len(set(served)), 2)
+        self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_near_duplicate_hit(self):
+        """Test that a near-duplicate message hits and an unrelated one misses."""
+        cache = FallbackReplyCache(variants=1)
+        cache.add("2:personal_data", "are you a bot", "I'm a cat-bot! What's your gender?")
+
+        self.assertEqual(cache.get("2:personal_data", "are you a bot?? lol"), "I'm a cat-bot! What's your gender?")
+        self.assertIsNone(cache.get("2:personal_data", "what's the weather like"))
+        self.assertEqual(cache.stats()["near_hits"], 1)
+
+    def test_specific_messages_match_exactly(self):
+        """Test that messages with negations or numbers are never near-duplicates of each other."""
+        cache = FallbackReplyCache(variants=1)
+        cache.add("7:general", "i do like hiking haha", "Fun! Tell me more about you.")
+        cache.add("1:personal_data", "i am twenty five years old lol", "Purr-fect! And your gender?")
+
+        self.assertIsNone(cache.get("7:general", "i dont like hiking haha"))
+        self.assertIsNone(cache.get("1:personal_data", "i am twenty six years old lol"))
+        self.assertEqual(cache.get("1:personal_data", "I am twenty five years old, lol"), "Purr-fect! And your gender?")
+
+        cache.add("7:general", "i dont like hiking haha", "Fair enough! What else?")
+        self.assertEqual(cache.get("7:general", "i do like hiking haha"), "Fun! Tell me more about you.")
+
+    def test_stage_is_part_of_the_key(self):
+        """Test that a reply cached for one stage is not served at another."""
+        cache = FallbackReplyCache(variants=1)
+        cache.add("1:personal_data", "who are you", "I'm Hapa! How old are you?")
+        self.assertIsNone(cache.get("3:personal_data", "who are you"))
+
+    def test_name_is_not_shared(self):
+        """Test that the user's name is stored as a placeholder."""
+        cache = FallbackReplyCache(variants=1)
+        cache.add("1:personal_data", "hi", "Hi Sam! How old are you?", "Sam")
+        self.assertEqual(cache.get("1:personal_data", "hi", "Alex"), "Hi Alex! How old are you?")
+
+    def test_eviction_and_expiry(self):
+        """Test that entries are bounded by size and expire after the TTL."""
+        cache = FallbackReplyCache(max_size=2, ttl=60, variants=1, threshold=1.0)
+        for message in ["lol", "what", "who are you"]:
+            cache.add("1:personal_data", message, f"reply to {message}")
+        self.assertEqual(cache.stats()["size"], 2)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertIsNone(cache.get("1:personal_data", "lol"))
+
+        with patch("fallback_cache.time.time", return_value=10 ** 12):
+            self.assertIsNone(cache.get("1:personal_data", "what"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertFalse(any(("1:personal_data", "what") in keys for keys in cache._index.values()))
+
+    def test_long_messages_not_cached(self):
+        """Test that messages over max_chars are not cached."""
+        cache = FallbackReplyCache(variants=1, max_chars=10)
+        cache.add("1:personal_data", "this message is far too long", "reply")
+        self.assertEqual(cache.stats()["size"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
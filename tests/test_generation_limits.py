@@ -0,0 +1,87 @@
+import json
+import unittest
+
+import httpx
+
+from generation_limits import GenerationPolicy, answer_end
+from ollama_client import OllamaClient
+
+
+def create_stream_transport(pieces, calls=None):
+    """Helper function to create a fake streaming /api/chat transport."""
+    calls = calls if calls is not None else []
+
+    async def handler(request):
+        payload = json.loads(request.content)
+        calls.append(payload)
+        if not payload["stream"]:
+            return httpx.Response(200, json={"message": {"content": "".join(pieces)}, "done": True})
+        lines = [json.dumps({"message": {"content": piece}, "done": False}) for piece in pieces]
+        lines.append(json.dumps({"message": {"content": ""}, "done": True, "done_reason": "stop", "eval_count": len(pieces)}))
+        return httpx.Response(200, content="\n".join(lines).encode("utf-8"))
+
+    return httpx.MockTransport(handler)
+
+
+class TestGenerationPolicy(unittest.TestCase):
+    """Test cases for per call type generation limits."""
+
+    def test_max_tokens_becomes_num_predict(self):
+        """Test that max_tokens is translated and capped at the call type's limit."""
+        policy = GenerationPolicy(limits={"extraction": 40}, stops={"extraction": ["\n"]})
+
+        self.assertEqual(policy.options("extraction", {"max_tokens": 10}), {"num_predict": 10, "stop": ["\n"]})
+        self.assertEqual(policy.options("extraction", {"num_predict": 500})["num_predict"], 40)
+        self.assertEqual(policy.options("extraction", None)["num_predict"], 40)
+
+    def test_structured_calls_get_no_newline_stop(self):
+        """Test that JSON answers, which may span lines, are not stopped at a newline."""
+        policy = GenerationPolicy(stops={"extraction": ["\n"]})
+        self.assertNotIn("stop", policy.options("extraction", {}, structured=True))
+
+    def test_answer_end(self):
+        """Test that complete answers are detected in partial content."""
+        self.assertIsNone(answer_end("180", False))
+        self.assertEqual(answer_end("\n180cm\nBecause", False), 6)
+        self.assertIsNone(answer_end('{"name": "Sam", "note": "}"', True))
+        self.assertEqual(answer_end('{"a": {"b": "}"}} trailing', True), 17)
+
+
+class TestEarlyStop(unittest.IsolatedAsyncioTestCase):
+    """Test cases for cutting extraction calls off once the answer is complete."""
+
+    async def test_plain_answer_stops_at_newline(self):
+        """Test that a rambling extraction answer is cut at its first line."""
+        calls = []
+        client = OllamaClient(host="http://ollama.test", transport=create_stream_transport(["180", "cm", "\n", "This", " is"], calls))
+        self.addAsyncCleanup(client.aclose)
+
+        result = await client.chat([{"role": "user", "content": "I'm 180"}], call_type="extraction")
+
+        self.assertTrue(calls[0]["stream"])
+        self.assertEqual(result["message"]["content"], "180cm")
+        self.assertEqual(result["done_reason"], "early_stop")
+        self.assertEqual(client.generation.stats()["extraction"]["early_stops"], 1)
+
+    async def test_json_answer_stops_when_object_closes(self):
+        """Test that a structured answer is cut once its JSON object is complete."""
+        client = OllamaClient(host="http://ollama.test", transport=create_stream_transport(['{"name":', ' "Sam"}', " extra"]))
+        self.addAsyncCleanup(client.aclose)
+
+        result = await client.chat([{"role": "user", "content": "I'm Sam"}], format="json", call_type="extraction")
+
+        self.assertEqual(json.loads(result["message"]["content"]), {"name": "Sam"})
+
+    async def test_other_call_types_are_not_streamed(self):
+        """Test that generation calls are sent without streaming."""
+        calls = []
+        client = OllamaClient(host="http://ollama.test", transport=create_stream_transport(["Hi"], calls))
+        self.addAsyncCleanup(client.aclose)
+
+        await client.chat([{"role": "user", "content": "hello"}], call_type="generation")
+
+        self.assertFalse(calls[0]["stream"])
+
+
+if __name__ == "__main__":
+    unittest.main()
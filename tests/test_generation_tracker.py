@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+
+from generation_tracker import GenerationTracker, StaleGenerationError
+from ollama_client import OllamaClient
+from ollama_stub import LatencyProfile, OllamaStub
+
+
+class TestGenerationTracker(unittest.IsolatedAsyncioTestCase):
+    """Test cases for cancelling generations made stale by a newer message."""
+
+    async def test_newer_message_cancels_generation(self):
+        """Test that a generation for a newer message cancels the older one."""
+        tracker = GenerationTracker()
+        first = asyncio.ensure_future(tracker.run("user_1", "m1", lambda: asyncio.sleep(10, "old")))
+        await asyncio.sleep(0.01)
+
+        result = await tracker.run("user_1", "m2", lambda: asyncio.sleep(0, "new"))
+
+        self.assertEqual(result, "new")
+        with self.assertRaises(StaleGenerationError):
+            await first
+        self.assertEqual(tracker.stats()["cancelled"], 1)
+        self.assertEqual(tracker.stats()["in_flight"], 0)
+
+    async def test_same_message_and_other_senders_are_kept(self):
+        """Test that generations for the same message or other senders are not cancelled."""
+        tracker = GenerationTracker()
+        first = asyncio.ensure_future(tracker.run("user_1", "m1", lambda: asyncio.sleep(0.05, "a")))
+        other = asyncio.ensure_future(tracker.run("user_2", "m9", lambda: asyncio.sleep(0.05, "b")))
+        await asyncio.sleep(0.01)
+
+        tracker.notify("user_1", "m1")
+
+        self.assertEqual(await first, "a")
+        self.assertEqual(await other, "b")
+        self.assertEqual(tracker.stats()["cancelled"], 0)
+
+    async def test_saved_time_is_estimated_from_completed_generations(self):
+        """Test that the time saved is the average duration less the time spent."""
+        tracker = GenerationTracker()
+        await tracker.run("user_1", "m1", lambda: asyncio.sleep(0.2))
+        pending = asyncio.ensure_future(tracker.run("user_1", "m2", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.05)
+
+        tracker.notify("user_1", "m3")
+
+        with self.assertRaises(StaleGenerationError):
+            await pending
+        self.assertGreater(tracker.stats()["seconds_saved"], 0.1)
+        self.assertLess(tracker.stats()["seconds_spent"], 0.2)
+
+    async def test_disabled_tracker_does_not_cancel(self):
+        """Test that nothing is cancelled when cancellation is disabled."""
+        tracker = GenerationTracker(enabled=False)
+        first = asyncio.ensure_future(tracker.run("user_1", "m1", lambda: asyncio.sleep(0.05, "old")))
+        await asyncio.sleep(0.01)
+
+        tracker.notify("user_1", "m2")
+
+        self.assertEqual(await first, "old")
+
+    async def test_cancel_frees_the_backend(self):
+        """Test that cancelling a stale generation closes its Ollama request."""
+        stub = OllamaStub(latency=LatencyProfile(mean=5.0), seed=0)
+        port = await stub.start("127.0.0.1", 0)
+        client = OllamaClient(host=f"http://127.0.0.1:{port}")
+        self.addAsyncCleanup(stub.close)
+        self.addAsyncCleanup(client.aclose)
+        tracker = GenerationTracker()
+
+        pending = asyncio.ensure_future(tracker.run("user_1", "m1", lambda: client.chat([{"role": "user", "content": "hi"}])))
+        await asyncio.sleep(0.1)
+        self.assertEqual(client.scheduler.stats()["active"], 1)
+
+        tracker.notify("user_1", "m2")
+        with self.assertRaises(StaleGenerationError):
+            await pending
+        await asyncio.sleep(0.05)
+        self.assertEqual(client.scheduler.stats()["active"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from llm_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for the LRU+TTL ResponseCache."""
+
+    def test_key_normalizes_input(self):
+        """Test that case and whitespace differences share a cache key."""
+        key_a = ResponseCache.make_key("phi4", "Age: {message}", "  I'm 25 ", 0.0)
+        key_b = ResponseCache.make_key("phi4", "Age: {message}", "i'm   25", 0.0)
+        key_c = ResponseCache.make_key("phi4", "Age: {message}", "i'm 25", 0.7)
+
+        self.assertEqual(key_a, key_b)
+        self.assertNotEqual(key_a, key_c)
+
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted as hits or misses."""
+        cache = ResponseCache(max_size=10, ttl=60, path=None)
+
+        self.assertIsNone(cache.get("k"))
+        cache.set("k", "25")
+        self.assertEqual(cache.get("k"), "25")
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = ResponseCache(max_size=2, ttl=60, path=None)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after the TTL."""
+        cache = ResponseCache(max_size=10, ttl=5, path=None)
+        with patch("llm_cache.time.time", return_value=1000.0):
+            cache.set("k", "male")
+        with patch("llm_cache.time.time", return_value=1006.0):
+            self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_persistence_survives_restart(self):
+        """Test that saved entries are loaded by a new cache instance."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "llm_cache.json")
+            cache = ResponseCache(max_size=10, ttl=60, path=path, persist_interval=0)
+            cache.set("k", "5'10\"")
+
+            restarted = ResponseCache(max_size=10, ttl=60, path=path)
+            self.assertEqual(restarted.get("k"), "5'10\"")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import tempfile
+import unittest
+
+import httpx
+
+from llm_cassette import CassetteMissError, CassetteTransport, request_key
+from ollama_client import OllamaClient
+from ollama_stub import LatencyProfile, OllamaStub
+
+
+class TestCassetteTransport(unittest.IsolatedAsyncioTestCase):
+    """Test cases for recording and replaying LLM calls."""
+
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "cassette.json")
+        self.stub = OllamaStub(latency=LatencyProfile(), seed=0)
+        port = await self.stub.start("127.0.0.1", 0)
+        self.host = f"http://127.0.0.1:{port}"
+
+    async def asyncTearDown(self):
+        await self.stub.close()
+        self.tmp_dir.cleanup()
+
+    async def test_record_then_replay_without_server(self):
+        """Test that recorded calls replay identically once the server is gone."""
+        messages = [{"role": "user", "content": "My name is Alex"}]
+        recorder = OllamaClient(host=self.host, transport=CassetteTransport(self.path, mode="record"))
+        recorded = await recorder.chat(messages, call_type="extraction")
+        streamed = [c async for c in recorder.chat_stream(messages)]
+        await recorder.aclose()
+        await self.stub.close()
+
+        transport = CassetteTransport(self.path, mode="replay")
+        player = OllamaClient(host=self.host, transport=transport)
+        replayed = await player.chat(messages, call_type="extraction")
+        restreamed = [c async for c in player.chat_stream(messages)]
+        await player.aclose()
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(restreamed, streamed)
+        self.assertEqual(transport.stats()["replayed"], 2)
+
+    async def test_replay_miss_raises(self):
+        """Test that an unrecorded request fails instead of reaching the network."""
+        client = OllamaClient(host=self.host, transport=CassetteTransport(self.path, mode="replay"))
+
+        with self.assertRaises(CassetteMissError):
+            await client.chat([{"role": "user", "content": "hello"}])
+        await client.aclose()
+        self.assertEqual(self.stub.stats()["requests"], 0)
+
+    async def test_auto_mode_records_only_misses(self):
+        """Test that auto mode replays what it has and records the rest."""
+        transport = CassetteTransport(self.path, mode="auto")
+        client = OllamaClient(host=self.host, transport=transport)
+
+        await client.chat([{"role": "user", "content": "hello"}])
+        await client.aclose()
+        self.assertEqual(transport.stats()["recorded"], 1)
+
+        again = CassetteTransport(self.path, mode="auto")
+        client = OllamaClient(host=self.host, transport=again)
+        await client.chat([{"role": "user", "content": "hello"}])
+        await client.chat([{"role": "user", "content": "goodbye"}])
+        await client.aclose()
+        self.assertEqual(again.stats()["replayed"], 1)
+        self.assertEqual(again.stats()["recorded"], 1)
+        self.assertEqual(self.stub.stats()["requests"], 2)
+
+    async def test_replay_with_recorded_timing(self):
+        """Test that timing replay waits for the recorded chunk offsets."""
+        body = {"model": "phi4", "messages": [], "stream": False, "options": {}}
+        with open(self.path, "w") as f:
+            json.dump({"version": 1, "interactions": [{
+                "request": {"method": "POST", "path": "/api/chat", "body": body},
+                "response": {"status": 200, "headers": {}, "chunks": [
+                    {"offset": 0.1, "data": json.dumps({"message": {"content": "hi"}, "done": True})}
+                ]}
+            }]}, f)
+
+        async with httpx.AsyncClient(transport=CassetteTransport(self.path, mode="replay", timing=True)) as http:
+            start = time.monotonic()
+            response = await http.post(f"{self.host}/api/chat", json=body)
+            self.assertEqual(response.json()["message"]["content"], "hi")
+            self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_keep_alive_is_not_matched(self):
+        """Test that keep_alive does not change the match key."""
+        body = {"model": "phi4", "messages": []}
+        self.assertEqual(
+            request_key("POST", "/api/chat", body),
+            request_key("POST", "/api/chat", dict(body, keep_alive="5m"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import time
+import asyncio
+import unittest
+
+from llm_scheduler import LLM_SENDER_TURN_BUDGET, MAX_TURN_TOKENS, PriorityScheduler, SenderBudget, QuotaExceededError
+
+
+class TestPriorityScheduler(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the PriorityScheduler."""
+
+    async def test_concurrency_limit(self):
+        """Test that no more than max_concurrency calls run at once."""
+        scheduler = PriorityScheduler(max_concurrency=2)
+        running = []
+        peak = []
+
+        async def call():
+            async with scheduler.slot("generation"):
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(0.02)
+                running.pop()
+
+        await asyncio.gather(*[call() for _ in range(5)])
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(scheduler.stats()["active"], 0)
+
+    async def test_extraction_jumps_the_queue(self):
+        """Test that queued extraction calls are admitted before queued generation calls."""
+        scheduler = PriorityScheduler(max_concurrency=1)
+        order = []
+
+        async def call(call_type, name):
+            async with scheduler.slot(call_type):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        blocker = asyncio.ensure_future(call("generation", "running"))
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.ensure_future(call("generation", "generation")),
+            asyncio.ensure_future(call("intent", "intent")),
+            asyncio.ensure_future(call("extraction", "extraction"))
+        ]
+        await asyncio.gather(blocker, *queued)
+
+        self.assertEqual(order, ["running", "extraction", "intent", "generation"])
+        stats = scheduler.stats()["classes"]
+        self.assertEqual(stats["generation"]["max_queue_depth"], 1)
+        self.assertGreater(stats["generation"]["max_wait"], stats["extraction"]["max_wait"])
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test that a cancelled queued call does not hold a slot."""
+        scheduler = PriorityScheduler(max_concurrency=1)
+        await scheduler.acquire("generation")
+
+        waiter = asyncio.ensure_future(scheduler.acquire("extraction"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        scheduler.release()
+
+        self.assertEqual(scheduler.stats()["active"], 0)
+        self.assertEqual(scheduler.stats()["queue_depth"], 0)
+
+    async def test_senders_share_capacity_fairly(self):
+        """Test that a sender with a backlog does not starve another sender."""
+        scheduler = PriorityScheduler(max_concurrency=1)
+        order = []
+
+        async def call(sender_id):
+            async with scheduler.slot("generation", sender_id):
+                order.append(sender_id)
+                await asyncio.sleep(0.01)
+
+        busy = [asyncio.ensure_future(call("busy")) for _ in range(4)]
+        await asyncio.sleep(0)
+        quiet = asyncio.ensure_future(call("quiet"))
+        await asyncio.gather(*busy, quiet)
+
+        self.assertLess(order.index("quiet"), 3)
+
+
+class TestSenderBudget(unittest.TestCase):
+    """Test cases for the SenderBudget."""
+
+    def test_request_budget(self):
+        """Test that a sender is refused once their request budget is used."""
+        budget = SenderBudget(token_budget=0, request_budget=2, window=60)
+        for _ in range(2):
+            budget.check("user1", "generation")
+            budget.charge("user1", 10)
+
+        with self.assertRaises(QuotaExceededError):
+            budget.check("user1", "generation")
+        budget.check("user2", "generation")
+        budget.check("user1", "extraction")
+        self.assertEqual(budget.stats()["rejected"], 1)
+
+    def test_token_budget_window(self):
+        """Test that usage older than the window no longer counts."""
+        budget = SenderBudget(token_budget=100, request_budget=0, window=0.01)
+        budget.charge("user1", 150)
+        with self.assertRaises(QuotaExceededError):
+            budget.check("user1", "generation")
+
+        time.sleep(0.02)
+        budget.check("user1", "generation")
+        self.assertEqual(budget.usage("user1"), {"requests": 0, "tokens": 0})
+
+    def test_default_budget_fits_long_conversations(self):
+        """Test that the defaults allow LLM_SENDER_TURN_BUDGET full generation turns with intent calls."""
+        budget = SenderBudget()
+        for _ in range(LLM_SENDER_TURN_BUDGET):
+            for call_type in ["intent", "generation"]:
+                budget.check("user1", call_type)
+            budget.charge("user1", MAX_TURN_TOKENS)
+        self.assertEqual(budget.stats()["rejected"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import json
+import tempfile
+import unittest
+
+from model_benchmark import ModelBenchmark, load_user_messages, percentile
+from ollama_client import OllamaClient
+from ollama_stub import LatencyProfile, OllamaStub
+
+
+class TestModelBenchmark(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the model benchmark."""
+
+    async def asyncSetUp(self):
+        self.stub = OllamaStub(latency=LatencyProfile(), seed=0)
+        port = await self.stub.start("127.0.0.1", 0)
+        self.client = OllamaClient(host=f"http://127.0.0.1:{port}")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await self.stub.close()
+
+    async def test_report_per_model(self):
+        """Test that every model is run on every message and compared with the reference."""
+        messages = ["Hi, I'm Sam", "I'm 28", "I'm 5'10\""]
+        report = await ModelBenchmark(self.client, ["phi4", "phi3:mini"]).run(messages)
+
+        self.assertEqual(set(report), {"phi4", "phi3:mini"})
+        self.assertEqual(report["phi3:mini"]["calls"], 3)
+        self.assertEqual(report["phi3:mini"]["failures"], 0)
+        self.assertEqual(report["phi3:mini"]["agreement"], 1.0)
+        self.assertEqual(self.stub.stats()["requests"], 6)
+
+    def test_load_user_messages_reads_both_log_formats(self):
+        """Test that user messages are read from both log formats, skipping the bot."""
+        with tempfile.TemporaryDirectory() as log_dir:
+            with open(os.path.join(log_dir, "conversation_a.json"), "w") as f:
+                json.dump([
+                    {"sender": "user", "content": "I'm Sam"},
+                    {"sender": "bot", "content": "Nice to meet you"}
+                ], f)
+            with open(os.path.join(log_dir, "user_1.json"), "w") as f:
+                json.dump({"messages": [
+                    {"sender": "user_1", "text": "19"},
+                    {"sender": "bot", "text": "How old are you?"},
+                    {"sender": "user_1", "text": "I'm Sam"}
+                ]}, f)
+
+            self.assertEqual(load_user_messages(log_dir), ["I'm Sam", "19"])
+            self.assertEqual(load_user_messages(log_dir, limit=1), ["I'm Sam"])
+
+    def test_percentile(self):
+        """Test the nearest-rank percentile."""
+        self.assertEqual(percentile([], 0.5), 0.0)
+        self.assertEqual(percentile([3.0, 1.0, 2.0, 4.0], 0.5), 3.0)
+        self.assertEqual(percentile([1.0, 2.0], 0.95), 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from model_warmup import ModelWarmup, model_matches
+from ollama_client import OllamaClient
+from ollama_stub import LatencyProfile, OllamaStub
+
+
+class TestModelWarmup(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the ModelWarmup against the stub server."""
+
+    async def asyncSetUp(self):
+        self.stub = OllamaStub(latency=LatencyProfile(), load_time=0.2, seed=0)
+        port = await self.stub.start("127.0.0.1", 0)
+        self.client = OllamaClient(host=f"http://127.0.0.1:{port}")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await self.stub.close()
+
+    async def test_warm_up_loads_model_and_each_call_type(self):
+        """Test that the load cost is paid by warm-up and not by later calls."""
+        report = await ModelWarmup(self.client, ["extraction", "generation"], wait=1.0).run()
+
+        self.assertTrue(report["ready"])
+        self.assertGreaterEqual(report["load_seconds"], 0.2)
+        self.assertEqual(set(report["call_types"]), {"extraction", "generation"})
+        self.assertTrue(self.stub.loaded)
+
+        result = await self.client.chat([{"role": "user", "content": "hello"}])
+        self.assertEqual(result["load_duration"], 0)
+        self.assertEqual(self.client.prompt_eval.stats()["generation"]["cold_loads"], 0)
+
+    async def test_missing_model_is_not_ready(self):
+        """Test that warm-up reports not ready when the model is not installed."""
+        client = OllamaClient(host=self.client.host, model="llama3")
+        report = await ModelWarmup(client, ["generation"], wait=1.0).run()
+        await client.aclose()
+
+        self.assertFalse(report["ready"])
+        self.assertEqual(report["error"], "model not installed")
+
+    async def test_unreachable_server_is_not_ready(self):
+        """Test that warm-up gives up after the wait time."""
+        await self.stub.close()
+        report = await ModelWarmup(self.client, ["generation"], wait=0.0).run()
+
+        self.assertFalse(report["ready"])
+        self.assertEqual(report["error"], "unreachable")
+
+    async def test_every_backend_is_warmed_up(self):
+        """Test that each backend loads the model when there are several."""
+        other = OllamaStub(latency=LatencyProfile(), load_time=0.2, seed=0)
+        port = await other.start("127.0.0.1", 0)
+        self.addAsyncCleanup(other.close)
+        client = OllamaClient(hosts=[self.client.host, f"http://127.0.0.1:{port}"])
+        self.addAsyncCleanup(client.aclose)
+
+        report = await ModelWarmup(client, ["generation"], wait=1.0).run()
+
+        self.assertTrue(report["ready"])
+        self.assertEqual(len(report["backends"]), 2)
+        self.assertTrue(self.stub.loaded and other.loaded)
+
+    async def test_routed_models_are_loaded(self):
+        """Test that every model a warmed-up call type is routed to is loaded."""
+        stub = OllamaStub(latency=LatencyProfile(), seed=0, models=["phi4:latest", "phi3:mini"])
+        port = await stub.start("127.0.0.1", 0)
+        self.addAsyncCleanup(stub.close)
+        client = OllamaClient(host=f"http://127.0.0.1:{port}", model_routes={"extraction": "phi3:mini"})
+        self.addAsyncCleanup(client.aclose)
+
+        report = await ModelWarmup(client, ["extraction", "generation"], wait=1.0).run()
+
+        self.assertTrue(report["ready"])
+        self.assertEqual(list(report["models"]), ["phi4", "phi3:mini"])
+
+    async def test_missing_routed_model_is_not_ready(self):
+        """Test that warm-up reports not ready when a routed model is not installed."""
+        client = OllamaClient(host=self.client.host, model_routes={"intent": "phi3:mini"})
+        report = await ModelWarmup(client, ["intent"], wait=1.0).run()
+        await client.aclose()
+
+        self.assertFalse(report["ready"])
+        self.assertEqual(report["error"], "model not installed")
+
+    def test_model_matches_default_tag(self):
+        """Test that an untagged model name matches its latest tag."""
+        self.assertTrue(model_matches("phi4:latest", "phi4"))
+        self.assertFalse(model_matches("phi4:14b", "phi4"))
+
+
+if __name__ == "__main__":
+    unittest.main()
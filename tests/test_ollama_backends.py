@@ -0,0 +1,100 @@
+import time
+import asyncio
+import unittest
+
+import httpx
+
+from ollama_client import OllamaClient
+from ollama_stub import LatencyProfile, OllamaStub
+
+
+class TestBackendBalancing(unittest.IsolatedAsyncioTestCase):
+    """Test cases for balancing Ollama calls across several backends."""
+
+    async def asyncSetUp(self):
+        self.stubs = []
+        for _ in range(2):
+            stub = OllamaStub(latency=LatencyProfile("fixed", 0.1), max_parallel=1, seed=0)
+            await stub.start("127.0.0.1", 0)
+            self.stubs.append(stub)
+        self.hosts = [f"http://127.0.0.1:{stub.port}" for stub in self.stubs]
+
+    async def asyncTearDown(self):
+        for stub in self.stubs:
+            await stub.close()
+
+    async def test_least_outstanding_spreads_load(self):
+        """Test that concurrent calls are split across backends and finish in parallel."""
+        client = OllamaClient(hosts=self.hosts)
+        self.addAsyncCleanup(client.aclose)
+
+        start = time.monotonic()
+        await asyncio.gather(*(
+            client.chat([{"role": "user", "content": f"my name is user{i}"}], call_type="extraction")
+            for i in range(4)
+        ))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual([stub.stats()["requests"] for stub in self.stubs], [2, 2])
+        self.assertLess(elapsed, 0.35)
+        backends = client.backends.stats()["backends"]
+        self.assertTrue(all(b["outstanding"] == 0 for b in backends.values()))
+
+    async def test_failing_backend_is_ejected(self):
+        """Test that a backend that stops answering is taken out of rotation."""
+        await self.stubs[0].close()
+        client = OllamaClient(hosts=self.hosts)
+        client.backends.max_failures = 1
+        self.addAsyncCleanup(client.aclose)
+
+        with self.assertRaises(httpx.ConnectError):
+            await client.chat([{"role": "user", "content": "hello"}])
+        await client.chat([{"role": "user", "content": "hello again"}])
+
+        stats = client.backends.stats()["backends"]
+        self.assertFalse(stats[self.hosts[0]]["healthy"])
+        self.assertEqual(stats[self.hosts[0]]["ejections"], 1)
+        self.assertEqual(stats[self.hosts[1]]["requests"], 1)
+
+    async def test_health_check_restores_backend(self):
+        """Test that a passing health check puts an ejected backend back."""
+        client = OllamaClient(hosts=self.hosts)
+        self.addAsyncCleanup(client.aclose)
+        backend = client.backends.backends[1]
+        client.backends.eject(backend)
+
+        await client._transport.check_health()
+
+        self.assertTrue(client.backends.stats()["backends"][self.hosts[1]]["healthy"])
+
+    async def test_streamed_reply_releases_backend(self):
+        """Test that a streamed call stays outstanding until its stream is closed."""
+        client = OllamaClient(hosts=self.hosts)
+        self.addAsyncCleanup(client.aclose)
+
+        chunks = [c async for c in client.chat_stream([{"role": "user", "content": "hi"}])]
+
+        self.assertTrue(chunks)
+        backends = client.backends.stats()["backends"]
+        self.assertEqual(sum(b["outstanding"] for b in backends.values()), 0)
+        self.assertEqual(sum(b["requests"] for b in backends.values()), 1)
+
+    async def test_cancelled_call_releases_backend(self):
+        """Test that a call cancelled while waiting for its backend does not stay outstanding."""
+        client = OllamaClient(hosts=self.hosts)
+        self.addAsyncCleanup(client.aclose)
+
+        task = asyncio.ensure_future(client.chat([{"role": "user", "content": "hello"}]))
+        await asyncio.sleep(0.03)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.01)
+
+        backends = client.backends.stats()["backends"]
+        self.assertEqual(sum(b["outstanding"] for b in backends.values()), 0)
+        self.assertEqual(sum(b["failures"] for b in backends.values()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import json
+import asyncio
+import unittest
+
+import httpx
+
+from ollama_client import OllamaClient, parse_model_routes
+
+
+def create_mock_transport(reply="Hello", delay=0.0, calls=None):
+    """Helper function to create a fake Ollama /api/chat transport."""
+    calls = calls if calls is not None else []
+
+    async def handler(request):
+        calls.append(json.loads(request.content))
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": reply}, "done": True})
+
+    return httpx.MockTransport(handler)
+
+
+class TestOllamaClient(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the shared OllamaClient."""
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_chat_returns_response(self):
+        """Test that a chat request posts the payload and decodes the reply."""
+        calls = []
+        self.client = OllamaClient(host="http://ollama.test", model="phi4", transport=create_mock_transport("Sam", calls=calls))
+
+        result = await self.client.chat([{"role": "user", "content": "hi"}], options={"temperature": 0.1})
+
+        self.assertEqual(result["message"]["content"], "Sam")
+        self.assertEqual(calls[0]["model"], "phi4")
+        self.assertFalse(calls[0]["stream"])
+        self.assertEqual(calls[0]["options"], {"temperature": 0.1, "num_predict": 300})
+
+    async def test_call_types_are_routed_to_their_models(self):
+        """Test that a routed call type uses its model and others use the default."""
+        calls = []
+        self.client = OllamaClient(host="http://ollama.test", model="phi4", model_routes={"extraction": "phi3:mini"},
+                                   transport=create_mock_transport(calls=calls))
+
+        await self.client.chat([{"role": "user", "content": "I'm Sam"}], call_type="extraction")
+        await self.client.chat([{"role": "user", "content": "hi"}], call_type="generation")
+        await self.client.chat([{"role": "user", "content": "hi"}], model="llama3", call_type="extraction")
+
+        self.assertEqual([call["model"] for call in calls], ["phi3:mini", "phi4", "llama3"])
+
+    def test_parse_model_routes(self):
+        """Test that the routing table skips malformed entries."""
+        self.client = OllamaClient(host="http://ollama.test")
+        self.assertEqual(
+            parse_model_routes("extraction=phi3:mini, intent = phi3:mini,bad,=x"),
+            {"extraction": "phi3:mini", "intent": "phi3:mini"}
+        )
+
+    async def test_keep_alive_and_prompt_eval_metrics(self):
+        """Test that keep_alive is sent and prompt evaluation figures are recorded."""
+        calls = []
+
+        async def handler(request):
+            calls.append(json.loads(request.content))
+            return httpx.Response(200, json={"message": {"role": "assistant", "content": "hi"}, "done": True,
+                                             "prompt_eval_count": 12, "prompt_eval_duration": 250000000})
+
+        self.client = OllamaClient(host="http://ollama.test", keep_alive="30m", transport=httpx.MockTransport(handler))
+
+        await self.client.chat([{"role": "user", "content": "hi"}], call_type="generation")
+
+        self.assertEqual(calls[0]["keep_alive"], "30m")
+        stats = self.client.prompt_eval.stats()["generation"]
+        self.assertEqual(stats["average_prompt_tokens"], 12)
+        self.assertAlmostEqual(stats["average_prompt_eval_seconds"], 0.25)
+
+    async def test_client_is_reused(self):
+        """Test that the pooled HTTP client is reused across requests."""
+        self.client = OllamaClient(host="http://ollama.test", transport=create_mock_transport())
+
+        await self.client.chat([{"role": "user", "content": "one"}])
+        first = self.client._client
+        await self.client.chat([{"role": "user", "content": "two"}])
+
+        self.assertIs(self.client._client, first)
+
+    async def test_concurrent_requests_overlap(self):
+        """Test that concurrent requests wait in parallel instead of in sequence."""
+        self.client = OllamaClient(host="http://ollama.test", transport=create_mock_transport(delay=0.2))
+        loop = asyncio.get_running_loop()
+
+        start = loop.time()
+        await asyncio.gather(*[self.client.chat([{"role": "user", "content": str(i)}]) for i in range(5)])
+
+        self.assertLess(loop.time() - start, 0.6)
+
+    async def test_identical_requests_are_coalesced(self):
+        """Test that concurrent identical requests share one upstream call."""
+        calls = []
+        self.client = OllamaClient(host="http://ollama.test", transport=create_mock_transport("25", delay=0.1, calls=calls))
+        messages = [{"role": "user", "content": "I'm 25"}]
+
+        results = await asyncio.gather(*[self.client.chat(messages, options={"temperature": 0.0}) for _ in range(4)])
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r["message"]["content"] == "25" for r in results))
+        self.assertEqual(self.client.single_flight.stats()["coalesced"], 3)
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that cancelling one waiter leaves the shared request running."""
+        self.client = OllamaClient(host="http://ollama.test", transport=create_mock_transport("male", delay=0.1))
+        messages = [{"role": "user", "content": "I'm a guy"}]
+
+        first = asyncio.ensure_future(self.client.chat(messages))
+        second = asyncio.ensure_future(self.client.chat(messages))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        result = await second
+        self.assertEqual(result["message"]["content"], "male")
+
+
+if __name__ == "__main__":
+    unittest.main()
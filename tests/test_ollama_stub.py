@@ -0,0 +1,125 @@
+import json
+import asyncio
+import random
+import unittest
+
+import httpx
+
+from ollama_client import OllamaClient
+from ollama_stub import LatencyProfile, OllamaStub, apply_limits, canned_profile, canned_reply, tokenize
+from profile_extractor import PROFILE_SCHEMA, validate_profile
+
+
+class TestCannedReplies(unittest.TestCase):
+    """Test cases for the stub's canned answers."""
+
+    def test_profile_extraction(self):
+        """Test that a profile object passes the extractor's validation."""
+        profile = validate_profile(canned_profile("Hi, I'm Sam, 28, a woman looking for men 25 to 35"))
+        self.assertEqual(profile["name"], "Sam")
+        self.assertEqual(profile["gender"], "female")
+        self.assertEqual(profile["gender_preference"], ["men"])
+        self.assertEqual(profile["age_preference"], "25-35")
+
+    def test_batched_extraction(self):
+        """Test that a batched extraction prompt gets one answer per task."""
+        payload = {
+            "format": "json",
+            "messages": [
+                {"role": "system", "content": "You complete several independent extraction tasks at once."},
+                {"role": "user", "content": (
+                    "Task 1\nInstructions: Extract the height.\nExtract height from this message: '180'\n\n"
+                    "Task 2\nInstructions: Extract the height.\nExtract height from this message: '5 ft 9'\n\n"
+                    "Return a JSON object with keys \"1\" to \"2\"."
+                )}
+            ]
+        }
+        self.assertEqual(json.loads(canned_reply(payload, random.Random(0))), {"1": "180cm", "2": "5'9\""})
+
+    def test_batched_extraction_with_a_schema_task(self):
+        """Test that a task given an object schema in a batch is answered with an object."""
+        payload = {
+            "format": {"type": "object", "properties": {"1": PROFILE_SCHEMA, "2": {"type": "string"}}},
+            "messages": [
+                {"role": "system", "content": "You complete several independent extraction tasks at once."},
+                {"role": "user", "content": (
+                    "Task 1\nInstructions: Extract profile details.\nMessage: \"I'm Sam\"\n\n"
+                    "Task 2\nInstructions: Extract the height.\nExtract height from this message: '180'\n\n"
+                    "Return a JSON object with keys \"1\" to \"2\"."
+                )}
+            ]
+        }
+        answers = json.loads(canned_reply(payload, random.Random(0)))
+        self.assertEqual(answers["1"]["name"], "Sam")
+        self.assertEqual(answers["2"], "180cm")
+
+    def test_generation_limits(self):
+        """Test that replies are cut at a stop sequence and at num_predict tokens."""
+        tokens = tokenize("180cm\nThat is about 5'11\"")
+        self.assertEqual(apply_limits(tokens, {"stop": ["\n"]}), (["180cm"], "stop"))
+        self.assertEqual(apply_limits(tokens, {"num_predict": 2}), (tokens[:2], "length"))
+
+    def test_latency_is_never_negative(self):
+        """Test that sampled latencies stay non-negative."""
+        rng = random.Random(1)
+        profile = LatencyProfile("normal", 0.01, 1.0)
+        self.assertTrue(all(profile.first_token(rng) >= 0 for _ in range(100)))
+
+
+class TestOllamaStub(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the stub server with the real Ollama client."""
+
+    async def start_stub(self, **kwargs):
+        stub = OllamaStub(latency=kwargs.pop("latency", LatencyProfile()), seed=0, **kwargs)
+        port = await stub.start("127.0.0.1", 0)
+        client = OllamaClient(host=f"http://127.0.0.1:{port}")
+        self.addAsyncCleanup(stub.close)
+        self.addAsyncCleanup(client.aclose)
+        return stub, client
+
+    async def test_structured_chat(self):
+        """Test a non-streaming structured extraction call."""
+        stub, client = await self.start_stub()
+
+        result = await client.chat([{"role": "user", "content": "My name is Alex"}], format=PROFILE_SCHEMA, call_type="extraction")
+
+        self.assertEqual(json.loads(result["message"]["content"])["name"], "Alex")
+        self.assertGreater(result["eval_count"], 0)
+        self.assertEqual(stub.stats()["requests"], 1)
+
+    async def test_streaming_chat(self):
+        """Test that a streamed reply arrives in several chunks."""
+        stub, client = await self.start_stub()
+
+        chunks = [c async for c in client.chat_stream([{"role": "user", "content": "I like hiking"}])]
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue("".join(chunks).strip())
+        self.assertEqual(stub.stats()["streamed"], 1)
+
+    async def test_injected_errors(self):
+        """Test that the error rate produces 500 responses."""
+        stub, client = await self.start_stub(error_rate=1.0)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await client.chat([{"role": "user", "content": "hello"}])
+        self.assertEqual(stub.stats()["errors"], 1)
+
+    async def test_queue_limit_rejects_requests(self):
+        """Test that requests beyond the parallel and queue limits get a 503."""
+        stub, _ = await self.start_stub(latency=LatencyProfile("fixed", 0.2), max_parallel=1, max_queue=0)
+        url = f"http://127.0.0.1:{stub.port}/api/chat"
+        body = {"messages": [{"role": "user", "content": "hello"}], "stream": False}
+
+        async with httpx.AsyncClient() as http:
+            first = asyncio.ensure_future(http.post(url, json=body))
+            await asyncio.sleep(0.05)
+            second = await http.post(url, json=body)
+            self.assertEqual((await first).status_code, 200)
+
+        self.assertEqual(second.status_code, 503)
+        self.assertEqual(stub.stats()["rejected"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
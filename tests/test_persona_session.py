@@ -0,0 +1,58 @@
+import unittest
+
+from persona_session import PersonaSessionStore
+
+
+class TestPersonaSessionStore(unittest.TestCase):
+    """Test cases for the PersonaSessionStore."""
+
+    def test_session_continues_with_turn_prompt(self):
+        """Test that later turns reuse earlier messages and send only the new turn."""
+        store = PersonaSessionStore(max_sessions=10, ttl=60, max_turns=5)
+
+        first = store.build_messages("user1", "persona", "full context", "turn 1")
+        self.assertEqual([m["content"] for m in first], ["persona", "full context"])
+        store.record_reply("user1", "persona", first, "reply 1")
+
+        second = store.build_messages("user1", "persona", "full context 2", "turn 2")
+        self.assertEqual([m["content"] for m in second], ["persona", "full context", "reply 1", "turn 2"])
+        self.assertEqual(store.stats()["reused"], 1)
+
+    def test_session_restarts_on_persona_change_and_turn_limit(self):
+        """Test that a new persona or the turn limit starts a fresh session."""
+        store = PersonaSessionStore(max_sessions=10, ttl=60, max_turns=1)
+
+        messages = store.build_messages("user1", "persona", "full", "turn")
+        store.record_reply("user1", "persona", messages, "reply")
+
+        restarted = store.build_messages("user1", "persona", "full again", "turn")
+        self.assertEqual(len(restarted), 2)
+
+        store.record_reply("user1", "persona", restarted, "reply")
+        other = store.build_messages("user1", "other persona", "full", "turn")
+        self.assertEqual(other[0]["content"], "other persona")
+
+    def test_least_recently_used_sessions_are_dropped(self):
+        """Test that the number of sessions is bounded."""
+        store = PersonaSessionStore(max_sessions=2, ttl=60, max_turns=5)
+        for sender_id in ["a", "b", "c"]:
+            messages = store.build_messages(sender_id, "persona", "full", "turn")
+            store.record_reply(sender_id, "persona", messages, "reply")
+
+        self.assertEqual(store.stats()["sessions"], 2)
+        self.assertEqual(len(store.build_messages("a", "persona", "full", "turn")), 2)
+
+    def test_session_restarts_when_over_budget(self):
+        """Test that a session is restarted once continuing it would exceed the token budget."""
+        store = PersonaSessionStore(max_sessions=10, ttl=60, max_turns=5)
+
+        messages = store.build_messages("user1", "persona", "full", "turn", max_tokens=50)
+        store.record_reply("user1", "persona", messages, "x" * 200)
+
+        restarted = store.build_messages("user1", "persona", "full again", "turn", max_tokens=50)
+        self.assertEqual([m["content"] for m in restarted], ["persona", "full again"])
+        self.assertEqual(store.stats()["over_budget"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
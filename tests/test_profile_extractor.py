@@ -0,0 +1,120 @@
+import json
+import unittest
+from datetime import date
+
+import httpx
+
+from llm_cache import ResponseCache
+from ollama_client import OllamaClient
+from profile_extractor import ProfileExtractor, PROFILE_SCHEMA, validate_profile, estimate_dob
+
+
+def create_profile_transport(calls, profile):
+    """Helper function to create a fake Ollama that answers with a profile object."""
+
+    async def handler(request):
+        calls.append(json.loads(request.content))
+        content = json.dumps(profile)
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": content}, "done": True})
+
+    return httpx.MockTransport(handler)
+
+
+class TestValidateProfile(unittest.TestCase):
+    """Test cases for profile validation."""
+
+    def test_valid_fields_are_normalized(self):
+        """Test that valid fields are kept and normalized."""
+        profile = validate_profile({
+            "name": "sam",
+            "age": "28",
+            "gender": "Female",
+            "gender_preference": ["men", "women"],
+            "age_preference": "25 - 35",
+            "height": "5'6\""
+        })
+
+        self.assertEqual(profile, {
+            "name": "Sam",
+            "age": 28,
+            "gender": "female",
+            "gender_preference": ["men", "women"],
+            "age_preference": "25-35",
+            "height": "5'6\""
+        })
+
+    def test_invalid_fields_are_dropped(self):
+        """Test that nulls and out-of-range values are dropped individually."""
+        profile = validate_profile({
+            "name": None,
+            "age": 7,
+            "gender": "robot",
+            "gender_preference": ["everyone", "men"],
+            "age_preference": "young",
+            "height": "178cm"
+        })
+
+        self.assertEqual(profile, {"gender_preference": ["everyone"], "height": "178cm"})
+        self.assertEqual(validate_profile("not an object"), {})
+
+    def test_estimate_dob(self):
+        """Test that DOB is today's date minus the age."""
+        self.assertEqual(estimate_dob(30, today=date(2024, 5, 17)), "1994-05-17")
+        self.assertEqual(estimate_dob(1, today=date(2024, 2, 29)), "2023-02-28")
+
+
+class TestProfileExtractor(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the ProfileExtractor."""
+
+    async def asyncSetUp(self):
+        self.calls = []
+        transport = create_profile_transport(self.calls, {"name": "Sam", "age": 28, "gender": None,
+                                                          "gender_preference": None, "age_preference": None,
+                                                          "height": None})
+        self.client = OllamaClient(host="http://ollama.test", transport=transport)
+        self.extractor = ProfileExtractor(client=self.client, cache=ResponseCache(max_size=10, ttl=60))
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_one_call_returns_every_field(self):
+        """Test that a single schema-constrained call returns all fields found."""
+        profile = await self.extractor.extract("I'm Sam and I'm 28")
+
+        self.assertEqual(profile, {"name": "Sam", "age": 28})
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.calls[0]["format"], PROFILE_SCHEMA)
+
+    async def test_repeated_message_is_cached(self):
+        """Test that collectors reading the same message share one call."""
+        await self.extractor.extract("I'm Sam and I'm 28")
+        await self.extractor.extract("i'm sam and  I'm 28")
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.extractor.stats()["fields_found"]["name"], 2)
+
+    async def test_malformed_response_is_not_cached(self):
+        """Test that a response that is not JSON is retried instead of served from the cache."""
+        calls = []
+
+        async def handler(request):
+            calls.append(json.loads(request.content))
+            content = '{"name": "Sa' if len(calls) == 1 else json.dumps({"name": "Sam"})
+            return httpx.Response(200, json={"message": {"role": "assistant", "content": content}, "done": True})
+
+        client = OllamaClient(host="http://ollama.test", transport=httpx.MockTransport(handler))
+        extractor = ProfileExtractor(client=client, cache=ResponseCache(max_size=10, ttl=60))
+        try:
+            first = await extractor.extract("I'm Sam")
+            second = await extractor.extract("I'm Sam")
+        finally:
+            await client.aclose()
+
+        self.assertEqual(first, {})
+        self.assertEqual(second, {"name": "Sam"})
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(extractor.stats()["failures"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
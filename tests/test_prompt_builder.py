@@ -0,0 +1,85 @@
+import unittest
+
+from prompt_builder import (
+    PRIORITY_INSTRUCTION, PRIORITY_LATEST_MESSAGE, PRIORITY_PROFILE,
+    PRIORITY_RECENT_TURNS, PRIORITY_SUMMARY, PromptBuilder, PromptStats,
+    estimate_message_tokens, truncate_to_tokens
+)
+
+
+class TestPromptBuilder(unittest.TestCase):
+    """Test cases for the PromptBuilder."""
+
+    def test_sections_render_in_add_order_within_budget(self):
+        """Test that a prompt under budget keeps every section in the order added."""
+        prompt = (
+            PromptBuilder("generation", "persona", budget=500)
+            .add("profile", "Name: Sam", PRIORITY_PROFILE, header="USER PROFILE:\n")
+            .add("history", "USER: hi", PRIORITY_RECENT_TURNS, header="CONVERSATION HISTORY:\n")
+            .add("latest_message", "I like hiking", PRIORITY_LATEST_MESSAGE, header="LATEST MESSAGE: ")
+            .add("instruction", "Respond warmly.", PRIORITY_INSTRUCTION)
+        )
+
+        self.assertEqual(
+            prompt.build(),
+            "\nUSER PROFILE:\nName: Sam\n\nCONVERSATION HISTORY:\nUSER: hi\n\nLATEST MESSAGE: I like hiking\n\nRespond warmly.\n"
+        )
+        self.assertEqual(prompt.report["trimmed"], [])
+        self.assertEqual(prompt.report["dropped"], [])
+
+    def test_low_priority_sections_are_trimmed_first(self):
+        """Test that the summary is cut before the latest message or instruction."""
+        builder = (
+            PromptBuilder("generation", budget=120)
+            .add("summary", "old point " * 200, PRIORITY_SUMMARY, keep="tail")
+            .add("latest_message", "What should I say next?", PRIORITY_LATEST_MESSAGE)
+            .add("instruction", "Respond warmly.", PRIORITY_INSTRUCTION)
+        )
+        prompt = builder.build()
+
+        self.assertIn("What should I say next?", prompt)
+        self.assertIn("Respond warmly.", prompt)
+        self.assertEqual(builder.report["trimmed"], ["summary"])
+        self.assertLessEqual(builder.report["tokens"], 120)
+
+    def test_section_without_room_is_dropped(self):
+        """Test that a section is dropped when almost no budget is left."""
+        builder = (
+            PromptBuilder("fallback", "s" * 380, budget=100)
+            .add("history", "USER: hello there", PRIORITY_RECENT_TURNS)
+            .add("latest_message", "hi", PRIORITY_LATEST_MESSAGE)
+        )
+        prompt = builder.build()
+
+        self.assertEqual(prompt, "\nhi\n")
+        self.assertEqual(builder.report["dropped"], ["history"])
+
+    def test_truncate_keeps_tail(self):
+        """Test that tail truncation keeps the end of the text."""
+        text = " ".join(f"word{i}" for i in range(100))
+        cut = truncate_to_tokens(text, 10, keep="tail")
+
+        self.assertTrue(cut.startswith("..."))
+        self.assertTrue(cut.endswith("word99"))
+        self.assertLessEqual(len(cut), 40)
+
+    def test_stats_per_call_type(self):
+        """Test that prompt sizes are aggregated per call type."""
+        stats = PromptStats()
+        stats.record({"call_type": "generation", "tokens": 100, "trimmed": [], "dropped": []})
+        stats.record({"call_type": "generation", "tokens": 300, "trimmed": ["summary"], "dropped": []})
+
+        generation = stats.stats()["generation"]
+        self.assertEqual(generation["prompts"], 2)
+        self.assertEqual(generation["average_tokens"], 200)
+        self.assertEqual(generation["max_tokens"], 300)
+        self.assertEqual(generation["trimmed"], 1)
+
+    def test_estimate_message_tokens(self):
+        """Test that message token estimates add up across messages."""
+        messages = [{"role": "system", "content": "a" * 8}, {"role": "user", "content": "b" * 5}]
+        self.assertEqual(estimate_message_tokens(messages), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
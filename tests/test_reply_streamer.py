@@ -0,0 +1,106 @@
+import json
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+
+from generation_tracker import GenerationTracker
+from ollama_client import OllamaClient
+from reply_streamer import ReplyStreamer, session_token, split_sentences
+
+
+def create_stream_transport(tokens):
+    """Helper function to create a fake streaming Ollama /api/chat transport."""
+
+    def handler(request):
+        lines = [json.dumps({"message": {"role": "assistant", "content": t}, "done": False}) for t in tokens]
+        lines.append(json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}))
+        return httpx.Response(200, content="\n".join(lines).encode("utf-8"))
+
+    return httpx.MockTransport(handler)
+
+
+class TestSplitSentences(unittest.TestCase):
+    """Test cases for sentence chunking."""
+
+    def test_split_complete_sentences(self):
+        """Test that only complete sentences are split off."""
+        sentences, remainder = split_sentences("Hi there! I sense a story. Tell me")
+        self.assertEqual(sentences, ["Hi there! ", "I sense a story. "])
+        self.assertEqual(remainder, "Tell me")
+
+
+class TestSessionToken(unittest.TestCase):
+    """Test cases for subscription tokens."""
+
+    def test_only_the_sessions_token_is_accepted(self):
+        """Test that a token only subscribes to the session it was issued for."""
+        streamer = ReplyStreamer(secret="s3cret")
+        token = session_token("user_1", "s3cret")
+
+        self.assertTrue(streamer.verify("user_1", token))
+        self.assertFalse(streamer.verify("user_2", token))
+        self.assertFalse(streamer.verify("user_1", None))
+        self.assertFalse(streamer.verify("user_1", session_token("user_1", "other")))
+        self.assertFalse(ReplyStreamer(secret="").verify("user_1", session_token("user_1", "")))
+
+
+class TestReplyStreamer(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the ReplyStreamer."""
+
+    async def asyncSetUp(self):
+        tokens = ["Hello", " there", "! What", " do you", " love?"]
+        self.client = OllamaClient(host="http://ollama.test", transport=create_stream_transport(tokens))
+        self.streamer = ReplyStreamer(client=self.client)
+        self.streamer.start = AsyncMock()
+        self.streamer.sio = MagicMock()
+        self.streamer.sio.emit = AsyncMock()
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_stream_emits_sentence_chunks(self):
+        """Test that sentences are emitted as they complete and the full text is returned."""
+        text = await self.streamer.stream_reply("user_1", [{"role": "user", "content": "hi"}])
+
+        emitted = [c.args[1] for c in self.streamer.sio.emit.call_args_list]
+        self.assertEqual(text, "Hello there! What do you love?")
+        self.assertEqual([e["text"] for e in emitted[:-1]], ["Hello there! ", "What do you love?"])
+        self.assertEqual("".join(e["text"] for e in emitted[:-1]), text)
+        self.assertEqual(emitted[-1], {"text": text, "done": True})
+        self.assertEqual(self.streamer.sio.emit.call_args_list[0].kwargs["room"], "user_1")
+        self.assertEqual(self.streamer.stats()["streams"], 1)
+
+    async def test_user_message_needs_the_sessions_token(self):
+        """Test that only the session's owner can cancel its replies."""
+        streamer = ReplyStreamer(secret="s3cret")
+        tracker = MagicMock()
+
+        with patch("reply_streamer.get_generation_tracker", return_value=tracker):
+            refused = await streamer._on_user_message("sid", {"session_id": "user_1", "token": session_token("user_2", "s3cret")})
+            accepted = await streamer._on_user_message("sid", {"session_id": "user_1", "token": session_token("user_1", "s3cret")})
+
+        self.assertFalse(refused)
+        self.assertTrue(accepted)
+        tracker.notify.assert_called_once()
+        self.assertEqual(tracker.notify.call_args.args[0], "user_1")
+        self.assertEqual(streamer.stats()["refused"], 1)
+
+    async def test_late_user_message_keeps_the_reply_to_it(self):
+        """Test that a notification arriving after its own message's generation started does not cancel it."""
+        streamer = ReplyStreamer(secret="s3cret")
+        tracker = GenerationTracker()
+        data = {"session_id": "user_1", "token": session_token("user_1", "s3cret"), "message_id": "client-2"}
+        reply = asyncio.ensure_future(tracker.run("user_1", "client-2", lambda: asyncio.sleep(0.05, "reply")))
+        await asyncio.sleep(0.01)
+
+        with patch("reply_streamer.get_generation_tracker", return_value=tracker):
+            await streamer._on_user_message("sid", data)
+
+        self.assertEqual(await reply, "reply")
+        self.assertEqual(tracker.stats()["cancelled"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
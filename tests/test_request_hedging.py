@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+
+import httpx
+
+from circuit_breaker import LatencyTracker
+from ollama_client import OllamaClient
+from request_hedging import RequestHedger
+
+
+def create_tracker(latency=0.01, samples=20):
+    """Helper function to create a latency tracker with enough samples to hedge."""
+    tracker = LatencyTracker(min_samples=samples)
+    for _ in range(samples):
+        tracker.record("extraction", latency)
+    return tracker
+
+
+class TestRequestHedger(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the RequestHedger."""
+
+    async def test_slow_call_is_hedged_and_loser_cancelled(self):
+        """Test that a stalled call is overtaken by its hedge."""
+        hedger = RequestHedger(create_tracker(), enabled=True, call_types=["extraction"], max_rate=1.0)
+        attempts = []
+        cancelled = asyncio.Event()
+
+        async def call():
+            attempts.append(1)
+            if len(attempts) == 1:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return "hedge"
+
+        result = await asyncio.wait_for(hedger.run("extraction", call), timeout=1.0)
+        await asyncio.sleep(0)
+
+        self.assertEqual(result, "hedge")
+        self.assertTrue(cancelled.is_set())
+        stats = hedger.stats()["extraction"]
+        self.assertEqual((stats["hedges_sent"], stats["hedges_won"]), (1, 1))
+
+    async def test_no_hedge_without_samples_or_for_other_call_types(self):
+        """Test that hedging waits for latency samples and only applies to configured call types."""
+        hedger = RequestHedger(LatencyTracker(), enabled=True, call_types=["extraction"])
+        self.assertIsNone(hedger.hedge_delay("extraction"))
+
+        hedger = RequestHedger(create_tracker(), enabled=True, call_types=["extraction"])
+        self.assertIsNone(hedger.hedge_delay("generation"))
+        self.assertEqual(hedger.hedge_delay("extraction"), hedger.min_delay)
+
+    async def test_hedge_rate_is_capped(self):
+        """Test that no more than the maximum share of calls is hedged."""
+        hedger = RequestHedger(create_tracker(), enabled=True, call_types=["extraction"], max_rate=0.5)
+
+        async def slow():
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        await asyncio.gather(*(hedger.run("extraction", slow) for _ in range(4)))
+
+        stats = hedger.stats()["extraction"]
+        self.assertLessEqual(stats["hedge_rate"], 0.5)
+        self.assertGreater(stats["capped"], 0)
+
+    async def test_client_hedges_stalled_extraction(self):
+        """Test that the client answers a stalled extraction call from the hedge."""
+        calls = []
+
+        async def handler(request):
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(5)
+            return httpx.Response(200, json={"message": {"role": "assistant", "content": "Sam"}, "done": True})
+
+        client = OllamaClient(host="http://ollama.test", transport=httpx.MockTransport(handler))
+        client.hedger.enabled = True
+        client.hedger.max_rate = 1.0
+        for _ in range(client.latency.min_samples):
+            client.latency.record("extraction", 0.01)
+
+        result = await asyncio.wait_for(client.chat([{"role": "user", "content": "Sam"}], call_type="extraction"), timeout=1.0)
+        await client.aclose()
+
+        self.assertEqual(result["message"]["content"], "Sam")
+        self.assertEqual(client.hedger.stats()["extraction"]["hedges_won"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
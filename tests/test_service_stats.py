@@ -0,0 +1,37 @@
+import json
+import asyncio
+import unittest
+
+from service_stats import StatsReporter, collect_stats
+
+
+class TestServiceStats(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the periodic service stats line."""
+
+    async def test_stats_cover_every_component(self):
+        """Test that the stats of the shared components are collected together."""
+        stats = collect_stats()
+
+        self.assertIn("prompt_eval", stats["ollama"])
+        self.assertIn("sender_budget", stats["ollama"])
+        for component in ["extraction_batcher", "generation_tracker", "fallback_cache", "action_idempotency"]:
+            self.assertIn(component, stats)
+
+    async def test_reports_are_logged_every_interval(self):
+        """Test that the reporter logs one JSON stats line per interval."""
+        reporter = StatsReporter(interval=0.01)
+
+        with self.assertLogs("service_stats", level="INFO") as logs:
+            reporter.start()
+            reporter.start()
+            await asyncio.sleep(0.05)
+            await reporter.stop()
+
+        lines = [line for line in logs.output if "Service stats: " in line]
+        self.assertGreaterEqual(len(lines), 2)
+        self.assertEqual(reporter.reports, len(lines))
+        self.assertIn("ollama", json.loads(lines[0].split("Service stats: ", 1)[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
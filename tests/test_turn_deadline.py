@@ -0,0 +1,149 @@
+import os
+import json
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from conversation_logger import write_json_atomic
+from ollama_client import OllamaClient
+from turn_deadline import (
+    DeadlineExceededError, TurnBudgets, current_deadline, flush_storage,
+    parse_turn_budgets, run_storage, with_turn_budget
+)
+
+
+def create_slow_transport(delay):
+    """Helper function to create a fake /api/chat transport that answers after a delay."""
+    async def handler(request):
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": "Hi"}, "done": True})
+
+    return httpx.MockTransport(handler)
+
+
+class FakeAction:
+    """A stand-in for a Rasa action."""
+
+    def name(self):
+        return "action_fake"
+
+    @with_turn_budget
+    async def run(self, dispatcher, tracker, domain):
+        return current_deadline()
+
+
+class TestTurnBudgets(unittest.TestCase):
+    """Test cases for turn deadlines and LLM admission."""
+
+    def test_admission_against_remaining_budget(self):
+        """Test that a call is rejected when its expected latency does not fit."""
+        budgets = TurnBudgets(default_budget=1.0, budgets={}, margin=1.0)
+
+        budgets.admit("generation", 30.0)
+        with budgets.turn("action_fake"):
+            budgets.admit("generation", 0.5)
+            budgets.admit("generation", None)
+            with self.assertRaises(DeadlineExceededError):
+                budgets.admit("generation", 30.0)
+
+        self.assertEqual(budgets.stats()["skipped"], {"generation": 1})
+        self.assertEqual(budgets.stats()["actions"]["action_fake"]["runs"], 1)
+
+    def test_per_action_budgets(self):
+        """Test that per-action budgets override the default and 0 disables the deadline."""
+        budgets = TurnBudgets(default_budget=10.0, budgets=parse_turn_budgets("action_a=2, action_b=0,bad"))
+
+        self.assertEqual(budgets.budget_for("action_a"), 2.0)
+        self.assertEqual(budgets.budget_for("action_c"), 10.0)
+        with budgets.turn("action_b") as deadline:
+            self.assertIsNone(deadline)
+            self.assertIsNone(current_deadline())
+
+    def test_storage_is_deferred_under_a_deadline(self):
+        """Test that storage writes leave the turn's thread only when a deadline is set."""
+        threads = []
+        record = lambda: threads.append(threading.current_thread())
+
+        run_storage(record)
+        with TurnBudgets(default_budget=1.0, budgets={}).turn("action_fake"):
+            run_storage(record)
+        flush_storage()
+
+        self.assertIs(threads[0], threading.current_thread())
+        self.assertIsNot(threads[1], threading.current_thread())
+
+    def test_deferred_log_write_is_atomic(self):
+        """Test that a deferred log write replaces the file whole and leaves no temporary file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "user-1.json")
+            write_json_atomic(path, {"messages": []})
+            with TurnBudgets(default_budget=1.0, budgets={}).turn("action_fake"):
+                run_storage(write_json_atomic, path, {"messages": [{"text": "hi"}]})
+            flush_storage()
+
+            with open(path) as f:
+                self.assertEqual(json.load(f), {"messages": [{"text": "hi"}]})
+            self.assertEqual(os.listdir(tmp), ["user-1.json"])
+
+
+class TestDeadlineInClient(unittest.IsolatedAsyncioTestCase):
+    """Test cases for deadlines reaching the Ollama client."""
+
+    async def test_decorated_run_gets_a_deadline(self):
+        """Test that a decorated action run sees its deadline and clears it afterwards."""
+        with patch("turn_deadline._shared_budgets", TurnBudgets(default_budget=0, budgets={"action_fake": 1.0})):
+            deadline = await FakeAction().run(None, None, None)
+
+        self.assertEqual(deadline.action_name, "action_fake")
+        self.assertIsNone(current_deadline())
+
+    async def test_slow_call_is_skipped_without_calling_ollama(self):
+        """Test that a call whose observed latency exceeds the remaining budget is never sent."""
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json={"message": {"content": "Hi"}, "done": True})
+
+        client = OllamaClient(host="http://ollama.test", transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(client.aclose)
+        client.latency.record("generation", 20.0)
+
+        with TurnBudgets(default_budget=1.0, budgets={}).turn("action_fake"):
+            with self.assertRaises(DeadlineExceededError):
+                await client.chat([{"role": "user", "content": "hi"}])
+
+        self.assertEqual(calls, [])
+
+    async def test_timeout_is_capped_by_the_deadline(self):
+        """Test that a call running past the deadline fails without tripping the breaker."""
+        client = OllamaClient(host="http://ollama.test", transport=create_slow_transport(1.0))
+        self.addAsyncCleanup(client.aclose)
+
+        with TurnBudgets(default_budget=0.1, budgets={}).turn("action_fake"):
+            with self.assertRaises(DeadlineExceededError):
+                await client.chat([{"role": "user", "content": "hi"}])
+
+        self.assertEqual(client.breaker.stats()["consecutive_failures"], 0)
+
+    async def test_deadline_releases_half_open_probe(self):
+        """Test that a probe running past the deadline does not leave the breaker stuck half-open."""
+        client = OllamaClient(host="http://ollama.test", transport=create_slow_transport(0.2))
+        self.addAsyncCleanup(client.aclose)
+        client.breaker.state = client.breaker.HALF_OPEN
+
+        with TurnBudgets(default_budget=0.05, budgets={}).turn("action_fake"):
+            with self.assertRaises(DeadlineExceededError):
+                await client.chat([{"role": "user", "content": "hi"}])
+
+        result = await client.chat([{"role": "user", "content": "hi"}])
+        self.assertEqual(result["message"]["content"], "Hi")
+        self.assertEqual(client.breaker.state, client.breaker.CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
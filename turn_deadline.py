@@ -0,0 +1,299 @@
+import os
+import time
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Latency budget for actions without their own, in seconds (0 disables deadlines).
+# Off by default: the generation actions produce up to 300 tokens, which takes longer than a collector turn on CPU.
+TURN_BUDGET_SECONDS = float(os.environ.get("TURN_BUDGET_SECONDS", "0"))
+# Budgets of the actions with short LLM calls and a template reply to fall back on
+DEFAULT_TURN_BUDGETS = ",".join(
+    [f"action_collect_{field}=10" for field in ["name", "age", "gender", "gender_preference", "age_preference", "height"]]
+    + ["action_determine_user_intent=5"]
+)
+# Per-action budgets, e.g. "action_ollama_fallback=3,action_collect_height=2"
+TURN_BUDGETS = os.environ.get("TURN_BUDGETS", DEFAULT_TURN_BUDGETS)
+# Headroom applied to the expected LLM latency before comparing it with the remaining budget
+TURN_ADMISSION_MARGIN = float(os.environ.get("TURN_ADMISSION_MARGIN", "1.2"))
+
+
+class DeadlineExceededError(Exception):
+    """Raised when an LLM call is skipped because it would not finish within the turn's budget."""
+
+
+class TurnDeadline:
+    """The deadline of one action run."""
+
+    def __init__(self, action_name: str, budget: float):
+        self.action_name = action_name
+        self.budget = budget
+        self.started = time.monotonic()
+        self.expires = self.started + budget
+
+    def remaining(self) -> float:
+        """Get the seconds left before the deadline (never negative)."""
+        return max(0.0, self.expires - time.monotonic())
+
+    def elapsed(self) -> float:
+        """Get the seconds since the action run started."""
+        return time.monotonic() - self.started
+
+
+_current_deadline: "contextvars.ContextVar[Optional[TurnDeadline]]" = contextvars.ContextVar("turn_deadline", default=None)
+
+
+def current_deadline() -> Optional[TurnDeadline]:
+    """
+    Get the deadline of the action run in progress.
+
+    The deadline is carried in a context variable, so tasks started during
+    the run (LLM calls, batches, hedges) see it too.
+
+    Returns:
+        The TurnDeadline, or None outside a budgeted action run
+    """
+    return _current_deadline.get()
+
+
+def set_current_deadline(deadline: Optional[TurnDeadline]) -> None:
+    """
+    Set the deadline for the running task, e.g. a batch sent for several action runs.
+
+    Args:
+        deadline: The deadline, or None for no deadline
+    """
+    _current_deadline.set(deadline)
+
+
+def latest_deadline(deadlines: List[Optional[TurnDeadline]]) -> Optional[TurnDeadline]:
+    """
+    Get the deadline that allows work shared by several action runs the most time.
+
+    Args:
+        deadlines: The deadline of each action run (None for runs without one)
+
+    Returns:
+        The deadline that expires last, or None if any run has no deadline
+    """
+    if not deadlines or any(deadline is None for deadline in deadlines):
+        return None
+    return max(deadlines, key=lambda deadline: deadline.expires)
+
+
+def parse_turn_budgets(budgets: str) -> Dict[str, float]:
+    """
+    Parse per-action turn budgets.
+
+    Args:
+        budgets: Comma-separated action_name=seconds pairs
+
+    Returns:
+        Dictionary mapping action names to budgets in seconds
+    """
+    table = {}
+    for entry in budgets.split(","):
+        name, _, seconds = entry.partition("=")
+        try:
+            table[name.strip()] = float(seconds)
+        except ValueError:
+            continue
+    return table
+
+
+class TurnBudgets:
+    """
+    Give each action run a latency budget and decide whether LLM calls fit in it.
+
+    An LLM call is admitted if its expected latency - the median latency of
+    its call type, scaled by how many calls are queued per scheduler slot and
+    by a safety margin - fits in what is left of the budget. Rejected calls
+    raise DeadlineExceededError, and the action answers from its template instead.
+    """
+
+    def __init__(self,
+                 default_budget: float = TURN_BUDGET_SECONDS,
+                 budgets: Optional[Dict[str, float]] = None,
+                 margin: float = TURN_ADMISSION_MARGIN):
+        """
+        Initialize the turn budgets.
+
+        Args:
+            default_budget: Budget in seconds for actions without their own (0 disables deadlines)
+            budgets: Budgets per action name (optional, defaults to TURN_BUDGETS)
+            margin: Headroom applied to the expected LLM latency
+        """
+        self.default_budget = default_budget
+        self.budgets = budgets if budgets is not None else parse_turn_budgets(TURN_BUDGETS)
+        self.margin = margin
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self.skipped: Dict[str, int] = {}
+
+    def budget_for(self, action_name: str) -> float:
+        """Get the budget in seconds for an action (0 means no deadline)."""
+        return self.budgets.get(action_name, self.default_budget)
+
+    @contextmanager
+    def turn(self, action_name: str) -> Iterator[Optional[TurnDeadline]]:
+        """
+        Run a block under the action's deadline.
+
+        Args:
+            action_name: Name of the action being run
+
+        Yields:
+            The TurnDeadline, or None if the action has no budget
+        """
+        budget = self.budget_for(action_name)
+        if budget <= 0:
+            yield None
+            return
+
+        deadline = TurnDeadline(action_name, budget)
+        token = _current_deadline.set(deadline)
+        try:
+            yield deadline
+        finally:
+            _current_deadline.reset(token)
+            self._record(deadline)
+
+    def _record(self, deadline: TurnDeadline) -> None:
+        """Record how long an action run took against its budget."""
+        elapsed = deadline.elapsed()
+        metrics = self._metrics.setdefault(deadline.action_name, {"runs": 0, "total_seconds": 0.0, "max_seconds": 0.0, "overruns": 0})
+        metrics["runs"] += 1
+        metrics["total_seconds"] += elapsed
+        metrics["max_seconds"] = max(metrics["max_seconds"], elapsed)
+        if elapsed > deadline.budget:
+            metrics["overruns"] += 1
+            logger.warning(f"{deadline.action_name} took {elapsed:.2f}s, over its {deadline.budget:.2f}s budget")
+
+    def admit(self, call_type: str, expected_latency: Optional[float]) -> None:
+        """
+        Check that an LLM call fits in the current turn's remaining budget.
+
+        Args:
+            call_type: The kind of call
+            expected_latency: Expected seconds until the call completes, or None if unknown
+
+        Raises:
+            DeadlineExceededError: If the call would not finish in time
+        """
+        deadline = current_deadline()
+        if deadline is None:
+            return
+        remaining = deadline.remaining()
+        needed = (expected_latency or 0.0) * self.margin
+        if remaining <= 0 or needed > remaining:
+            self.skipped[call_type] = self.skipped.get(call_type, 0) + 1
+            raise DeadlineExceededError(
+                f"Skipping {call_type} call in {deadline.action_name}: "
+                f"expected {needed:.2f}s, {remaining:.2f}s left"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get turn budget statistics.
+
+        Returns:
+            Dictionary mapping action names to runs, average and max duration, overruns and budget,
+            plus skipped LLM calls per call type
+        """
+        return {
+            "actions": {
+                action_name: {
+                    "runs": int(metrics["runs"]),
+                    "average_seconds": metrics["total_seconds"] / metrics["runs"],
+                    "max_seconds": metrics["max_seconds"],
+                    "overruns": int(metrics["overruns"]),
+                    "budget": self.budget_for(action_name)
+                }
+                for action_name, metrics in self._metrics.items()
+            },
+            "skipped": dict(self.skipped)
+        }
+
+
+_shared_budgets: Optional[TurnBudgets] = None
+
+
+def get_turn_budgets() -> TurnBudgets:
+    """
+    Get the process-wide turn budgets.
+
+    Returns:
+        The shared TurnBudgets instance
+    """
+    global _shared_budgets
+    if _shared_budgets is None:
+        _shared_budgets = TurnBudgets()
+    return _shared_budgets
+
+
+def with_turn_budget(run: Callable) -> Callable:
+    """
+    Decorate an action's run() so it runs under the action's turn deadline.
+
+    Args:
+        run: The action's async run method
+
+    Returns:
+        The wrapped run method
+    """
+    @functools.wraps(run)
+    async def wrapper(self, dispatcher, tracker, domain):
+        with get_turn_budgets().turn(self.name()):
+            return await run(self, dispatcher, tracker, domain)
+    return wrapper
+
+
+# Log writes made under a deadline run here, one at a time and in order
+_storage_executor: Optional[ThreadPoolExecutor] = None
+# Held by every storage write, inline or deferred, so read-modify-write updates of a log file never interleave
+_storage_lock = threading.Lock()
+
+
+def run_storage(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+    """
+    Run a storage write, off the turn's critical path when the turn has a deadline.
+
+    Under a deadline the write is handed to a single background thread, so
+    writes still happen in order but the reply does not wait for them.
+    Outside a deadline the write runs inline. Inline and deferred writes
+    never run at the same time, and the log files are replaced atomically,
+    so readers never see a partly written file.
+
+    Args:
+        fn: The write to perform
+        *args: Positional arguments for fn
+        **kwargs: Keyword arguments for fn
+    """
+    if current_deadline() is None:
+        with _storage_lock:
+            fn(*args, **kwargs)
+        return
+
+    global _storage_executor
+    if _storage_executor is None:
+        _storage_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="turn-storage")
+
+    def write():
+        try:
+            with _storage_lock:
+                fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Error in deferred storage write: {str(e)}")
+
+    _storage_executor.submit(write)
+
+
+def flush_storage() -> None:
+    """Wait until every deferred storage write has finished."""
+    if _storage_executor is not None:
+        _storage_executor.submit(lambda: None).result()